@@ -1,4 +1,5 @@
 import machine
+from acoustic import BlockSampler
 
 class Microphone:
     def __init__(self, pin=3): # on gpio 3
@@ -9,14 +10,23 @@ class Microphone:
         """Return raw analog value (0–1023)"""
         return self.adc.read()
 
-#from mic import Microphone
-import uasyncio as asyncio
+    def sampler(self, rate_hz=8000, n=256):
+        """Block sampler on this ADC; see acoustic.BlockSampler."""
+        return BlockSampler(self.adc.read, rate_hz, n)
 
-mic = Microphone()
+if __name__ == "__main__":
+    #from mic import Microphone
+    import uasyncio as asyncio
+    from acoustic import RMS, PEAK, ZCR, BAND0
 
-async def main():
-    while True:
-        print("Mic:", mic.read())
-        await asyncio.sleep_ms(50)
+    mic = Microphone()
+    blocks = mic.sampler()
 
-asyncio.run(main())
+    async def main():
+        while True:
+            f = blocks.features()
+            print("Mic: rms %.1f peak %d zcr %d Hz bands %s late %d"
+                  % (f[RMS], f[PEAK], f[ZCR], [int(b) for b in f[BAND0:]], blocks.late))
+            await asyncio.sleep_ms(500)
+
+    asyncio.run(main())
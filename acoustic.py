@@ -0,0 +1,181 @@
+import math
+from array import array
+
+from ticks import ticks_us, ticks_diff, ticks_add
+
+try:
+    from micropython import native
+except ImportError:  # CPython host
+    def native(f):
+        return f
+
+# ================= Block features =================
+# Per block of ADC samples (DC offset removed):
+#
+#   RMS, PEAK       level, in ADC counts
+#   ZCR             zero crossings per second
+#   BAND0..         RMS per octave band from a Haar decomposition: BAND0 is
+#                   rate/4..rate/2, each next band an octave lower, and the
+#                   last one everything below. Bands add up (in power) to RMS.
+#
+# The Haar split is one add and one subtract per sample per level, with no
+# multiplies or tables, and is just as easy to vectorize on the host.
+
+LEVELS = 4
+RMS, PEAK, ZCR = 0, 1, 2
+BAND0 = 3
+N_FEATURES = BAND0 + LEVELS + 1
+
+
+def band_edges(rate_hz, levels=LEVELS):
+    """(lo, hi) in Hz for each band, BAND0 first."""
+    out = []
+    hi = rate_hz / 2
+    for _ in range(levels):
+        out.append((hi / 2, hi))
+        hi /= 2
+    out.append((0, hi))
+    return out
+
+
+@native
+def block_features(buf, n, rate_hz, out, work, levels=LEVELS):
+    """Features of buf[:n] into out (N_FEATURES floats); returns out.
+
+    n must be a multiple of 2 ** levels; work is a float array of at
+    least n // 2 used as scratch, so nothing is allocated per block.
+    """
+    total = 0
+    for i in range(n):
+        total += buf[i]
+    mean = total / n
+
+    # Pass 1: level, peak, crossings and the first Haar level together
+    sq = 0.0
+    peak = 0.0
+    crossings = 0
+    e = 0.0
+    prev_pos = buf[0] >= mean
+    for i in range(0, n, 2):
+        a = buf[i] - mean
+        b = buf[i + 1] - mean
+        sq += a * a + b * b
+        if a > peak:
+            peak = a
+        elif -a > peak:
+            peak = -a
+        if b > peak:
+            peak = b
+        elif -b > peak:
+            peak = -b
+        pos = a >= 0
+        if pos != prev_pos:
+            crossings += 1
+        prev_pos = b >= 0
+        if prev_pos != pos:
+            crossings += 1
+        d = a - b
+        e += d * d
+        work[i >> 1] = a + b
+    out[RMS] = math.sqrt(sq / n)
+    out[PEAK] = peak
+    out[ZCR] = crossings * rate_hz / n
+    # Unnormalized Haar: level l details carry 2 ** l times their energy
+    out[BAND0] = math.sqrt(e / 2 / n)
+
+    m = n >> 1
+    scale = 2
+    for lvl in range(1, levels):
+        m >>= 1
+        scale <<= 1
+        e = 0.0
+        for i in range(m):
+            a = work[2 * i]
+            b = work[2 * i + 1]
+            d = a - b
+            e += d * d
+            work[i] = a + b
+        out[BAND0 + lvl] = math.sqrt(e / scale / n)
+    e = 0.0
+    for i in range(m):
+        e += work[i] * work[i]
+    out[BAND0 + levels] = math.sqrt(e / scale / n)
+    return out
+
+
+# ================= Block sampler =================
+class BlockSampler:
+    def __init__(self, read, rate_hz=8000, n=256):
+        """Fills a preallocated array('H') from read() at a fixed rate.
+
+        read is any zero-argument callable (machine.ADC.read on the rover,
+        a signal generator on the host). Sampling is paced on ticks_us in a
+        tight loop, so a block blocks the caller for n / rate_hz seconds;
+        rate_hz=None samples as fast as read() allows. Samples taken more
+        than one period late are counted in late.
+        """
+        self.read = read
+        self.rate_hz = rate_hz
+        self.n = n
+        self.buf = array('H', [0] * n)
+        self.work = array('f', [0] * (n // 2))
+        self.out = array('f', [0] * N_FEATURES)
+        self.blocks = 0
+        self.late = 0
+
+    def fill(self):
+        buf = self.buf
+        read = self.read
+        if self.rate_hz is None:
+            for i in range(self.n):
+                buf[i] = read()
+        else:
+            period = 1000000 // self.rate_hz
+            t = ticks_us()
+            late = 0
+            for i in range(self.n):
+                while ticks_diff(t, ticks_us()) > 0:
+                    pass
+                buf[i] = read()
+                if ticks_diff(ticks_us(), t) > period:
+                    late += 1
+                t = ticks_add(t, period)
+            self.late += late
+        self.blocks += 1
+        return buf
+
+    def features(self):
+        """Sample one block and return its features (reused array)."""
+        self.fill()
+        rate = self.rate_hz if self.rate_hz is not None else 1
+        return block_features(self.buf, self.n, rate, self.out, self.work)
+
+
+# ================= Host (NumPy) =================
+def block_features_np(x, rate_hz, levels=LEVELS):
+    """Vectorized block_features over x of shape (blocks, n) or (n,).
+
+    Returns an array of shape (blocks, N_FEATURES) (or (N_FEATURES,)).
+    """
+    import numpy as np
+
+    x = np.asarray(x, np.float64)
+    single = x.ndim == 1
+    if single:
+        x = x[None, :]
+    n = x.shape[1]
+    x = x - x.mean(axis=1, keepdims=True)
+    out = np.empty((x.shape[0], N_FEATURES))
+    out[:, RMS] = np.sqrt((x * x).mean(axis=1))
+    out[:, PEAK] = np.abs(x).max(axis=1)
+    pos = x >= 0
+    out[:, ZCR] = (pos[:, 1:] != pos[:, :-1]).sum(axis=1) * rate_hz / n
+    a = x
+    scale = 1
+    for lvl in range(levels):
+        scale *= 2
+        even, odd = a[:, 0::2], a[:, 1::2]
+        out[:, BAND0 + lvl] = np.sqrt(((even - odd) ** 2).sum(axis=1) / scale / n)
+        a = even + odd
+    out[:, BAND0 + levels] = np.sqrt((a * a).sum(axis=1) / scale / n)
+    return out[0] if single else out
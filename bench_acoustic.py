@@ -0,0 +1,71 @@
+import math
+import time
+from array import array
+
+import numpy as np
+
+from acoustic import (BAND0, LEVELS, N_FEATURES, PEAK, RMS, ZCR, BlockSampler,
+                      band_edges, block_features, block_features_np)
+from telemetry_codec import ACOUSTIC_SIZE, decode_acoustic, pack_acoustic_into
+
+# Acoustic features on the rover vs shipping raw audio: per-block cost of
+# the pure-Python feature pass (what runs under @micropython.native on the
+# ESP32-C3) against the NumPy host version, agreement between the two, and
+# uplink bytes per second for features vs the raw 12-bit samples.
+
+RATE_HZ = 8000
+N = 256
+BLOCKS = 200
+
+
+def tone(freq, amp=400, noise=0, seed=1):
+    rng = np.random.default_rng(seed)
+    t = np.arange(N * BLOCKS) / RATE_HZ
+    x = 2048 + amp * np.sin(2 * math.pi * freq * t) + noise * rng.standard_normal(t.size)
+    return np.clip(x, 0, 4095).astype(np.uint16).reshape(BLOCKS, N)
+
+
+def main():
+    print("bands:", ", ".join(f"{lo:.0f}-{hi:.0f} Hz" for lo, hi in band_edges(RATE_HZ)))
+    work = array('f', [0] * (N // 2))
+    out = array('f', [0] * N_FEATURES)
+    for name, x in (("200 Hz tone", tone(200)), ("1.5 kHz tone", tone(1500)),
+                    ("3 kHz + noise", tone(3000, noise=200)), ("noise", tone(0, 0, noise=300))):
+        blocks = [array('H', row.tolist()) for row in x]
+        t0 = time.perf_counter()
+        for b in blocks:
+            block_features(b, N, RATE_HZ, out, work)
+        py_us = (time.perf_counter() - t0) / BLOCKS * 1e6
+        t0 = time.perf_counter()
+        ref = block_features_np(x, RATE_HZ)
+        np_us = (time.perf_counter() - t0) / BLOCKS * 1e6
+        err = max(abs(out[i] - ref[-1][i]) / max(1.0, abs(ref[-1][i])) for i in range(N_FEATURES))
+        bands = " ".join(f"{v:6.1f}" for v in ref[-1][BAND0:])
+        print(f"{name:14s} rms {ref[-1][RMS]:6.1f} peak {ref[-1][PEAK]:5.0f} zcr {ref[-1][ZCR]:5.0f} Hz  "
+              f"bands [{bands}]  py {py_us:6.0f} us/block  numpy {np_us:5.1f} us/block  rel err {err:.1e}")
+
+    # Same block through the wire format and back
+    buf = bytearray(ACOUSTIC_SIZE)
+    pack_acoustic_into(buf, 7, out)
+    rec = decode_acoustic(buf)
+    print(f"frame: {ACOUSTIC_SIZE} bytes, decoded rms {rec['sound_rms']} zcr {rec['sound_zcr']}")
+
+    raw_bps = RATE_HZ * 12 / 8
+    for period_ms in (1000, 250):
+        feat_bps = ACOUSTIC_SIZE * 1000 / period_ms
+        print(f"uplink, one block every {period_ms:4d} ms: features {feat_bps:6.0f} B/s vs raw "
+              f"{raw_bps:6.0f} B/s ({raw_bps / feat_bps:5.0f}x)")
+
+    # Pacing on the host clock: how many samples missed their slot
+    src = iter(tone(440).ravel().tolist() * 2)
+    sampler = BlockSampler(lambda: next(src), RATE_HZ, N)
+    t0 = time.perf_counter()
+    for _ in range(20):
+        sampler.features()
+    took = (time.perf_counter() - t0) / 20 * 1000
+    print(f"paced sampler: {took:.1f} ms/block (ideal {N / RATE_HZ * 1000:.1f}), "
+          f"late samples {sampler.late}/{20 * N}, {LEVELS + 1} bands")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import asyncio
+import base64
+import json
+import os
+import time
+
+from bench_telemetry_stream import env_trace, imu_trace
+from dash_gateway import DashState, Gateway, ws_read
+from ground_ingest import Ingestor
+from telemetry_codec import FLAG_HAS_ENV, FLAG_HAS_IMU
+from telemetry_stream import StreamEncoder
+
+# Dashboard fan-out with and without dash_gateway.py. Rovers publish as
+# simulate_rover.py does (20 Hz IMU + 1 Hz env, unbatched) on
+# mars/rover/<id>/telemetry; viewers each watch one rover over a real
+# WebSocket. Time is compressed: each display tick feeds the gateway the
+# messages of 1/HZ seconds, then lets the clients read.
+#
+# Direct: every browser holds its own broker subscription, so the broker
+# delivers 21 msg/s per viewer and each browser decodes and redraws 21
+# times a second. Gateway: one subscription, HZ frames/s per browser.
+
+HZ = 5
+SECONDS = 60
+IMU_HZ, ENV_HZ = 20, 1
+
+
+def rover_schedule(rover, seconds):
+    """[(t_ms, topic, payload)] for one rover, in time order."""
+    topic = "mars/rover/%d/telemetry" % rover
+    out = []
+    for sid, trace, period, flags in ((0, imu_trace(seconds, seed=rover + 1), 1000 // IMU_HZ, FLAG_HAS_IMU),
+                                      (1, env_trace(seconds, seed=rover + 1000), 1000 // ENV_HZ, FLAG_HAS_ENV)):
+        enc = StreamEncoder(sid, 20)
+        for seq, s in enumerate(trace):
+            out.append((seq * period, topic, enc.encode(seq, flags=flags, **s)))
+    out.sort(key=lambda m: m[0])
+    return out
+
+
+class Viewer:
+    def __init__(self, rover):
+        self.rover = rover
+        self.messages = 0
+        self.bytes = 0
+        self.snapshots = 0
+        self.storms = 0
+        self.points = 0
+        self.reader = self.writer = None
+
+    async def connect(self, port):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        self.writer.write(("GET /ws?rover=%d HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\n"
+                           "Connection: Upgrade\r\nSec-WebSocket-Key: %s\r\n"
+                           "Sec-WebSocket-Version: 13\r\n\r\n" % (self.rover, key)).encode())
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        assert head.startswith(b"HTTP/1.1 101"), head
+        return self
+
+    async def run(self):
+        try:
+            while True:
+                op, data = await ws_read(self.reader)
+                msg = json.loads(data)
+                self.messages += 1
+                self.bytes += len(data) + 2
+                if msg["type"] == "snapshot":
+                    self.snapshots += 1
+                r = msg["rovers"].get(str(self.rover), {})
+                self.points += len(r.get("c", ()))
+                if r.get("s", {}).get("ir_storm"):
+                    self.storms += 1
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+
+async def run(rovers, viewers):
+    state = DashState()
+    ing = Ingestor(state)
+    gw = await Gateway(state, HZ, "127.0.0.1", 0).start()
+    clients = [await Viewer(i % rovers).connect(gw.port) for i in range(viewers)]
+    tasks = [asyncio.create_task(c.run()) for c in clients]
+    await asyncio.sleep(0.05)
+
+    schedules = [rover_schedule(r, SECONDS) for r in range(rovers)]
+    msgs = sorted((m for s in schedules for m in s), key=lambda m: m[0])
+    storms = sum(1 for r in range(rovers) for s in env_trace(SECONDS, seed=r + 1000) if s["ir_storm"])
+
+    busy = 0.0
+    i = 0
+    tick_ms = 1000 // HZ
+    for end in range(tick_ms, SECONDS * 1000 + 1, tick_ms):
+        t0 = time.perf_counter()
+        while i < len(msgs) and msgs[i][0] < end:
+            t_ms, topic, payload = msgs[i]
+            ing.handle(topic, payload, 1.7e9 + t_ms / 1000)
+            i += 1
+        gw.tick()
+        busy += time.perf_counter() - t0
+        await asyncio.sleep(0)  # clients read
+    await asyncio.sleep(0.2)
+
+    # A late joiner still gets the whole chart window in its snapshot
+    late = await Viewer(0).connect(gw.port)
+    late_task = asyncio.create_task(late.run())
+    await asyncio.sleep(0.1)
+
+    for c in clients + [late]:
+        c.writer.close()
+    await asyncio.gather(*tasks, late_task)
+    await asyncio.sleep(0.1)  # gateway sees EOF on every socket
+    gw.server.close()
+    await gw.server.wait_closed()
+
+    seen = sum(c.storms for c in clients)
+    expected = sum(sum(1 for s in env_trace(SECONDS, seed=c.rover + 1000) if s["ir_storm"]) for c in clients)
+    assert seen == expected, (seen, expected)
+    assert all(c.snapshots == 1 for c in clients)
+    assert late.points == 20, late.points
+    assert ing.messages == len(msgs)
+
+    per_rover = (IMU_HZ + ENV_HZ)
+    in_rate = len(msgs) / SECONDS
+    print(f"{rovers:>6} {viewers:>7}  {viewers * per_rover:>9.0f} {per_rover:>9.0f}   "
+          f"{in_rate:>9.0f} {sum(c.messages for c in clients) / viewers / SECONDS:>9.1f} "
+          f"{sum(c.bytes for c in clients) / viewers / SECONDS / 1024:>7.2f} "
+          f"{busy / SECONDS * 100:>6.1f}%  {gw.skipped:>4}  {storms}")
+
+
+def main():
+    print(f"{SECONDS} s of telemetry per run, display at {HZ} Hz; each viewer watches one rover")
+    print(f"{'':>14}  {'direct':>19}   {'gateway':>34}")
+    print(f"{'rovers':>6} {'viewers':>7}  {'broker/s':>9} {'decode/s':>9}   "
+          f"{'broker/s':>9} {'frames/s':>9} {'KB/s':>7} {'cpu':>7}  {'skip':>4}  storms")
+    for rovers, viewers in ((1, 1), (1, 10), (1, 100), (10, 100), (50, 100), (50, 500)):
+        asyncio.run(run(rovers, viewers))
+
+
+if __name__ == "__main__":
+    main()
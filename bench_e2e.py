@@ -0,0 +1,246 @@
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+from simulate_rover import FLEET_TOPIC, FleetStats, VirtualRover
+from telemetry_batch import is_probe, pack_probe, unpack_probe
+
+# End-to-end latency / throughput: rover publisher -> broker -> subscriber.
+#
+# Messages are built by the simulate_rover.py code path (delta encoder +
+# batcher), wrapped in a probe envelope (seq + monotonic send time) just
+# before publish, and timed on arrival. Publisher, broker and subscriber run
+# in separate processes on this host so they don't share a GIL, and
+# time.monotonic_ns() is a system-wide clock, so latencies need no sync.
+#
+# By default a local_broker.py stand-in is spawned; --broker host:port
+# points the run at any other local broker instead.
+
+RATES = (200, 1000, 5000, 10000, 20000)  # messages/s
+BATCHES = (1, 10, 20)  # IMU samples per message -> payload size
+DURATION = 3.0
+DRAIN_S = 2.0
+P99_LIMIT_MS = 50.0
+MAX_LOSS = 0.001
+BROKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "local_broker.py")
+
+
+def rover_bodies(batch, n=512):
+    """n consecutive messages from one virtual rover's IMU stream."""
+    class Capture:
+        def __init__(self):
+            self.out = []
+
+        def publish(self, topic, payload, qos=0):
+            self.out.append(payload)
+
+    cap = Capture()
+    rover = VirtualRover(0, cap, "", FleetStats(), imu_batch=batch)
+    while len(cap.out) < n:
+        rover.imu_step()
+    return cap.out[:n]
+
+
+def start_broker():
+    proc = subprocess.Popen([sys.executable, BROKER_SCRIPT, "--port", "0"],
+                            stdout=subprocess.PIPE, text=True)
+    # First line is "... Local broker on host:port"
+    line = proc.stdout.readline().strip()
+    host, _, port = line.rpartition(" on ")[2].rpartition(":")
+    if not host or not port.isdigit():
+        proc.kill()
+        proc.wait()
+        raise SystemExit(f"{BROKER_SCRIPT} did not report host:port, got {line!r}")
+    return proc, int(port)
+
+
+def publisher(host, port, topic, rate, bodies, duration, result):
+    """Paced publisher process; sends in small bursts on absolute deadlines."""
+    client = mqtt.Client()
+    client.connect(host, port, 60)
+    client.loop_start()
+    n = len(bodies)
+    total = int(rate * duration)
+    seq = 0
+    info = None
+    start = time.monotonic()
+    while seq < total:
+        due = min(total, int((time.monotonic() - start) * rate) + 1)
+        while seq < due:
+            info = client.publish(topic, pack_probe(seq, time.monotonic_ns(), bodies[seq % n]))
+            seq += 1
+        sleep = start + seq / rate - time.monotonic()
+        if sleep > 0:
+            time.sleep(sleep)
+    elapsed = time.monotonic() - start
+    # QoS 0 messages are "published" once written, so this waits for the queue to empty
+    if info is not None:
+        info.wait_for_publish(10)
+    client.loop_stop()
+    client.disconnect()
+    result.put((seq, elapsed))
+
+
+class Receiver:
+    def __init__(self, host, port, topic):
+        self.latency = []
+        self.seqs = []
+        self.subscribed = threading.Event()
+        self.client = mqtt.Client()
+        self.client.on_message = self.on_message
+        self.client.on_subscribe = lambda *a: self.subscribed.set()
+        self.client.connect(host, port, 60)
+        self.client.subscribe(topic)
+        self.client.loop_start()
+        self.subscribed.wait(5)
+
+    def on_message(self, client, userdata, msg):
+        now = time.monotonic_ns()
+        if is_probe(msg.payload):
+            seq, t_ns, _ = unpack_probe(msg.payload)
+            self.latency.append(now - t_ns)
+            self.seqs.append(seq)
+
+    def reset(self):
+        self.latency = []
+        self.seqs = []
+
+    def close(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+
+def percentile(sorted_vals, p):
+    if not sorted_vals:
+        return None
+    return sorted_vals[min(len(sorted_vals) - 1, int(p * len(sorted_vals)))]
+
+
+def summarize(sent, elapsed, rate, size, latency, seqs):
+    lat = sorted(latency)
+    unique = len(set(seqs))
+    reordered = 0
+    top = -1
+    for s in seqs:
+        if s < top:
+            reordered += 1
+        else:
+            top = s
+
+    def ms(v):
+        return None if v is None else round(v / 1e6, 3)
+
+    return {
+        "target_rate": rate,
+        "payload_bytes": size,
+        "sent": sent,
+        "received": len(seqs),
+        "achieved_rate": round(sent / elapsed, 1),
+        "loss": round(1 - unique / sent, 6) if sent else 0.0,
+        "duplicates": len(seqs) - unique,
+        "reordered": reordered,
+        "p50_ms": ms(percentile(lat, 0.50)),
+        "p99_ms": ms(percentile(lat, 0.99)),
+        "p999_ms": ms(percentile(lat, 0.999)),
+        "max_ms": ms(lat[-1] if lat else None),
+    }
+
+
+def sustainable(r, p99_limit):
+    return (r["achieved_rate"] >= 0.95 * r["target_rate"]
+            and r["loss"] <= MAX_LOSS
+            and r["p99_ms"] is not None and r["p99_ms"] <= p99_limit)
+
+
+def run_point(host, port, recv, rate, bodies, duration):
+    topic = FLEET_TOPIC.format(id=0)
+    recv.reset()
+    result = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=publisher,
+                                   args=(host, port, topic, rate, bodies, duration, result))
+    proc.start()
+    sent, elapsed = result.get()
+    proc.join()
+    # Wait for stragglers, giving up after DRAIN_S without progress
+    last, idle = -1, time.monotonic()
+    while len(recv.seqs) < sent and time.monotonic() - idle < DRAIN_S:
+        if len(recv.seqs) != last:
+            last, idle = len(recv.seqs), time.monotonic()
+        time.sleep(0.05)
+    size = sum(len(b) for b in bodies) / len(bodies) + len(pack_probe(0, 0, b""))
+    return summarize(sent, elapsed, rate, round(size, 1), recv.latency, recv.seqs)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="End-to-end MQTT latency / throughput sweep")
+    ap.add_argument("--broker", default=None, help="host:port (default: spawn local_broker.py)")
+    ap.add_argument("--rates", default=",".join(map(str, RATES)))
+    ap.add_argument("--batches", default=",".join(map(str, BATCHES)),
+                    help="IMU samples per message, sweeps payload size")
+    ap.add_argument("--duration", type=float, default=DURATION, help="seconds per point")
+    ap.add_argument("--p99-limit", type=float, default=P99_LIMIT_MS,
+                    help="p99 latency (ms) above which a rate is not sustainable")
+    ap.add_argument("--out", default=None, help='write JSON results here ("-" for stdout)')
+    args = ap.parse_args()
+
+    broker = None
+    if args.broker:
+        host, port = args.broker.rsplit(":", 1)
+        port = int(port)
+    else:
+        broker, port = start_broker()
+        host = "127.0.0.1"
+    log = sys.stderr if args.out == "-" else sys.stdout
+
+    recv = Receiver(host, port, FLEET_TOPIC.format(id=0))
+    results = []
+    try:
+        for batch in map(int, args.batches.split(",")):
+            bodies = rover_bodies(batch)
+            for rate in map(int, args.rates.split(",")):
+                r = run_point(host, port, recv, rate, bodies, args.duration)
+                r["batch"] = batch
+                r["sustainable"] = sustainable(r, args.p99_limit)
+                results.append(r)
+                print(f"batch {batch:3d} ({r['payload_bytes']:6.1f} B)  {rate:6d} msg/s -> "
+                      f"{r['achieved_rate']:8.0f}  loss {r['loss'] * 100:6.2f}%  "
+                      f"reord {r['reordered']:5d}  p50 {r['p50_ms']} ms  p99 {r['p99_ms']} ms  "
+                      f"p999 {r['p999_ms']} ms  {'ok' if r['sustainable'] else 'SATURATED'}",
+                      file=log, flush=True)
+    finally:
+        recv.close()
+        if broker is not None:
+            broker.terminate()
+            broker.wait()
+
+    max_rate = {}
+    for r in results:
+        if r["sustainable"]:
+            max_rate[r["batch"]] = max(max_rate.get(r["batch"], 0), r["target_rate"])
+    report = {
+        "broker": args.broker or "local_broker.py",
+        "duration_s": args.duration,
+        "p99_limit_ms": args.p99_limit,
+        "max_loss": MAX_LOSS,
+        "points": results,
+        "max_sustainable_rate": {str(b): max_rate.get(b, 0) for b in sorted({r["batch"] for r in results})},
+    }
+    for b, rate in report["max_sustainable_rate"].items():
+        print(f"max sustainable @ batch {b}: {rate} msg/s", file=log)
+    if args.out == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
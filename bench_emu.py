@@ -0,0 +1,220 @@
+import contextlib
+import io
+import math
+import os
+import shutil
+import tempfile
+import time
+
+from emu import Board, square
+
+# The node firmware on emu's virtual clock: each driver on its own board
+# with the scripted hardware it expects, then rover_node.py whole. Wall
+# time is the host's; everything else (rates, bus traffic, latencies) is
+# what the rover would see. Firmware is imported after install(), and
+# uninstall() drops it again, so every section starts from a clean boot.
+
+MINUTES = 10
+ROVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rover_node.py")
+
+
+@contextlib.contextmanager
+def board(**kw):
+    b = Board(**kw).install()
+    try:
+        yield b
+    finally:
+        b.uninstall()
+
+
+def speed(b, t0):
+    wall = time.perf_counter() - t0
+    return f"{b.clock.us / 1e6:6.0f} s virtual in {wall:5.2f} s wall ({b.clock.us / 1e6 / wall:6.0f}x)"
+
+
+def dht_idle():
+    # An hour of the DHT task: a 25 ms read, then 2 s asleep (inline, no
+    # _thread), so one read every 2025 ms
+    with board() as b:
+        from dhtasync import AsyncDHT22
+        import dht
+        import machine
+        import uasyncio as asyncio
+
+        b.climate.temp = lambda t: 20 + 5 * math.sin(t / 600)
+        b.climate.fail_rate = 0.02
+        reader = AsyncDHT22(dht.DHT22(machine.Pin(9)))
+        got = []
+
+        async def main():
+            asyncio.create_task(reader.run())
+            while True:
+                got.append(await reader.wait_for_new())
+
+        t0 = time.perf_counter()
+        b.run(main(), seconds=3600)
+        assert reader.reads == 3600000 // 2025 + 1 and len(got) == reader.reads - reader.errors
+        print(f"dht      {speed(b, t0)}: {reader.reads} reads, {reader.errors} timeouts, "
+              f"{len(got)} readings {min(g[0] for g in got):.1f}..{max(g[0] for g in got):.1f} C")
+
+
+def imu():
+    # FIFO streaming vs polling the data registers at the same 200 Hz
+    spin = 30.0  # deg/s about z
+    for mode in ("fifo", "polled"):
+        with board(motion=lambda t: (0.0, 0.0, 1.0, 0.0, 0.0, spin)) as b:
+            import machine
+            import uasyncio as asyncio
+            from imu_fusion import ComplementaryFilter, ImuStream
+            from mpu6050 import MPU6050
+
+            i2c = machine.I2C(0, scl=machine.Pin(5), sda=machine.Pin(4), freq=400000)
+            mpu = MPU6050(i2c)
+            if mode == "fifo":
+                stream = ImuStream(mpu, rate_hz=200, drain_hz=25)
+                task = stream.run
+                filt = stream.filter
+            else:
+                filt = ComplementaryFilter()
+
+                async def task():
+                    while True:
+                        o = mpu.read_into()
+                        filt.update(o[0], o[1], o[2], o[3], o[4], o[5], 0.005)
+                        await asyncio.sleep_ms(5)
+
+            async def main():
+                asyncio.create_task(task())
+                await asyncio.sleep(MINUTES * 60)
+
+            b.mpu.stats(reset=True)
+            t0 = time.perf_counter()
+            b.run(main())
+            reads, writes, nbytes, _ = b.mpu.stats()
+            # Integrated yaw vs the true turn: polling that assumes a fixed
+            # dt drifts with every late wakeup, the FIFO's own clock doesn't
+            err = (filt.angles()[2] - spin * MINUTES * 60 + 180) % 360 - 180
+            print(f"imu      {mode:<6} {speed(b, t0)}: {filt.samples} samples, {reads} reads "
+                  f"{nbytes / 1e3:.0f} kB, bus busy {b.i2c_us / b.clock.us * 100:.1f}%, "
+                  f"yaw error {err:+.1f} deg, overflows {mpu.fifo_overflows}")
+
+
+def rtc():
+    with board(start=(2024, 2, 28, 23, 59, 50)) as b:
+        import machine
+        import time as utime
+        from pcf5863 import PCF8563
+
+        chip = PCF8563(machine.I2C(0, scl=machine.Pin(5), sda=machine.Pin(4)))
+        first = chip.datetime()
+        utime.sleep(3600 * 24 + 15)
+        later = chip.datetime()
+        chip.write_all(seconds=0, minutes=30, hours=12, date=1, month=6, year=25)
+        utime.sleep(61)
+        after = chip.datetime()
+        assert first == (24, 2, 28, 3, 23, 59, 50) and later == (24, 3, 1, 5, 0, 0, 5), later
+        assert after[4:] == (12, 31, 1), after
+        reads, writes, _, _ = b.rtc.stats()
+        print(f"rtc      {first} + 1 day 15 s -> {later}, set + 61 s -> {after}, "
+              f"{reads} reads {writes} writes")
+
+
+def irq_inputs():
+    with board() as b:
+        import uasyncio as asyncio
+        from ir_digital import IRStormDetector
+        DigitalInterruptWindow = __import__("vibration-sensor").DigitalInterruptWindow
+
+        # IR idles high (active low); two storms and a 5 ms glitch
+        b.pin(1).level = 1
+        b.pin(1).script([(10000, 0), (12500, 1), (20000, 0), (20005, 1), (30000, 0), (31000, 1)])
+        # Three 80 Hz vibration bursts of growing length
+        for start, ms in ((5000, 200), (15000, 600), (25000, 1500)):
+            b.pin(2).script(square(80, start, start + ms))
+        ir = IRStormDetector(1)
+        vibe = DigitalInterruptWindow(2, window_ms=500)
+        peaks = []
+
+        async def main():
+            asyncio.create_task(ir.run())
+            while True:
+                vibe.process()
+                p = vibe.peak()
+                if p:
+                    peaks.append(p)
+                await asyncio.sleep_ms(500)
+
+        t0 = time.perf_counter()
+        b.run(main(), seconds=40)
+        assert ir.onsets == 2 and ir.storm_ms() == 3500 and ir.bounces == 2, (ir.onsets, ir.bounces)
+        print(f"irq      {speed(b, t0)}: IR {b.pins[1].irqs} edges -> {ir.onsets} storms "
+              f"{ir.storm_ms()} ms, {ir.bounces} bounces (the glitch); vibe {b.pins[2].irqs} edges -> "
+              f"peaks {peaks}, ring overflows {vibe.ring.overflows}")
+
+
+def servo():
+    with board() as b:
+        import uasyncio as asyncio
+        from motion import MotionController
+        from servoasync import AsyncServo
+
+        s = AsyncServo(6)
+        motion = MotionController(update_ms=20)
+        motion.add(s, max_vel=120, max_accel=360)
+
+        async def main():
+            asyncio.create_task(motion.run())
+            for angle in (0, 180, 90, 90, 45):
+                s.set_target(angle)
+                await asyncio.sleep(30)
+
+        t0 = time.perf_counter()
+        b.run(main())
+        pwm = b.pwms[6]
+        print(f"servo    {speed(b, t0)}: {motion.ticks} steps, {pwm.writes} PWM writes, "
+              f"{motion.suspends} idle, duty now {pwm.duty()}")
+
+
+def rover():
+    flash = tempfile.mkdtemp()
+    try:
+        with board(flash_dir=flash, motion=lambda t: (0.0, 0.0, 1.0, 0.0, 0.0, 3.0)) as b:
+            b.pin(0).analog = lambda t: 2000 + 500 * math.sin(t / 10)
+            b.pin(1).level = 1
+            b.pin(1).script([(120000, 0), (125000, 1)])
+            b.pin(2).script(square(80, 60000, 61500))
+            b.pin(3).analog = lambda t: 2048 + 800 * math.sin(2 * math.pi * 440 * t)
+            b.wifi.drop(300000, 20000)
+            log = io.StringIO()
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(log):
+                ns = b.run_script(ROVER_SCRIPT, seconds=MINUTES * 60)
+            lanes = ns["lanes"]
+            uplink = ns["uplink"]
+            print(f"rover    {speed(b, t0)}: {b.broker.messages} MQTT messages "
+                  f"{b.broker.bytes / 1e3:.1f} kB, {uplink.stored} to flash / {uplink.drained} drained, "
+                  f"{uplink.reconnects} connects, alarms {ns['alarm_seq']}")
+            s = b.stats()
+            print(f"         I2C {s['i2c']} bus {s['i2c_ms'] / 1e3:.1f} s, IRQs {s['irqs']}, "
+                  f"PWM writes {s['pwm_writes']}")
+            for name, runs, overruns, missed, errors, late, run in ns["sched"].stats():
+                print(f"         task {name:<8} runs {runs:6d} missed {missed:4d} late {late:5d} ms "
+                      f"longest run {run:5d} ms")
+            assert lanes.stats()[0][3] == 0  # no alarm dropped
+            # The WiFi rejoin is polled, so the outage costs no task a period
+            assert uplink.stored > 0 and all(st[3] == 0 for st in ns["sched"].stats())
+    finally:
+        shutil.rmtree(flash)
+
+
+def main():
+    dht_idle()
+    imu()
+    rtc()
+    irq_inputs()
+    servo()
+    rover()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import math
+import random
+import struct
+import time
+
+from imu_fusion import ImuStream
+from mpu6050 import (ACCEL_SCALE, FIFO_COUNTH, FIFO_R_W, FIFO_SIZE, GYRO_SCALE,
+                     MPU6050, SMPLRT_DIV, USER_CTRL, USER_CTRL_FIFO_RESET)
+from telemetry_batch import BatchPublisher
+from telemetry_stream import StreamEncoder
+from telemetry_codec import FLAG_HAS_IMU
+
+# Polled raw IMU vs FIFO streaming + on-device fusion, on a simulated
+# MPU6050 that rocks in pitch/roll and turns slowly in yaw.
+#
+# Counts I2C transactions and task wakeups per second, uplink bytes per
+# second (raw 200 Hz samples vs fused 20 Hz angles, both through the
+# delta encoder + batcher) and the fused angle error against the truth.
+
+SECONDS = 60
+RATE_HZ = 200
+DRAIN_HZ = 25
+PUBLISH_HZ = 20
+
+
+def truth(t):
+    """(roll, pitch, yaw) in degrees and their rates in deg/s."""
+    roll = 25 * math.sin(0.5 * t)
+    pitch = 15 * math.sin(0.3 * t + 1)
+    yaw = 5 * t
+    return (roll, pitch, yaw), (12.5 * math.cos(0.5 * t), 4.5 * math.cos(0.3 * t + 1), 5.0)
+
+
+def raw_sample(t, rng):
+    (roll, pitch, _), (droll, dpitch, dyaw) = truth(t)
+    r, p = math.radians(roll), math.radians(pitch)
+    # Gravity in the body frame (ZYX Euler), plus vibration noise
+    ax = -math.sin(p) + rng.gauss(0, 0.02)
+    ay = math.sin(r) * math.cos(p) + rng.gauss(0, 0.02)
+    az = math.cos(r) * math.cos(p) + rng.gauss(0, 0.02)
+    # Euler rates -> body rates, plus noise and a small gyro bias
+    gx = droll - dyaw * math.sin(p) + rng.gauss(0, 0.3) + 0.2
+    gy = dpitch * math.cos(r) + dyaw * math.sin(r) * math.cos(p) + rng.gauss(0, 0.3) - 0.1
+    gz = -dpitch * math.sin(r) + dyaw * math.cos(r) * math.cos(p) + rng.gauss(0, 0.3)
+
+    def c(v, scale):
+        return max(-32768, min(32767, int(round(v * scale))))
+
+    return (c(ax, ACCEL_SCALE), c(ay, ACCEL_SCALE), c(az, ACCEL_SCALE),
+            c(gx, GYRO_SCALE), c(gy, GYRO_SCALE), c(gz, GYRO_SCALE))
+
+
+class FakeMPU:
+    """I2C device with a sample clock and a 1 KiB FIFO; bench sets .now."""
+
+    def __init__(self, seed=1):
+        self.rng = random.Random(seed)
+        self.now = 0.0
+        self.next_t = 0.0
+        self.period = 1 / 1000
+        self.fifo = bytearray()
+        self.transactions = 0
+        self.dropped = 0
+
+    def _fill(self):
+        while self.next_t <= self.now:
+            s = raw_sample(self.next_t, self.rng)
+            self.next_t += self.period
+            if len(self.fifo) + 12 > FIFO_SIZE:
+                # Like the chip: keep writing, oldest bytes fall off
+                self.dropped += 1
+                self.fifo = self.fifo[12:]
+            self.fifo += struct.pack(">hhhhhh", *s)
+
+    def writeto_mem(self, addr, reg, data):
+        self.transactions += 1
+        if reg == SMPLRT_DIV:
+            self.period = (data[0] + 1) / 1000
+        elif reg == USER_CTRL and data[0] & USER_CTRL_FIFO_RESET:
+            self.fifo = bytearray()
+            self.next_t = self.now
+
+    def readfrom_mem_into(self, addr, reg, buf):
+        self.transactions += 1
+        if reg == FIFO_COUNTH:
+            self._fill()
+            n = min(len(self.fifo), FIFO_SIZE)
+            buf[0], buf[1] = n >> 8, n & 0xFF
+        elif reg == FIFO_R_W:
+            n = len(buf)
+            buf[:] = self.fifo[:n]
+            self.fifo = self.fifo[n:]
+        else:
+            s = raw_sample(self.now, self.rng)
+            buf[:] = struct.pack(">hhhhhhh", s[0], s[1], s[2], 0, s[3], s[4], s[5])
+
+
+class Uplink:
+    def __init__(self):
+        self.bytes = 0
+        self.messages = 0
+
+    def __call__(self, msg):
+        self.bytes += len(msg)
+        self.messages += 1
+
+
+def polled_raw():
+    dev = FakeMPU()
+    imu = MPU6050(dev)
+    up = Uplink()
+    batch = BatchPublisher(up, clock=lambda: int(dev.now * 1000))
+    dev.transactions = 0
+    n = SECONDS * RATE_HZ
+    for i in range(n):
+        dev.now = i / RATE_HZ
+        o = imu.read_into()
+        # A raw stream ships all 6 channels as int16 (mg, mdeg/s) per sample
+        batch.add(struct.pack(">hhhhhh", *(int(v * 1000) for v in o[:6])))
+        batch.poll()
+    batch.flush()
+    return dev.transactions / SECONDS, n / SECONDS, up.bytes / SECONDS
+
+
+def fifo_fused():
+    dev = FakeMPU()
+    stream = ImuStream(MPU6050(dev), RATE_HZ, DRAIN_HZ)
+    up = Uplink()
+    enc = StreamEncoder(0)
+    batch = BatchPublisher(up, clock=lambda: int(dev.now * 1000))
+    dev.transactions = 0
+    err = []
+    wakeups = 0
+    seq = 0
+    # Interleave drain and publish ticks on a 1 ms virtual timeline
+    for ms in range(1, SECONDS * 1000 + 1):
+        dev.now = ms / 1000
+        if ms % (1000 // DRAIN_HZ) == 0:
+            stream.poll()
+            wakeups += 1
+        if ms % (1000 // PUBLISH_HZ) == 0:
+            wakeups += 1
+            pitch, roll, yaw = stream.angles()
+            n = enc.encode_into(seq, pitch=pitch, roll=roll, yaw=yaw, flags=FLAG_HAS_IMU)
+            batch.add(memoryview(enc.buf)[:n])
+            batch.poll()
+            seq += 1
+            if dev.now > 2:
+                (t_roll, t_pitch, _), _ = truth(dev.now)
+                f = stream.filter
+                err.append(((f.roll - t_roll + 180) % 360 - 180, (f.pitch - t_pitch + 180) % 360 - 180))
+    batch.flush()
+    rms = [math.sqrt(sum(e[i] ** 2 for e in err) / len(err)) for i in (0, 1)]
+    return (dev.transactions / SECONDS, wakeups / SECONDS, up.bytes / SECONDS, rms,
+            stream.samples / SECONDS, stream.imu.fifo_overflows)
+
+
+def main():
+    txn, wake, bps = polled_raw()
+    print(f"polled raw @ {RATE_HZ} Hz        {txn:6.0f} I2C txn/s  {wake:6.0f} wakeups/s  "
+          f"{bps:7.0f} B/s uplink")
+    txn, wake, bps, rms, rate, oflow = fifo_fused()
+    print(f"FIFO drain @ {DRAIN_HZ} Hz, fused @ {PUBLISH_HZ} Hz  {txn:4.0f} I2C txn/s  {wake:6.0f} wakeups/s  "
+          f"{bps:7.0f} B/s uplink")
+    print(f"  fused {rate:.0f} samples/s, FIFO overflows {oflow}, "
+          f"RMS error roll {rms[0]:.2f} deg  pitch {rms[1]:.2f} deg")
+
+    # Host cost of the filter per sample (MicroPython is ~50-100x slower)
+    stream = ImuStream(MPU6050(FakeMPU()), RATE_HZ, DRAIN_HZ)
+    stream.imu.i2c.now = 0.4  # ~80 samples queued
+    n = stream.poll()
+    t0 = time.perf_counter()
+    for _ in range(200):
+        stream.filter.update_fifo(stream.buf, n, stream.dt)
+    dt = (time.perf_counter() - t0) / (200 * n)
+    print(f"update_fifo: {dt * 1e6:.2f} us/sample on this host")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import asyncio
+import shutil
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+from bench_telemetry_stream import env_trace, imu_trace
+from ground_ingest import Ingestor, IngestService
+from telemetry_batch import BatchPublisher
+from telemetry_codec import FLAG_HAS_ENV
+from telemetry_stream import StreamEncoder
+from tsstore import ColumnStore
+
+# Ingest throughput on one core, fed with the simulate_rover.py streams
+# (20 Hz IMU + 1 Hz sensors) encoded exactly as the rover publishes them.
+TOPIC = "mars/telemetry"
+SECONDS = 1800
+
+
+def rover_messages(batch):
+    """Return [(topic, payload, recv_time)] for SECONDS of simulated rover."""
+    out = []
+    now = [0]
+    for sid, trace, period_ms, flags in (
+        (0, imu_trace(SECONDS), 50, None),
+        (1, env_trace(SECONDS), 1000, FLAG_HAS_ENV),
+    ):
+        enc = StreamEncoder(sid, 20)
+        pub = BatchPublisher(
+            lambda m: out.append((now[0], bytes(m))),
+            max_count=batch, max_bytes=1000, clock=lambda: now[0],
+        )
+        for seq, s in enumerate(trace):
+            now[0] = seq * period_ms
+            kw = {"flags": flags} if flags else {}
+            if batch == 1:
+                out.append((now[0], enc.encode(seq, **s, **kw)))
+            else:
+                pub.add(enc.encode(seq, **s, **kw))
+        pub.flush()
+    out.sort(key=lambda m: m[0])
+    msgs = [(TOPIC, payload, 1.7e9 + t / 1000) for t, payload in out]
+    # One message the store cannot take (rover id past int16) must be
+    # counted and skipped without stopping the consumer
+    msgs.insert(len(msgs) // 2, ("mars/rover/40000/telemetry", msgs[0][1], msgs[0][2]))
+    return msgs
+
+
+def bench_direct(msgs, root):
+    ing = Ingestor(ColumnStore(root))
+    t0 = time.perf_counter()
+    for m in msgs:
+        ing.handle(*m)
+    ing.store.flush()
+    dt = time.perf_counter() - t0
+    ing.store.close()
+    return ing, dt
+
+
+def bench_async(msgs, root):
+    ing = Ingestor(ColumnStore(root))
+    svc = IngestService(ing, flush_interval=0.5)
+
+    async def main():
+        svc.loop = asyncio.get_running_loop()
+        svc.wakeup = asyncio.Event()
+        tasks = [asyncio.create_task(svc.consume()), asyncio.create_task(svc.flusher())]
+
+        def producer():
+            # Stands in for paho's network thread
+            for topic, payload, t in msgs:
+                svc.on_message(None, None, SimpleNamespace(topic=topic, payload=payload))
+
+        t0 = time.perf_counter()
+        th = threading.Thread(target=producer)
+        th.start()
+        while ing.messages < len(msgs):
+            await asyncio.sleep(0.01)
+        dt = time.perf_counter() - t0
+        th.join()
+        for t in tasks:
+            t.cancel()
+        return dt
+
+    dt = asyncio.run(main())
+    ing.store.close()
+    return ing, dt
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="ingest-bench-")
+    try:
+        for batch in (1, 10):
+            msgs = rover_messages(batch)
+            for name, fn in (("direct", bench_direct), ("asyncio", bench_async)):
+                root = f"{tmp}/{name}-{batch}"
+                ing, dt = fn(msgs, root)
+                print(f"batch {batch:<3} {name:<8} {len(msgs):7d} msgs  "
+                      f"{ing.samples:7d} samples  "
+                      f"{len(msgs) / dt:9.0f} msg/s  {ing.samples / dt:9.0f} samples/s")
+                assert ing.errors == 1
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
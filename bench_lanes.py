@@ -0,0 +1,146 @@
+from collections import deque
+
+from lanes import ALARM, BULK, CONTROL, LaneQueue
+from simulate_rover import VirtualRover
+from telemetry_batch import BatchPublisher
+from telemetry_codec import FLAG_HAS_ENV, FLAG_HAS_IMU
+from telemetry_stream import StreamEncoder
+
+# Alarm latency on a saturated 980 bit/s uplink: simulate_rover.py's
+# traffic (IMU 20 Hz in batches of 10, env 1 Hz with urgent alarms)
+# through one FIFO, as today, vs the alarm / control / bulk lanes.
+# Latency is from the sample to the end of its transmission on a
+# simulated radio; both setups get the same byte budget for queueing.
+
+BITRATE = 980
+MINUTES = 10
+QUEUE_BYTES = 1024
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class Radio:
+    """Serialises messages at BITRATE; returns when each one ends."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.busy_until = 0.0
+        self.bytes = 0
+
+    def send(self, n):
+        start = max(self.busy_until, self.clock.now)
+        self.busy_until = start + n * 8000 / BITRATE
+        self.bytes += n
+        return self.busy_until
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p * len(xs)))] if xs else float("nan")
+
+
+def run(mode, seed=1):
+    clock = Clock()
+    radio = Radio(clock)
+    rover = VirtualRover(0, None, "", None, seed=seed)
+    imu_enc = StreamEncoder(0, 20)
+    env_enc = StreamEncoder(1, 20)
+    alarm_enc = StreamEncoder(2, 1)
+    alarm_lat = []
+    lost = {"alarm": 0, "env": 0, "imu": 0}
+    created = deque()  # alarm sample times, in send order
+    stats = None
+
+    if mode == "fifo":
+        fifo = deque()  # (bytes, kind)
+        alarm = [False]
+
+        def enqueue(kind):
+            def put(m):
+                k = "alarm" if alarm[0] else kind
+                if sum(n for n, _ in fifo) + len(m) > QUEUE_BYTES:
+                    lost[k] += 1
+                    if k == "alarm":
+                        created.pop()
+                    return
+                fifo.append((len(m), k))
+            return put
+
+        imu_pub = BatchPublisher(enqueue("imu"), max_count=10, max_age_ms=5000, clock=clock)
+        env_pub = BatchPublisher(enqueue("env"), max_count=5, max_age_ms=5000, clock=clock)
+    else:
+        def on_air(m, qos):
+            end = radio.send(len(m))
+            if qos:
+                alarm_lat.append(end - created.popleft())
+
+        lanes = LaneQueue(on_air, link_bps=BITRATE, burst_bytes=64, high_water=QUEUE_BYTES, clock=clock)
+        imu_pub = BatchPublisher(lambda m: lanes.put(BULK, m), max_count=10, max_age_ms=5000, clock=clock)
+        env_pub = BatchPublisher(lambda m: lanes.put(CONTROL, m), max_count=5, max_age_ms=5000,
+                                 clock=clock)
+
+    imu_seq = env_seq = alarm_seq = 0
+    for ms in range(0, MINUTES * 60 * 1000, 10):
+        clock.now = ms
+        if ms % 50 == 0:
+            p = rover.imu_payload()
+            imu_pub.add(imu_enc.encode(imu_seq, pitch=p["pitch"], roll=p["roll"], yaw=p["yaw"],
+                                       flags=FLAG_HAS_IMU))
+            imu_seq += 1
+        if ms % 1000 == 0:
+            p = rover.sensor_payload()
+            urgent = p["ir_storm"] or p["vibe"] > 0
+            if urgent:
+                created.append(ms)
+            if mode == "fifo":
+                # Today: alarms flush the env batch into the shared queue
+                alarm[0] = urgent
+                env_pub.add(env_enc.encode(env_seq, flags=FLAG_HAS_ENV, **p), urgent=urgent)
+                alarm[0] = False
+                env_seq += 1
+            elif urgent:
+                lanes.put(ALARM, alarm_enc.encode(alarm_seq, flags=FLAG_HAS_ENV, **p))
+                alarm_seq += 1
+            else:
+                env_pub.add(env_enc.encode(env_seq, flags=FLAG_HAS_ENV, **p))
+                env_seq += 1
+        imu_pub.poll()
+        env_pub.poll()
+
+        if mode == "fifo":
+            while fifo and radio.busy_until <= ms:
+                n, kind = fifo.popleft()
+                end = radio.send(n)
+                if kind == "alarm":
+                    alarm_lat.append(end - created.popleft())
+        else:
+            lanes.service()
+    if mode != "fifo":
+        stats = lanes.stats()
+    return alarm_lat, lost, radio.bytes, stats
+
+
+def main():
+    secs = MINUTES * 60
+    print(f"{MINUTES} min at {BITRATE} bit/s, {QUEUE_BYTES} B of queue")
+    for mode in ("fifo", "lanes"):
+        a, lost, sent, stats = run(mode)
+        print(f"  {mode:5s} alarms {len(a):3d} sent {lost['alarm']:2d} lost  latency p50 {pct(a, 0.5):7.0f} ms "
+              f"p99 {pct(a, 0.99):7.0f} ms max {max(a) if a else float('nan'):7.0f} ms  "
+              f"link use {sent * 8 / secs / BITRATE * 100:3.0f}%")
+        if stats:
+            for name, queued, sent_n, dropped, waiting, wait in stats:
+                print(f"        {name:8s} queued {queued:5d} sent {sent_n:5d} dropped {dropped:4d} "
+                      f"max queue wait {wait:6d} ms")
+        else:
+            print(f"        env lost {lost['env']}  imu batches lost {lost['imu']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import time
+
+import numpy as np
+
+from link_budget import KEYS, link_budget, max_bitrate, max_range, sweep
+
+# Checks link_budget.py against the values linkb.txt prints with its
+# defaults, then times full grids and prints the tables the mesh planning
+# needs: margin by hop distance and bitrate, and the longest hop per rate.
+
+# linkb.txt output with the defaults (MATLAB, 4 decimals)
+MATLAB = {
+    "EIRP": 17.0, "L_fspl": 138.2418, "Pr": -120.7418, "N": -117.5, "NF": 5.5309,
+    "F": 3.5735, "Tr": 746.3059, "Ts_actual": 1496.3059, "Ts_spec": 1036.3059,
+    "correction": 1.5953, "S_actual": -133.4047, "margin_sensitivity": 12.6629,
+    "No": -196.849, "CNo": 46.1072, "EbNo": 16.1949, "margin_ebno": 9.0949,
+}
+
+
+def check():
+    b = link_budget()
+    bad = [k for k, v in MATLAB.items() if abs(float(b[k]) - v) > 1e-4]
+    print(f"MATLAB defaults: {len(MATLAB) - len(bad)}/{len(MATLAB)} values match to 1e-4")
+    if bad:
+        for k in bad:
+            print(f"  {k}: {float(b[k]):.4f} != {MATLAB[k]}")
+        raise SystemExit(1)
+    # Elevation 90 deg is the straight-down case of the script
+    up = link_budget(elev_deg=90)
+    assert abs(float(up["margin_ebno"]) - float(b["margin_ebno"])) < 1e-9
+
+
+def throughput():
+    axes = dict(
+        r=np.linspace(100e3, 2000e3, 40),
+        elev_deg=np.linspace(5, 90, 25),
+        f=np.array([145.8e6, 433e6, 915e6, 2.4e9]),
+        bitrate=np.geomspace(300, 50e3, 20),
+        g_t=np.linspace(0, 6, 7),
+        l_point=np.linspace(0, 3, 7),
+    )
+    n = int(np.prod([len(a) for a in axes.values()]))
+    best = None
+    for _ in range(3):
+        t0 = time.perf_counter()
+        out = sweep(**axes)
+        m = np.minimum(out["margin_sensitivity"], out["margin_ebno"])
+        took = time.perf_counter() - t0
+        best = took if best is None else min(best, took)
+    print(f"{n} scenarios ({' x '.join(str(len(a)) for a in axes.values())}) in {best * 1000:.0f} ms: "
+          f"{n / best / 1e6:.1f} M scenarios/s, {(m >= 3).mean() * 100:.0f}% close with 3 dB")
+
+    # Same points one call at a time, as the script would run them
+    t0 = time.perf_counter()
+    for _ in range(2000):
+        link_budget(r=1000e3, bitrate=1200)
+    one = (time.perf_counter() - t0) / 2000
+    print(f"scalar calls: {1 / one:.0f} scenarios/s")
+
+
+def tables():
+    hops = np.array([1e3, 5e3, 20e3, 100e3, 450e3, 1000e3, 2000e3])
+    rates = np.array([300, 980, 2400, 9600, 50e3])
+    m = sweep(r=hops, bitrate=rates)
+    worst = np.minimum(m["margin_sensitivity"], m["margin_ebno"])
+    print("min margin (dB) by path length and bitrate, 433 MHz defaults")
+    print("        path " + "".join(f"{int(b):>9d}" for b in rates) + " bit/s")
+    for i, h in enumerate(hops):
+        print(f"  {h / 1e3:7.0f} km " + "".join(f"{v:9.1f}" for v in worst[i]))
+    print("longest path with 3 dB margin:")
+    for rate in rates:
+        print(f"  {int(rate):6d} bit/s  {float(max_range(r=450e3, bitrate=rate)) / 1e3:8.0f} km")
+    print(f"highest bitrate over 450 km with 3 dB: {float(max_bitrate()):.0f} bit/s")
+
+
+def main():
+    check()
+    throughput()
+    tables()
+    assert set(MATLAB) <= set(KEYS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import time
+
+import numpy as np
+
+from mesh_sim import Radio, neighbours, simulate
+
+# Mesh simulator scaling and load: wall time per simulated hour from 100
+# to 10,000 nodes, grid neighbour discovery against the all-pairs
+# distance matrix, and delivery ratio / latency as the per-rover publish
+# rate and the number of gateways change.
+
+
+def discovery():
+    radio = Radio()
+    rng = np.random.default_rng(1)
+    for n in (1000, 3000, 10000):
+        side = np.sqrt(n * np.pi * (radio.range_m / 2) ** 2 / 12)
+        x, y = rng.uniform(0, side, n), rng.uniform(0, side, n)
+        t0 = time.perf_counter()
+        i, _ = neighbours(x, y, radio.range_m)
+        grid = time.perf_counter() - t0
+        line = f"  {n:6d} nodes  grid {grid * 1000:7.1f} ms ({i.size} pairs)"
+        if n <= 3000:
+            t0 = time.perf_counter()
+            d = np.hypot(x[:, None] - x[None, :], y[:, None] - y[None, :])
+            pairs = int(np.triu(d < radio.range_m, 1).sum())
+            line += f"  all-pairs {(time.perf_counter() - t0) * 1000:7.1f} ms ({pairs} pairs)"
+        print(line)
+
+
+def main():
+    print("neighbour discovery:")
+    discovery()
+
+    print("scaling, 1 simulated hour, env sample every 50 s per rover:")
+    for nodes, gws in ((100, 1), (1000, 4), (10000, 36)):
+        out, mesh = simulate(nodes, gws, hours=1)
+        print(f"  {nodes:6d} nodes {mesh.links:6d} links  setup {out['setup_s']:5.1f} s  "
+              f"run {out['wall_s'] - out['setup_s']:6.1f} s  {out['events']:8d} events  "
+              f"delivered {out['delivery_ratio'] * 100:5.1f}%  hops {out['mean_hops']:.1f}")
+
+    print("load, 1000 nodes, 1 h:")
+    for sensor_hz, gws in ((0.005, 4), (0.02, 4), (0.02, 16), (0.1, 16), (1, 16)):
+        out, _ = simulate(1000, gws, hours=1, sensor_hz=sensor_hz)
+        print(f"  env every {1 / sensor_hz:5.0f} s  {gws:2d} gateways  "
+              f"delivered {out['delivery_ratio'] * 100:5.1f}%  p50 {out['latency_p50_s']:6.1f} s  "
+              f"p99 {out['latency_p99_s']:6.1f} s  queue drops {out['queue_drops']:6d}  "
+              f"collisions {out['collisions']:6d}")
+
+
+if __name__ == "__main__":
+    main()
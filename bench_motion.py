@@ -0,0 +1,131 @@
+import math
+
+from motion import MotionController
+
+# Servo CPU wakeups and PWM writes over ten minutes of rover time: one
+# AsyncServo.run() task per servo (damped step + duty write every 20 ms,
+# forever) vs one MotionController for all of them, which writes only on
+# duty changes and sleeps once everything has settled. Targets come from a
+# script: the antenna re-points every 30 s, the camera pans every 10 s,
+# the sample arm moves twice.
+
+MINUTES = 10
+UPDATE_MS = 20
+
+# name, max_vel deg/s, max_accel deg/s^2, [(t_s, target), ...]
+SERVOS = (
+    ("antenna", 60, 120, [(t, 45 + (t // 30 % 2) * 90) for t in range(0, MINUTES * 60, 30)]),
+    ("camera", 180, 720, [(t, 30 + (t * 37) % 120) for t in range(0, MINUTES * 60, 10)]),
+    ("arm", 90, 360, [(60, 20), (300, 160)]),
+)
+
+
+class FakeServo:
+    def __init__(self, min_duty=40, max_duty=115):
+        self.min_duty = min_duty
+        self.max_duty = max_duty
+        self.min_angle = 0
+        self.max_angle = 180
+        self.current_angle = 90
+        self.target_angle = 90
+        self.duty = -1
+        self.controller = None
+        self.pwm_writes = 0
+
+    def write(self, angle):
+        duty = int(self.min_duty + angle * (self.max_duty - self.min_duty) / 180)
+        if duty == self.duty:
+            return False
+        self.duty = duty
+        self.pwm_writes += 1
+        return True
+
+    def set_target(self, angle):
+        self.target_angle = max(self.min_angle, min(self.max_angle, angle))
+        if self.controller:
+            self.controller.notify()
+
+
+def old_damped(damping=0.15):
+    """Per-servo task: every step writes, converged or not."""
+    steps = MINUTES * 60 * 1000 // UPDATE_MS
+    changes = 0
+    for _, _, _, script in SERVOS:
+        targets = dict((t * 1000 // UPDATE_MS, a) for t, a in script)
+        angle, target, duty = 90.0, 90, -1
+        for k in range(steps):
+            target = targets.get(k, target)
+            angle += (target - angle) * damping
+            d = int(40 + angle * 75 / 180)
+            changes += d != duty
+            duty = d
+    return steps * len(SERVOS), steps * len(SERVOS), changes
+
+
+def controller():
+    ctl = MotionController(update_ms=UPDATE_MS)
+    servos = []
+    events = []
+    for name, vmax, amax, script in SERVOS:
+        s = FakeServo()
+        ctl.add(s, vmax, amax)
+        servos.append(s)
+        events += [(t * 1000, len(servos) - 1, a) for t, a in script]
+    events.sort()
+
+    # Same loop as MotionController.run() on a virtual clock
+    now, wakeups = 0, 0
+    end = MINUTES * 60 * 1000
+    while now < end:
+        while events and events[0][0] <= now:
+            _, i, a = events.pop(0)
+            servos[i].set_target(a)
+        wakeups += 1
+        if ctl.step():
+            now += UPDATE_MS
+        else:
+            ctl.suspends += 1
+            now = events[0][0] if events else end
+    return wakeups, ctl.writes, ctl, servos
+
+
+def settle_time(vmax, amax, move):
+    """Ideal trapezoid duration for a move, in seconds."""
+    if move * amax <= vmax * vmax:
+        return 2 * math.sqrt(move / amax)
+    return move / vmax + vmax / amax
+
+
+def main():
+    secs = MINUTES * 60
+    wakeups, writes, changes = old_damped()
+    print(f"{len(SERVOS)} servos, {MINUTES} min")
+    print(f"  per-servo tasks   {wakeups / secs:6.1f} wakeups/s  {writes / secs:6.1f} PWM writes/s "
+          f"({changes} of {writes} changed the duty)")
+    wakeups, writes, ctl, servos = controller()
+    print(f"  MotionController  {wakeups / secs:6.1f} wakeups/s  {writes / secs:6.1f} PWM writes/s "
+          f"({ctl.ticks} steps, idle {ctl.suspends} times)")
+    for (name, vmax, amax, _), s in zip(SERVOS, servos):
+        print(f"    {name:8s} 90 deg move in {settle_time(vmax, amax, 90):4.2f} s, "
+              f"ends at {s.current_angle:.1f} (target {s.target_angle})")
+
+    # Check the limits hold on one long move
+    ctl = MotionController(update_ms=UPDATE_MS)
+    s = FakeServo()
+    ctl.add(s, max_vel=120, max_accel=360)
+    s.current_angle = 0
+    s.set_target(180)
+    prev, peak_v, peak_a, steps = 0.0, 0.0, 0.0, 0
+    while ctl.step():
+        v = ctl.vel[0]
+        peak_v = max(peak_v, abs(v))
+        peak_a = max(peak_a, abs(v - prev) / ctl.dt)
+        prev = v
+        steps += 1
+    print(f"  0->180 at 120 deg/s, 360 deg/s^2: {steps * UPDATE_MS} ms (ideal "
+          f"{settle_time(120, 360, 180) * 1000:.0f}), peak {peak_v:.1f} deg/s, "
+          f"{peak_a:.0f} deg/s^2, final {s.current_angle}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import struct
+import time
+import tracemalloc
+from array import array
+
+from mpu6050 import MPU6050
+
+# Host-side comparison of the per-axis getters against the burst API.
+# FakeI2C serves IMU snapshots and counts transactions, bytes
+# moved and the buffers it had to allocate for the caller; tracemalloc
+# gives the peak Python heap per IMU snapshot. CPython boxes ints above 256,
+# so read_raw_into() shows a small host peak that MicroPython's small ints
+# don't have; the bus allocations are what carries over to the device.
+
+N = 20000
+FREQS = (100000, 400000)
+
+
+class FakeI2C:
+    """Serves a cycle of precomputed 14-byte snapshots at 0x3B.
+
+    Copying into the caller's buffer allocates nothing, so the heap peak
+    measured around a driver call is the driver's own.
+    """
+
+    def __init__(self, n=64):
+        # Drifting accel/gyro, ~25 C die temperature
+        self.samples = [
+            bytearray(struct.pack(">hhhhhhh", (t * 7) % 2000 - 1000, (t * 3) % 2000 - 1000, 16384,
+                                  int((25 - 36.53) * 340), (t * 11) % 500 - 250, -120, 40))
+            for t in range(n)
+        ]
+        self.i = 0
+        self.transactions = 0
+        self.bytes = 0
+        self.allocs = 0
+
+    def _next(self, n):
+        self.transactions += 1
+        self.bytes += n
+        self.i = (self.i + 1) % len(self.samples)
+        return self.samples[self.i]
+
+    def readfrom_mem(self, addr, reg, n):
+        self.allocs += 1
+        return bytes(self._next(n))
+
+    def readfrom_mem_into(self, addr, reg, buf):
+        buf[:] = self._next(len(buf))
+
+    def writeto_mem(self, addr, reg, data):
+        self.transactions += 1
+
+
+def bus_time_s(nbytes, freq):
+    # START, addr+W, reg, repeated START, addr+R, data, STOP; 9 clocks per byte
+    return (3 * 9 + nbytes * 9 + 3) / freq
+
+
+def run(name, snapshot):
+    i2c = FakeI2C()
+    imu = MPU6050(i2c)
+    i2c.transactions = i2c.bytes = i2c.allocs = 0
+
+    t0 = time.perf_counter()
+    for _ in range(N):
+        snapshot(imu)
+    cpu = (time.perf_counter() - t0) / N
+
+    tracemalloc.start()
+    peak = 0
+    for _ in range(200):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        snapshot(imu)
+        peak += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    txn = i2c.transactions / (N + 200)
+    nbytes = i2c.bytes / (N + 200)
+    print(f"{name:22s} {txn:4.1f} txn  {nbytes:5.1f} B  {i2c.allocs / (N + 200):4.1f} bus allocs  "
+          f"{peak / 200:6.0f} B host heap peak  {cpu * 1e6:6.2f} us host CPU")
+    for f in FREQS:
+        bus = txn * bus_time_s(nbytes / txn, f)
+        print(f"{'':22s} @ {f // 1000:3d} kHz: {bus * 1e3:5.2f} ms on the bus -> max {1 / bus:6.0f} Hz")
+
+
+def main():
+    out = array("f", [0] * 7)
+    run("get_accel/gyro/temp", lambda m: (m.get_accel(), m.get_gyro(), m.get_temp()))
+    run("read_all()", lambda m: m.read_all())
+    run("read_into(out)", lambda m: m.read_into(out))
+    run("read_raw_into()", lambda m: m.read_raw_into())
+
+
+if __name__ == "__main__":
+    main()
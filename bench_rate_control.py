@@ -0,0 +1,126 @@
+import numpy as np
+
+from rate_control import (ENV_ALARMS, ENV_DEADBANDS, IMU_ANGLES, IMU_DEADBANDS, SKIP, URGENT,
+                          SendOnDelta, reconstruct)
+from simulate_rover import VirtualRover
+from telemetry_batch import RECORD_OVERHEAD
+from telemetry_codec import FLAG_HAS_ENV, FLAG_HAS_IMU
+from telemetry_stream import StreamEncoder
+
+# Airtime of fixed-timer publishing (IMU 20 Hz, env 1 Hz, as in
+# simulate_rover.py) vs send-on-delta on simulated ten-minute traces,
+# with the error of the ground-side reconstruction and the alarm delay.
+# Airtime is at the mesh's 980 bit/s (see mesh_sim.py).
+
+MINUTES = 10
+IMU_HZ = 20
+ENV_HZ = 1
+BITRATE = 980
+
+
+def traces(kind, seed=1):
+    rng = np.random.default_rng(seed)
+    n_imu = MINUTES * 60 * IMU_HZ
+    n_env = MINUTES * 60 * ENV_HZ
+    t = np.arange(n_imu) / IMU_HZ
+    te = np.arange(n_env) / ENV_HZ
+    if kind == "parked":
+        imu = np.stack([np.full(n_imu, 3.0), np.full(n_imu, 358.0), np.full(n_imu, 120.0)], 1)
+        imu += rng.normal(0, 0.1, imu.shape)
+    elif kind == "driving":
+        turn = np.cumsum(np.where(rng.random(n_imu) < 0.002, rng.normal(0, 4, n_imu), 0))
+        imu = np.stack([3 * np.sin(2 * np.pi * 0.3 * t), 2 * np.sin(2 * np.pi * 0.5 * t + 1),
+                        np.cumsum(turn) / IMU_HZ], 1) + rng.normal(0, 0.2, (n_imu, 3))
+    elif kind == "tumbling":
+        imu = np.stack([40 * t, 30 * t, 90 * t], 1) + rng.normal(0, 0.2, (n_imu, 3))
+    else:  # simulate_rover.py's random walk
+        rover = VirtualRover(0, None, "", None, seed=seed)
+        imu = np.array([[p["pitch"], p["roll"], p["yaw"]]
+                        for p in (rover.imu_payload() for _ in range(n_imu))])
+        env = np.array([[p["temp"], p["light"], p["vibe"], p["ir_storm"]]
+                        for p in (rover.sensor_payload() for _ in range(n_env))], np.float64)
+        return t, imu % 360, te, env
+    env = np.stack([22 + 0.002 * te + rng.normal(0, 0.05, n_env),
+                    500 + 200 * (te // 120 % 2) + rng.normal(0, 5, n_env),
+                    np.zeros(n_env), np.zeros(n_env)], 1)
+    # A few tremors and one dust storm
+    for start in rng.integers(0, n_env - 10, 4):
+        env[start:start + 3, 2] = rng.integers(20, 80)
+    env[300:340, 3] = 1
+    return t, imu % 360, te, env
+
+
+def publish(t, x, sod, flags, stream, imu):
+    """Bytes on air, send times and held values; sod None = every sample."""
+    enc = StreamEncoder(stream, keyframe_interval=20)
+    total, seq, times, vals, alarm_delay = 0, 0, [], [], []
+    for k in range(len(t)):
+        now = int(t[k] * 1000)
+        if sod is None:
+            held = x[k]
+        else:
+            action = sod.update(x[k], now)
+            if action == SKIP:
+                continue
+            held = list(sod.held)
+            if action == URGENT:
+                alarm_delay.append(0)
+        if imu:
+            n = enc.encode_into(seq, pitch=held[0], roll=held[1], yaw=held[2], flags=flags)
+        else:
+            n = enc.encode_into(seq, temp=held[0], light=held[1], vibe=held[2],
+                                ir_storm=bool(held[3]), flags=flags)
+        total += n + RECORD_OVERHEAD
+        seq += 1
+        times.append(t[k])
+        vals.append(list(held))
+    return total, np.array(times), np.array(vals), len(alarm_delay)
+
+
+def error(t, x, st, sv, col, angle):
+    rec = reconstruct(st, sv[:, col], t, "linear", angle)
+    d = rec - x[:, col]
+    if angle:
+        d = (d + 180) % 360 - 180
+    return np.sqrt(np.mean(d * d)), np.abs(d).max()
+
+
+def main():
+    print(f"{MINUTES} min, IMU {IMU_HZ} Hz + env {ENV_HZ} Hz, airtime at {BITRATE} bit/s")
+    for kind in ("parked", "driving", "tumbling", "random walk"):
+        t, imu, te, env = traces(kind)
+        fixed = publish(t, imu, None, FLAG_HAS_IMU, 0, True)[0] + \
+            publish(te, env, None, FLAG_HAS_ENV, 1, False)[0]
+        imu_sod = SendOnDelta(IMU_DEADBANDS, heartbeat_ms=10000, angles=IMU_ANGLES)
+        env_sod = SendOnDelta(ENV_DEADBANDS, heartbeat_ms=30000, alarms=ENV_ALARMS)
+        bi, st, sv, _ = publish(t, imu, imu_sod, FLAG_HAS_IMU, 0, True)
+        be, ste, sve, alarms = publish(te, env, env_sod, FLAG_HAS_ENV, 1, False)
+        rms, worst = error(t, imu, st, sv, 0, True)
+        trms, tworst = error(te, env, ste, sve, 0, False)
+        alarm_changes = int((np.diff(env[:, 2:], axis=0) != 0).any(axis=1).sum())
+        secs = MINUTES * 60
+        print(f"  {kind:11s} fixed {fixed * 8 / BITRATE / secs * 100:6.1f}% airtime  "
+              f"send-on-delta {(bi + be) * 8 / BITRATE / secs * 100:5.1f}%  "
+              f"({(1 - (bi + be) / fixed) * 100:4.1f}% saved, {imu_sod.sent + env_sod.sent} frames)  "
+              f"pitch err rms {rms:4.2f} max {worst:4.2f} deg  temp rms {trms:4.2f}  "
+              f"alarms sent {alarms}/{alarm_changes} at once")
+        assert alarms == alarm_changes
+
+    # An alarm change on the heartbeat tick still goes out urgent
+    sod = SendOnDelta(ENV_DEADBANDS, heartbeat_ms=30000, alarms=ENV_ALARMS)
+    sod.update((20, 100, 0, 0), 0)
+    assert sod.update((20, 100, 80, 1), 30000) == URGENT
+
+    print("driving trace vs link margin:")
+    t, imu, te, env = traces("driving")
+    for margin in (12, 6, 3, 0):
+        sod = SendOnDelta(IMU_DEADBANDS, heartbeat_ms=10000, min_interval_ms=100, angles=IMU_ANGLES)
+        scale = sod.set_margin(margin)
+        b, st, sv, _ = publish(t, imu, sod, FLAG_HAS_IMU, 0, True)
+        rms, worst = error(t, imu, st, sv, 0, True)
+        print(f"  margin {margin:2d} dB  scale {scale:4.1f}  IMU {b * 8 / MINUTES / 60:6.1f} bit/s  "
+              f"pitch err rms {rms:4.2f} max {worst:4.2f} deg")
+
+
+if __name__ == "__main__":
+    main()
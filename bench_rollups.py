@@ -0,0 +1,104 @@
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from rollups import FIELDS, RollupEngine, lttb
+from tsstore import ColumnStore
+
+# 24 h of simulate_rover.py traffic: 20 Hz IMU random walk + 1 Hz sensors
+HOURS = 24
+POINTS = 500
+T0 = 1.7e9
+
+
+def simulated_history(hours, seed=1):
+    rng = np.random.default_rng(seed)
+    n_imu = hours * 3600 * 20
+    n_env = hours * 3600
+    t = np.concatenate((T0 + np.arange(n_imu) / 20, T0 + np.arange(n_env)))
+    x = np.full((n_imu + n_env, len(FIELDS)), np.nan)
+    col = {f: i for i, f in enumerate(FIELDS)}
+    for f, scale in (("pitch", 2), ("roll", 2), ("yaw", 1)):
+        x[:n_imu, col[f]] = np.cumsum(rng.uniform(-scale, scale, n_imu)) % 360
+    x[n_imu:, col["temp"]] = 22 + np.cumsum(rng.uniform(-0.5, 0.5, n_env))
+    x[n_imu:, col["light"]] = rng.integers(300, 801, n_env)
+    x[n_imu:, col["vibe"]] = rng.random(n_env) > 0.9
+    x[n_imu:, col["ir_storm"]] = rng.random(n_env) > 0.95
+    order = np.argsort(t, kind="stable")
+    return t[order], x[order]
+
+
+def main():
+    t, x = simulated_history(HOURS)
+    print(f"{len(t)} raw samples over {HOURS} h")
+
+    eng = RollupEngine()
+    t0 = time.perf_counter()
+    for i in range(0, len(t), 4096):
+        eng.add_many(t[i:i + 4096], x[i:i + 4096])
+    dt = time.perf_counter() - t0
+    print(f"rollup ingest (vectorized)  {len(t) / dt:12.0f} samples/s")
+
+    eng2 = RollupEngine()
+    n = 200000
+    samples = [{"t": t[i], "pitch": x[i, 4], "roll": x[i, 5], "yaw": x[i, 6]} for i in range(n)]
+    t0 = time.perf_counter()
+    for s in samples:
+        eng2.add(s)
+    eng2.flush()
+    dt = time.perf_counter() - t0
+    print(f"rollup ingest (per sample)  {n / dt:12.0f} samples/s")
+
+    pitch = x[:, FIELDS.index("pitch")]
+    imu = ~np.isnan(pitch)
+    for span in (60, 3600, 6 * 3600, HOURS * 3600):
+        q0, q1 = T0 + 600, T0 + 600 + span
+        t0 = time.perf_counter()
+        for _ in range(10):
+            ht, hy = eng.history("pitch", q0, q1, POINTS)
+        rollup_ms = (time.perf_counter() - t0) * 100
+
+        # Baseline: LTTB straight over the raw samples in range
+        t0 = time.perf_counter()
+        sel = imu & (t >= q0) & (t < q1)
+        idx = lttb(t[sel], pitch[sel], POINTS)
+        raw_ms = (time.perf_counter() - t0) * 1000
+
+        res = eng.pick(q0, q1, POINTS).res
+        print(f"range {span:6d} s  res {res:5d} s  {len(ht):4d} pts  "
+              f"rollup+LTTB {rollup_ms:7.2f} ms   raw LTTB ({sel.sum():8d} samples) {raw_ms:8.2f} ms")
+
+    fleet()
+
+
+def fleet(rovers=3, seconds=3600):
+    # Interleaved rovers at different temperatures stay separate series,
+    # live and after a rebuild from the store
+    root = tempfile.mkdtemp()
+    try:
+        store = ColumnStore(root)
+        eng = RollupEngine()
+        for k in range(seconds):
+            for r in range(rovers):
+                s = {"t": T0 + k, "temp": 10.0 * (r + 1)}
+                store.append(s, r)
+                eng.add(s, r)
+        store.flush()
+        eng.flush()
+        rebuilt = RollupEngine()
+        rebuilt.rebuild(store)
+        for e in (eng, rebuilt):
+            for r in range(rovers):
+                _, _, lo, hi, cnt = e.series("temp", T0, T0 + seconds, 60, rover=r)
+                assert cnt.sum() == seconds and lo.min() == hi.max() == 10.0 * (r + 1)
+        print(f"fleet  {rovers} rovers x {seconds} s: per-rover rollups, live and rebuilt, "
+              f"keep their own temp series")
+        store.close()
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
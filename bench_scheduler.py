@@ -0,0 +1,79 @@
+import tracemalloc
+
+from scheduler import Scheduler, SampleBus
+
+# Wakeups per second: one asyncio loop per driver script (the intervals
+# hard-coded in ldr.py, MIC.py, ir_digital.py, dhtasync.py,
+# vibration-sensor.py, servoasync.py) vs the rover_node.py task set on one
+# Scheduler, run on a virtual millisecond clock. Also checks that the
+# sample bus allocates nothing per sample and that overruns are counted.
+
+SECONDS = 60
+
+# name -> sleep interval of the standalone scripts' loops (ms)
+STANDALONE = {
+    "ir poll": 1, "ir print": 100, "mic": 50, "dht": 100,
+    "ldr": 500, "vibe": 1000, "servo": 20,
+}
+
+# rover_node.py: name, period ms, deadline ms, simulated run time ms
+NODE = (
+    ("imu", 40, 20, 2),
+    ("ir", 50, 50, 0),
+    ("sound", 1000, 100, 32),
+    ("vibe", 100, 100, 0),
+    ("light", 500, 500, 0),
+    ("publish", 50, 50, 3),
+)
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def simulate(coalesce_ms):
+    clock = VirtualClock()
+    bus = SampleBus()
+    sched = Scheduler(coalesce_ms=coalesce_ms, clock=clock)
+    for name, period, deadline, cost in NODE:
+        def step(now, name=name, cost=cost):
+            bus.put(0, now, 1.0)
+            clock.now += cost
+        sched.add(name, step, period_ms=period, deadline_ms=deadline)
+    while clock.now < SECONDS * 1000:
+        clock.now += max(1, sched.run_due())
+    return sched
+
+
+def main():
+    standalone = sum(1000 / ms for ms in STANDALONE.values())
+    print(f"standalone scripts     {standalone:7.0f} wakeups/s")
+    for coalesce in (0, 4, 10):
+        sched = simulate(coalesce)
+        print(f"scheduler coalesce {coalesce:2d}  {sched.wakeups / SECONDS:7.0f} wakeups/s")
+        for name, runs, overruns, missed, errors, late, run in sched.stats():
+            print(f"    {name:8s} {runs / SECONDS:6.1f} Hz  overruns {overruns:4d}  missed {missed:3d}  "
+                  f"max late {late:3d} ms")
+
+    bus = SampleBus(64)
+    cur = bus.cursor()
+    for i in range(100):
+        bus.put(1, i, 1.0, 2.0, 3.0)
+        cur.next()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for i in range(10000):
+        bus.put(3, 1000, 0.5, 0.25, 0.125)
+        cur.next()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    grown = sum(s.size_diff for s in after.compare_to(before, "filename") if "scheduler" in str(s))
+    print(f"sample bus: {grown} bytes retained after 10000 put/next")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import json
+import random
+import time
+
+from telemetry_codec import FRAME_SIZE, decode_frame, encode_frame, encode_frame_into
+
+# Link budget bitrate from linkb.txt (U_bitrate = 980e-6 Mbit/s)
+LINK_BPS = 980
+N = 50000
+
+
+def format_sensor_data(temp, light, vibe, ir_storm, pitch, roll, yaw):
+    # Legacy JSON formatter from data-publish-mqtt-packet.py
+    data = (
+        '{"temp": %.1f, "light": %d, "vibe": %d, '
+        '"ir_storm": %s, "pitch": %.2f, "roll": %.2f, "yaw": %.2f}'
+        % (
+            temp / 10,
+            light,
+            vibe,
+            'true' if ir_storm else 'false',
+            pitch / 100,
+            roll / 100,
+            yaw / 100
+        )
+    )
+    return data
+
+
+def make_samples(n, seed=1):
+    rng = random.Random(seed)
+    temp, p, r, y = 22.0, 0.0, 0.0, 0.0
+    out = []
+    for _ in range(n):
+        temp += rng.uniform(-0.5, 0.5)
+        p += rng.uniform(-2, 2)
+        r += rng.uniform(-2, 2)
+        y += rng.uniform(-1, 1)
+        out.append({
+            "temp": round(temp, 2),
+            "light": rng.randint(300, 800),
+            "vibe": 1 if rng.random() > 0.9 else 0,
+            "ir_storm": rng.random() > 0.95,
+            "pitch": round(p % 360, 2),
+            "roll": round(r % 360, 2),
+            "yaw": round(y % 360, 2),
+        })
+    return out
+
+
+def timed(fn, items):
+    t0 = time.perf_counter()
+    out = [fn(x) for x in items]
+    return out, time.perf_counter() - t0
+
+
+def report(name, sizes, enc_s, dec_s=None):
+    avg = sum(sizes) / len(sizes)
+    dec = f"dec {len(sizes) / dec_s:10.0f}/s" if dec_s else ""
+    print(f"{name:<22} {avg:7.1f} B/frame  "
+          f"{avg * 8 / LINK_BPS * 1000:7.1f} ms airtime  "
+          f"enc {len(sizes) / enc_s:10.0f}/s  {dec}")
+
+
+def main():
+    samples = make_samples(N)
+
+    # simulate_rover.py JSON path
+    msgs, enc_s = timed(json.dumps, samples)
+    _, dec_s = timed(json.loads, msgs)
+    report("json.dumps", [len(m) for m in msgs], enc_s, dec_s)
+
+    # data-publish-mqtt-packet.py legacy % formatter
+    def legacy(s):
+        return format_sensor_data(s["temp"] * 10, s["light"], s["vibe"], s["ir_storm"],
+                                  s["pitch"] * 100, s["roll"] * 100, s["yaw"] * 100)
+    msgs, enc_s = timed(legacy, samples)
+    _, dec_s = timed(json.loads, msgs)
+    report("format_sensor_data", [len(m) for m in msgs], enc_s, dec_s)
+
+    # Binary frame, fresh bytes per message
+    seq = iter(range(N))
+    frames, enc_s = timed(lambda s: encode_frame(next(seq), **s), samples)
+    _, dec_s = timed(decode_frame, frames)
+    report("encode_frame", [len(f) for f in frames], enc_s, dec_s)
+
+    # Binary frame into a reused buffer (device path)
+    buf = bytearray(FRAME_SIZE)
+    seq = iter(range(N))
+    _, enc_s = timed(lambda s: encode_frame_into(buf, next(seq), **s), samples)
+    report("encode_frame_into", [FRAME_SIZE] * N, enc_s)
+
+
+if __name__ == "__main__":
+    main()
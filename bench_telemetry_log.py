@@ -0,0 +1,179 @@
+import asyncio
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from simulate_rover import FleetStats, VirtualRover
+from telemetry_log import LogReader, LogWriter, Replayer
+
+# Capture size, seek cost and replay timing for telemetry_log.py. The
+# capture is ROVERS rovers publishing unbatched like simulate_rover.py
+# (--imu-batch 1 --sensor-batch 1) for HOURS, one VirtualRover trace
+# shifted per rover, received with a little network jitter.
+
+ROVERS = 40
+HOURS = 1
+START = 1.7e9
+
+
+class Trace:
+    """Client + clock for a VirtualRover stepped on virtual time."""
+
+    def __init__(self):
+        self.now = 0
+        self.sent = []
+
+    def __call__(self):
+        return self.now
+
+    def publish(self, topic, payload, qos=0):
+        self.sent.append((self.now / 1000, payload))
+
+
+def rover_trace(seconds):
+    trace = Trace()
+    rover = VirtualRover(0, trace, "trace", FleetStats(), imu_batch=1, sensor_batch=1)
+    rover.imu_batcher.clock = rover.sensor_batcher.clock = trace
+    for tick in range(seconds * 20):
+        trace.now = tick * 50
+        rover.imu_step()
+        if tick % 20 == 10:
+            rover.sensor_step()
+    return trace.sent
+
+
+def capture(path):
+    trace = rover_trace(HOURS * 3600)
+    rng = random.Random(1)
+    msgs = []
+    for k in range(ROVERS):
+        topic = "mars/rover/%d/telemetry" % k
+        phase = rng.random()
+        for t, payload in trace:
+            msgs.append((START + t + phase + rng.expovariate(200), topic, payload))
+    msgs.sort(key=lambda m: m[0])
+
+    t0 = time.perf_counter()
+    w = LogWriter(path)
+    for t, topic, payload in msgs:
+        w.write(topic, payload, t)
+    w.close()
+    dt = time.perf_counter() - t0
+    payload_bytes = sum(len(m[2]) for m in msgs)
+    size = os.path.getsize(path)
+    print(f"write    {len(msgs)} messages in {dt:.1f} s ({len(msgs) / dt / 1e3:.0f}k msg/s), "
+          f"{size / 1e6:.1f} MB: {(size - payload_bytes) / len(msgs):.1f} B/msg over "
+          f"{payload_bytes / len(msgs):.1f} B payload, index {os.path.getsize(path + '.idx') / 1e3:.0f} kB")
+    return msgs
+
+
+def read_back(path, msgs):
+    t0 = time.perf_counter()
+    r = LogReader(path)
+    t_open = time.perf_counter() - t0
+    assert len(r.topics) == ROVERS
+
+    t0 = time.perf_counter()
+    n = 0
+    for _ in r.records():
+        n += 1
+    t_scan = time.perf_counter() - t0
+    assert n == len(msgs)
+
+    # Python allocations while opening and walking the whole capture
+    r.close()
+    tracemalloc.start()
+    r = LogReader(path)
+    for _ in r.records():
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    for (t, tid, payload), (mt, topic, mp) in zip(r.records(), msgs):
+        assert abs(t - mt) < 2e-6 and r.topics[tid] == topic and payload == mp
+
+    rng = random.Random(2)
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        t = r.start + rng.random() * (r.end - r.start)
+        first = next(r.records(t))
+        assert first[0] >= t
+    t_seek = (time.perf_counter() - t0) / 1000
+    print(f"read     open {t_open * 1e3:.1f} ms, full scan {n / t_scan / 1e3:.0f}k msg/s, "
+          f"seek to a time {t_seek * 1e6:.0f} us, peak Python heap {peak / 1e6:.1f} MB "
+          f"for a {r.end_offset / 1e6:.0f} MB capture")
+    r.close()
+
+
+def recovery(path, msgs):
+    # Kill mid-capture: the index stops halfway and the last record is torn
+    d = tempfile.mkdtemp()
+    try:
+        p = os.path.join(d, "torn.tlog")
+        shutil.copy(path, p)
+        with open(path + ".idx", "rb") as f:
+            idx = f.read()
+        with open(p + ".idx", "wb") as f:
+            f.write(idx[:len(idx) // 32 * 16])
+        with open(p, "r+b") as f:
+            f.truncate(os.path.getsize(path) - 3)
+        r = LogReader(p)
+        n = sum(1 for _ in r.records())
+        r.close()
+        assert n == len(msgs) - 1, n
+
+        w = LogWriter(p)
+        t, topic, payload = msgs[-1]
+        w.write(topic, payload, t)
+        w.close()
+        r = LogReader(p)
+        got = list(r.records(t - 1))[-1]
+        assert n + 1 == sum(1 for _ in r.records()) and got[2] == payload
+        r.close()
+        print(f"recover  torn tail + half index: {n} of {len(msgs)} messages back, writer resumed cleanly")
+    finally:
+        shutil.rmtree(d)
+
+
+def replay(path):
+    r = LogReader(path)
+    sent = []
+
+    def publish(topic, payload, k):
+        sent.append(topic)
+
+    for label, speed, rovers, seconds in (("1x", 1, 1, 5), ("10x", 10, 1, 60),
+                                          ("1x x100", 1, 100, 3), ("max", 0, 1, 600)):
+        sent.clear()
+        start = r.start + 600
+        rep = Replayer(r, publish, speed=speed, rovers=rovers, stagger=1.0,
+                       start=start, stop=start + seconds)
+        t0 = time.perf_counter()
+        asyncio.run(rep.run())
+        wall = time.perf_counter() - t0
+        snap = rep.stats.snapshot()
+        expect = sum(1 for _ in r.records(start, start + seconds)) * rovers
+        assert len(sent) == expect == snap["messages"]
+        print(f"replay   {label:<9} {seconds:>4} s of capture in {wall:5.2f} s wall, "
+              f"{len(sent) / wall / 1e3:6.1f}k msg/s, {len(set(sent)):>4} topics, "
+              f"late p50 {snap['late_p50_ms']:.2f} ms p99 {snap['late_p99_ms']:.2f} ms")
+    r.close()
+
+
+def main():
+    d = tempfile.mkdtemp()
+    try:
+        path = os.path.join(d, "capture.tlog")
+        msgs = capture(path)
+        read_back(path, msgs)
+        recovery(path, msgs)
+        replay(path)
+    finally:
+        shutil.rmtree(d)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import json
+import random
+
+from telemetry_codec import FLAG_HAS_ENV, FLAG_HAS_IMU, FRAME_SIZE, encode_frame
+from telemetry_stream import StreamDecoder, StreamEncoder
+
+# Link budget bitrate from linkb.txt (U_bitrate = 980e-6 Mbit/s)
+LINK_BPS = 980
+SECONDS = 600
+
+
+def imu_trace(seconds, seed=1):
+    # simulate_imu: 20 Hz random walk, constant env placeholders
+    rng = random.Random(seed)
+    p, r, y = 0.0, 0.0, 0.0
+    for _ in range(seconds * 20):
+        p += rng.uniform(-2, 2)
+        r += rng.uniform(-2, 2)
+        y += rng.uniform(-1, 1)
+        yield {
+            "temp": 22.5,
+            "light": 500,
+            "vibe": 0,
+            "ir_storm": False,
+            "pitch": round(p % 360, 2),
+            "roll": round(r % 360, 2),
+            "yaw": round(y % 360, 2),
+        }
+
+
+def env_trace(seconds, seed=2):
+    # simulate_sensors: 1 Hz drifting temp, random light, rare alarms
+    rng = random.Random(seed)
+    temp = 22.0
+    for _ in range(seconds):
+        temp += rng.uniform(-0.5, 0.5)
+        yield {
+            "temp": round(temp, 2),
+            "light": rng.randint(300, 800),
+            "vibe": 1 if rng.random() > 0.9 else 0,
+            "ir_storm": rng.random() > 0.95,
+        }
+
+
+def run(name, samples, flags, stream_id, keyframe_interval):
+    enc = StreamEncoder(stream_id, keyframe_interval)
+    dec = StreamDecoder()
+    json_bytes = frame_bytes = stream_bytes = 0
+    for seq, s in enumerate(samples):
+        json_bytes += len(json.dumps(s))
+        frame = encode_frame(seq, flags=flags, **s)
+        frame_bytes += len(frame)
+        msg = enc.encode(seq, flags=flags, **s)
+        stream_bytes += len(msg)
+        ref = StreamDecoder().decode(frame)
+        got = dec.decode(msg)
+        ref.pop("seq"), got.pop("seq")
+        assert got == ref, (seq, got, ref)
+
+    print(f"{name:<10} kf/{keyframe_interval:<3} "
+          f"json {json_bytes * 8 / SECONDS:7.1f} bit/s  "
+          f"frame {frame_bytes * 8 / SECONDS:6.1f} bit/s  "
+          f"stream {stream_bytes * 8 / SECONDS:6.1f} bit/s  "
+          f"ratio vs json {json_bytes / stream_bytes:5.1f}x  "
+          f"vs frame {frame_bytes / stream_bytes:4.2f}x  "
+          f"link {stream_bytes * 8 / SECONDS / LINK_BPS:6.1%}")
+
+
+def resync(keyframe_interval, trials=1000, seed=3):
+    # Join mid-stream and count deltas dropped before the first keyframe
+    rng = random.Random(seed)
+    samples = list(imu_trace(60))
+    enc = StreamEncoder(0, keyframe_interval)
+    msgs = [enc.encode(seq, **s) for seq, s in enumerate(samples)]
+    worst = total = 0
+    for _ in range(trials):
+        dec = StreamDecoder()
+        start = rng.randrange(len(msgs) - keyframe_interval)
+        for m in msgs[start:]:
+            if dec.decode(m) is not None:
+                break
+        worst = max(worst, dec.dropped)
+        total += dec.dropped
+    print(f"resync kf/{keyframe_interval:<3} mean {total / trials:5.1f} "
+          f"worst {worst} frames dropped after joining mid-stream")
+
+
+def main():
+    print(f"keyframe = {FRAME_SIZE} B, {SECONDS} s simulated")
+    for kf in (10, 20, 50):
+        run("imu 20Hz", imu_trace(SECONDS), FLAG_HAS_ENV | FLAG_HAS_IMU, 0, kf)
+        run("env 1Hz", env_trace(SECONDS), FLAG_HAS_ENV, 1, kf)
+    for kf in (10, 20, 50):
+        resync(kf)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import random
+import time
+import tracemalloc
+
+from tremor import BUMP, QUIET, TREMOR, EdgeRing, TremorWindow
+
+# Vibration edge capture on a virtual microsecond clock: how bursts are
+# graded, how many edges per second each ring size survives at a given
+# drain period before the ISR has to drop stamps, and what one ISR push
+# costs. The old handler kept only the last edge time, so every scenario
+# below read as vibe = 1.
+
+KINDS = {QUIET: "quiet", BUMP: "bump", TREMOR: "tremor"}
+WINDOW_MS = 500
+
+
+def bump(t0):
+    return [t0, t0 + 3000]
+
+
+def burst(t0, edges, spacing_us):
+    return [t0 + i * spacing_us for i in range(edges)]
+
+
+def chatter(t0, hz, ms, seed=1):
+    rng = random.Random(seed)
+    out, t = [], t0
+    while t < t0 + ms * 1000:
+        t += int(rng.expovariate(hz) * 1000000)
+        out.append(t)
+    return out
+
+
+SCENARIOS = (
+    ("still", []),
+    ("single knock", bump(100000)),
+    ("three knocks", bump(50000) + bump(200000) + bump(400000)),
+    ("50-edge rattle", burst(100000, 50, 5000)),
+    ("200 Hz shake", burst(0, 100, 5000)),
+    ("random 40 Hz", chatter(0, 40, WINDOW_MS)),
+)
+
+
+def grade(edges, drain_ms=100):
+    ring = EdgeRing(128)
+    win = TremorWindow(WINDOW_MS)
+    win.win_start = 0
+    win.last_edge = 0
+    i = 0
+    for now in range(0, WINDOW_MS * 1000 + 1, drain_ms * 1000):
+        while i < len(edges) and edges[i] <= now:
+            ring.push(edges[i])
+            i += 1
+        win.update(ring, now)
+    return win
+
+
+def max_rate(size, drain_ms, seconds=2):
+    """Highest Poisson edge rate (Hz) with no overflow over the run."""
+    best = 0
+    for hz in (50, 100, 200, 400, 800, 1600, 3200, 6400, 12800, 25600):
+        ring = EdgeRing(size)
+        win = TremorWindow(WINDOW_MS)
+        win.win_start = 0
+        edges = chatter(0, hz, seconds * 1000, seed=hz)
+        i = 0
+        for now in range(0, seconds * 1000000, drain_ms * 1000):
+            while i < len(edges) and edges[i] <= now:
+                ring.push(edges[i])
+                i += 1
+            win.update(ring, now)
+        if ring.overflows:
+            break
+        best = hz
+    return best
+
+
+def main():
+    print(f"{WINDOW_MS} ms windows, bursts split at 50 ms gaps, tremor >= 4 edges")
+    for name, edges in SCENARIOS:
+        w = grade(edges)
+        print(f"  {name:15s} edges {w.edges:4d}  rate {w.edge_rate:6.1f} Hz  burst {w.burst_ms:4d} ms  "
+              f"duty {w.duty:4.2f}  -> {KINDS[w.kind]:6s} vibe {w.intensity:3d}")
+
+    print("edges/s before the ring overflows (Poisson arrivals):")
+    for drain_ms in (10, 100, 500):
+        cells = "  ".join(f"ring {size:3d}: {max_rate(size, drain_ms):6d}" for size in (32, 128, 512))
+        print(f"  drain every {drain_ms:3d} ms  {cells}")
+
+    ring = EdgeRing(128)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    t0 = time.perf_counter()
+    for i in range(100000):
+        ring.push(i)
+        ring.tail = ring.head
+    took = (time.perf_counter() - t0) / 100000 * 1e6
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    grown = sum(s.size_diff for s in after.compare_to(before, "filename") if "tremor" in str(s))
+    print(f"ISR push: {took:.2f} us on CPython, {grown} bytes retained after 100000 pushes")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import network
 import time
 from umqtt.simple import MQTTClient
 import machine
+from outbox import Outbox, Uplink
 
 # ================= WiFi =================
 SSID = "Pixel_2085"
@@ -11,13 +12,14 @@ PASSWORD = "7736899422"
 MQTT_BROKER = "broker.mqtt.cool"
 MQTT_PORT = 1883
 TOPIC = b"hardwarehacka/team18"
+BACKLOG_TOPIC = b"hardwarehacka/team18/backlog"
 CLIENT_ID = b"esp32c3_team18"
 
 # ================= LED (optional) =================
 led = machine.Pin(8, machine.Pin.OUT)
 
 # ================= WiFi Connect =================
-def connect_wifi():
+def connect_wifi(timeout_ms=15000):
     wlan = network.WLAN(network.STA_IF)
     wlan.active(True)
 
@@ -25,7 +27,10 @@ def connect_wifi():
         print("Connecting to WiFi...")
         wlan.connect(SSID, PASSWORD)
 
+        start = time.ticks_ms()
         while not wlan.isconnected():
+            if time.ticks_diff(time.ticks_ms(), start) > timeout_ms:
+                raise OSError("WiFi connect timeout")
             time.sleep(0.5)
             print(".", end="")
 
@@ -46,23 +51,32 @@ def connect_mqtt():
     print("MQTT connected")
     return client
 
+def connect():
+    connect_wifi()
+    return connect_mqtt()
+
+def on_disconnect():
+    print("Uplink lost, storing to flash")
+    led.off()
+
 # ================= Main =================
-connect_wifi()
-mqtt = connect_mqtt()
+uplink = Uplink(
+    connect,
+    TOPIC,
+    Outbox("/outbox", segment_size=2048, max_segments=4),
+    backlog_topic=BACKLOG_TOPIC,
+    on_connect=led.on,
+    on_disconnect=on_disconnect
+)
 
 counter = 0
 
 while True:
-    try:
-        msg = str(counter)
-        print("Publishing:", msg)
-        mqtt.publish(TOPIC, msg)
-        counter += 1
-        time.sleep(2)
-
-    except Exception as e:
-        print("Error:", e)
-        led.off()
-        time.sleep(3)
-        machine.reset()
+    # Reconnects with backoff and drains the flash backlog
+    uplink.service()
+    msg = str(counter).encode()
+    print("Publishing:", msg)
+    uplink.send(msg)
+    counter += 1
+    time.sleep(2)
 
@@ -0,0 +1,351 @@
+import argparse
+import asyncio
+import base64
+import collections
+import hashlib
+import json
+import os
+import struct
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from ground_ingest import BROKER, PORT, TOPICS, Ingestor, IngestService
+
+# ================= Dashboard gateway =================
+# One MQTT subscription for every dashboard. Decoded samples only update a
+# per-rover view; at DISPLAY_HZ the changes since the last tick are
+# serialised once and the same bytes go to every browser over a WebSocket.
+# A new client gets a snapshot (latest state + chart window) first.
+#
+#   {"type": "snapshot" | "delta", "rovers": {"<id>": {"s": {...}, "c": [...]}}}
+#
+# "s" holds the fields that changed since the last frame, "c" the new
+# chart points as [t, temp, light]. Alarm fields are latched over the
+# frame instead of overwritten, so a one-sample ir_storm or tremor is
+# never coalesced away. A client whose socket backs up skips frames and
+# is resynced with a snapshot once it drains.
+#
+# The page itself is served from the same port, so opening
+# http://<gateway>:8080/ is all a viewer needs; ?rover=N picks a rover.
+
+DISPLAY_HZ = 5
+HTTP_PORT = 8080
+PAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard.html")
+CHART_POINTS = 20  # same window as dashboard.html
+MAX_BUFFER = 256 << 10  # bytes queued to a client before frames are skipped
+MAX_FRAME = 4096  # largest client frame read; clients only send control frames
+LIVE_TOPICS = [t for t in TOPICS if not t.endswith(("/backlog", "/health"))]
+
+STATE_KEYS = ("pitch", "roll", "yaw", "temp", "light")
+ALARM_KEYS = ("vibe", "ir_storm")
+
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_TEXT, OP_CLOSE, OP_PING, OP_PONG = 0x1, 0x8, 0x9, 0xA
+
+
+def ws_frame(payload, opcode=OP_TEXT):
+    """One unmasked, unfragmented server frame."""
+    n = len(payload)
+    if n < 126:
+        head = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 65536:
+        head = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        head = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return head + payload
+
+
+async def ws_read(reader, max_frame=MAX_FRAME):
+    """(opcode, payload) of the next frame; clients always mask. A frame
+    longer than max_frame raises ValueError before its payload is read."""
+    b0, b1 = await reader.readexactly(2)
+    n = b1 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if n > max_frame:
+        raise ValueError("frame of %d bytes" % n)
+    mask = await reader.readexactly(4) if b1 & 0x80 else None
+    data = await reader.readexactly(n) if n else b""
+    if mask:
+        data = bytes(b ^ mask[i & 3] for i, b in enumerate(data))
+    return b0 & 0x0F, data
+
+
+def ws_accept(key):
+    return base64.b64encode(hashlib.sha1(key.encode() + WS_GUID).digest()).decode()
+
+
+class RoverView:
+    def __init__(self, chart_points=CHART_POINTS):
+        self.state = {}                                  # latest of every field
+        self.chart = collections.deque(maxlen=chart_points)
+        self.changed = {}                                # since the last frame
+        self.points = []
+        self.sent = {}                                   # as of the last frame
+
+    def add(self, s):
+        state = self.state
+        changed = self.changed
+        for k in STATE_KEYS:
+            v = s.get(k)
+            if v is not None:
+                state[k] = changed[k] = round(v, 2) if isinstance(v, float) else v
+        v = s.get("vibe")
+        if v is not None:
+            state["vibe"] = v
+            changed["vibe"] = max(v, changed.get("vibe", 0))
+        v = s.get("ir_storm")
+        if v is not None:
+            state["ir_storm"] = v
+            changed["ir_storm"] = v or changed.get("ir_storm", False)
+        if "temp" in s and "light" in s:
+            self.points.append([round(s["t"], 1), state["temp"], state["light"]])
+
+    def delta(self):
+        """{"s", "c"} for the next frame, or None if nothing changed."""
+        sent = self.sent
+        out = {}
+        for k, v in self.changed.items():
+            if k in ALARM_KEYS or sent.get(k) != v:
+                out[k] = sent[k] = v
+        self.changed = {}
+        points = self.points[-self.chart.maxlen:]
+        self.points = []
+        self.chart.extend(points)
+        if not out and not points:
+            return None
+        frame = {}
+        if out:
+            frame["s"] = out
+        if points:
+            frame["c"] = points
+        return frame
+
+    def snapshot(self):
+        return {"s": dict(self.state), "c": list(self.chart)}
+
+
+class DashState:
+    def __init__(self, chart_points=CHART_POINTS):
+        """Per-rover views; has ColumnStore's append(sample, rover) so an
+        Ingestor can feed it directly."""
+        self.chart_points = chart_points
+        self.rovers = {}
+        self.samples = 0
+
+    def append(self, s, rover=0):
+        view = self.rovers.get(rover)
+        if view is None:
+            view = self.rovers[rover] = RoverView(self.chart_points)
+        view.add(s)
+        self.samples += 1
+
+    def deltas(self):
+        """{rover: JSON fragment} of every rover that changed."""
+        out = {}
+        for rover, view in self.rovers.items():
+            d = view.delta()
+            if d is not None:
+                out[rover] = json.dumps(d, separators=(",", ":"))
+        return out
+
+    def snapshot(self, rovers=None):
+        ids = self.rovers if rovers is None else [r for r in rovers if r in self.rovers]
+        return {str(r): self.rovers[r].snapshot() for r in ids}
+
+
+def frame_message(kind, fragments, rovers=None):
+    """Assemble a frame from per-rover JSON fragments (rovers=None: all)."""
+    ids = fragments if rovers is None else [r for r in rovers if r in fragments]
+    body = ",".join('"%d":%s' % (r, fragments[r]) for r in ids)
+    return ('{"type":"%s","rovers":{%s}}' % (kind, body)).encode()
+
+
+class Client:
+    def __init__(self, writer, rovers=None):
+        self.writer = writer
+        self.rovers = rovers  # None: every rover
+        self.resync = False
+        self.frames = 0
+        self.skipped = 0
+
+    def backed_up(self, limit):
+        return self.writer.transport.get_write_buffer_size() > limit
+
+
+class Gateway:
+    def __init__(self, state, hz=DISPLAY_HZ, host="0.0.0.0", port=HTTP_PORT,
+                 page=PAGE, max_buffer=MAX_BUFFER):
+        self.state = state
+        self.hz = hz
+        self.host = host
+        self.port = port
+        self.page = page
+        self.max_buffer = max_buffer
+        self.clients = set()
+        self.server = None
+
+        self.frames = 0      # delta frames built
+        self.sends = 0       # websocket messages written
+        self.bytes_out = 0
+        self.skipped = 0     # frames not sent to a backed-up client
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._accept, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    def _write(self, client, data):
+        client.writer.write(data)
+        client.frames += 1
+        self.sends += 1
+        self.bytes_out += len(data)
+
+    def _snapshot(self, client):
+        snap = self.state.snapshot(client.rovers)
+        msg = json.dumps({"type": "snapshot", "rovers": snap}, separators=(",", ":"))
+        self._write(client, ws_frame(msg.encode()))
+
+    async def _accept(self, reader, writer):
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        lines = request.decode("latin-1").split("\r\n")
+        parts = lines[0].split()
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+        url = urlsplit(parts[1] if len(parts) > 1 else "/")
+
+        if headers.get("upgrade", "").lower() == "websocket" and url.path == "/ws":
+            await self._serve_ws(reader, writer, headers, parse_qs(url.query))
+        elif url.path in ("/", "/" + os.path.basename(self.page)):
+            try:
+                with open(self.page, "rb") as f:
+                    body = f.read()
+            except OSError as e:
+                print("Cannot serve", self.page, ":", e)
+                writer.write(b"HTTP/1.1 500 Internal Server Error\r\nContent-Length: 0\r\n"
+                             b"Connection: close\r\n\r\n")
+                writer.close()
+                return
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n"
+                         b"Content-Length: %d\r\nConnection: close\r\n\r\n" % len(body) + body)
+            await writer.drain()
+            writer.close()
+        else:
+            writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            writer.close()
+
+    async def _serve_ws(self, reader, writer, headers, query):
+        key = headers.get("sec-websocket-key")
+        if not key:
+            writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            writer.close()
+            return
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                      "Connection: Upgrade\r\nSec-WebSocket-Accept: %s\r\n\r\n"
+                      % ws_accept(key)).encode())
+        rovers = None
+        if "rover" in query:
+            rovers = [int(r) for r in query["rover"][0].split(",") if r.strip().isdigit()]
+        client = Client(writer, rovers)
+        self._snapshot(client)
+        self.clients.add(client)
+        try:
+            while True:
+                op, data = await ws_read(reader)
+                if op == OP_CLOSE:
+                    writer.write(ws_frame(data[:2], OP_CLOSE))
+                    break
+                if op == OP_PING:
+                    writer.write(ws_frame(data, OP_PONG))
+        except ValueError:
+            # 1009: message too big; the rest of the frame is never read
+            writer.write(ws_frame(struct.pack("!H", 1009), OP_CLOSE))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.clients.discard(client)
+            writer.close()
+
+    def tick(self):
+        """Build one coalesced frame and send it to every client; returns
+        the number of rovers in it."""
+        fragments = self.state.deltas()
+        if not fragments:
+            return 0
+        self.frames += 1
+        by_filter = {}
+        for client in list(self.clients):
+            if client.writer.transport.is_closing():
+                continue
+            if client.backed_up(self.max_buffer):
+                client.resync = True
+                client.skipped += 1
+                self.skipped += 1
+                continue
+            if client.resync:
+                client.resync = False
+                self._snapshot(client)
+                continue
+            key = None if client.rovers is None else tuple(client.rovers)
+            data = by_filter.get(key)
+            if data is None:
+                data = by_filter[key] = ws_frame(frame_message("delta", fragments, client.rovers))
+            self._write(client, data)
+        return len(fragments)
+
+    async def broadcast(self):
+        period = 1 / self.hz
+        next_t = time.monotonic()
+        while True:
+            next_t += period
+            await asyncio.sleep(max(0, next_t - time.monotonic()))
+            self.tick()
+
+    async def stats(self, ingestor, every=10.0):
+        last = (ingestor.messages, self.sends, self.bytes_out)
+        while True:
+            await asyncio.sleep(every)
+            now = (ingestor.messages, self.sends, self.bytes_out)
+            print(f"gateway: {(now[0] - last[0]) / every:.0f} msg/s in, {len(self.clients)} clients, "
+                  f"{(now[1] - last[1]) / every:.1f} frames/s, {(now[2] - last[2]) / every / 1024:.1f} KB/s out, "
+                  f"{self.skipped} skipped")
+            last = now
+
+
+async def main(args):
+    state = DashState()
+    ingestor = Ingestor(state)
+    svc = IngestService(ingestor)
+    client = svc.subscribe(args.broker, args.port, LIVE_TOPICS)
+    gw = await Gateway(state, args.hz, args.host, args.http_port, args.page).start()
+    print(f"🖥️  Dashboard gateway on http://{args.host}:{gw.port}/ at {args.hz} Hz, "
+          f"{LIVE_TOPICS} from {args.broker}")
+    try:
+        await asyncio.gather(svc.consume(), gw.broadcast(), gw.stats(ingestor))
+    finally:
+        client.loop_stop()
+        client.disconnect()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Coalescing WebSocket gateway for dashboard.html")
+    ap.add_argument("--broker", default=BROKER)
+    ap.add_argument("--port", type=int, default=PORT, help="MQTT port")
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--http-port", type=int, default=HTTP_PORT)
+    ap.add_argument("--hz", type=float, default=DISPLAY_HZ, help="display frames per second")
+    ap.add_argument("--page", default=PAGE)
+    args = ap.parse_args()
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        print("\nGateway stopped.")
@@ -1,7 +1,16 @@
 import network
 import time
+import uasyncio as asyncio
 from umqtt.simple import MQTTClient
 import machine
+from imu_fusion import ImuStream
+from mpu6050 import MPU6050
+from outbox import Outbox, Uplink
+from rate_control import (ENV_ALARMS, ENV_DEADBANDS, IMU_ANGLES, IMU_DEADBANDS, SKIP, URGENT,
+                          SendOnDelta)
+from telemetry_batch import BatchPublisher
+from telemetry_codec import FLAG_HAS_ENV, FLAG_HAS_IMU
+from telemetry_stream import StreamEncoder
 
 # ================= WiFi =================
 SSID = "Parsec-Guest"
@@ -11,27 +20,46 @@ PASSWORD = "Parsec@Guest"
 MQTT_BROKER = "192.168.0.34"
 MQTT_PORT = 1883
 TOPIC = b"mars/telemetry"
+BACKLOG_TOPIC = b"mars/telemetry/backlog"
 CLIENT_ID = b"esp32c3_team18"
 
 # ================= LED (optional) =================
 led = machine.Pin(8, machine.Pin.OUT)
 
+# ================= IMU =================
+# MPU6050 samples into its FIFO at IMU_RATE_HZ; only fused angles at
+# PUBLISH_HZ go uplink
+IMU_RATE_HZ = 200
+IMU_DRAIN_HZ = 25
+PUBLISH_HZ = 20
+ENV_PERIOD_MS = 2000
+i2c = machine.I2C(0, scl=machine.Pin(5), sda=machine.Pin(4), freq=400000)
+wlan = network.WLAN(network.STA_IF)
+join_start = None
+
 # ================= WiFi Connect =================
-def connect_wifi():
-    wlan = network.WLAN(network.STA_IF)
-    wlan.active(True)
+def connect_wifi(timeout_ms=15000):
+    """Start joining and return at once: True once connected, False while
+    still joining. Polled from the uplink, so the loop never waits on it."""
+    global join_start
+    if wlan.isconnected():
+        if join_start is not None:
+            join_start = None
+            print("WiFi connected")
+            print("IP:", wlan.ifconfig()[0])
+        led.on()
+        return True
 
-    if not wlan.isconnected():
+    now = time.ticks_ms()
+    if join_start is None:
         print("Connecting to WiFi...")
+        wlan.active(True)
         wlan.connect(SSID, PASSWORD)
-
-        while not wlan.isconnected():
-            time.sleep(0.5)
-            print(".", end="")
-
-    print("\nWiFi connected")
-    print("IP:", wlan.ifconfig()[0])
-    led.on()
+        join_start = now
+    elif time.ticks_diff(now, join_start) > timeout_ms:
+        join_start = None
+        raise OSError("WiFi connect timeout")
+    return False
 
 # ================= MQTT Connect =================
 def connect_mqtt():
@@ -46,38 +74,81 @@ def connect_mqtt():
     print("MQTT connected")
     return client
 
+def connect():
+    if not connect_wifi():
+        return None
+    return connect_mqtt()
+
+def on_disconnect():
+    print("Uplink lost, storing to flash")
+    led.off()
+
 # ================= Main =================
-connect_wifi()
-mqtt = connect_mqtt()
-
-counter = 0
-def format_sensor_data(temp, light, vibe, ir_storm, pitch, roll, yaw):
-    data = (
-        '{"temp": %.1f, "light": %d, "vibe": %d, '
-        '"ir_storm": %s, "pitch": %.2f, "roll": %.2f, "yaw": %.2f}'
-        % (
-            temp / 10,
-            light,
-            vibe,
-            'true' if ir_storm else 'false',
-            pitch / 100,
-            roll / 100,
-            yaw / 100
-        )
-    )
-    return data
-while True:
-    try:
-        msg = str(format_sensor_data(counter,100,1,1,3,1,3))
-        print("Publishing:", msg)
-        mqtt.publish(TOPIC, msg)
-        counter += 1
-        time.sleep(2)
+imu_encoder = StreamEncoder(stream_id=0, keyframe_interval=20)
+env_encoder = StreamEncoder(stream_id=1, keyframe_interval=20)
+
+def on_connect():
+    led.on()
+    # Live streams restart with a keyframe; the backlog has its own topic
+    imu_encoder.reset()
+    env_encoder.reset()
+
+uplink = Uplink(
+    connect,
+    TOPIC,
+    Outbox("/outbox", segment_size=4096, max_segments=8, replay_ids=True),
+    backlog_topic=BACKLOG_TOPIC,
+    on_connect=on_connect,
+    on_disconnect=on_disconnect
+)
+batcher = BatchPublisher(
+    uplink.send,
+    capacity=32,
+    max_count=8,
+    max_bytes=200,
+    max_age_ms=10000
+)
+imu = ImuStream(MPU6050(i2c), rate_hz=IMU_RATE_HZ, drain_hz=IMU_DRAIN_HZ)
 
-    except Exception as e:
-        print("Error:", e)
-        led.off()
-        time.sleep(3)
-        machine.reset()
+# Samples inside their deadbands are not sent (see rate_control.py)
+imu_rate = SendOnDelta(IMU_DEADBANDS, heartbeat_ms=10000, angles=IMU_ANGLES)
+env_rate = SendOnDelta(ENV_DEADBANDS, heartbeat_ms=30000, alarms=ENV_ALARMS)
+
+async def imu_task():
+    seq = 0
+    while True:
+        # Polls the WiFi join, reconnects with backoff and drains the
+        # flash backlog without blocking the loop
+        uplink.service()
+        if imu_rate.update(imu.angles()) != SKIP:
+            pitch, roll, yaw = imu_rate.held
+            n = imu_encoder.encode_into(seq, pitch=pitch, roll=roll, yaw=yaw, flags=FLAG_HAS_IMU)
+            batcher.add(memoryview(imu_encoder.buf)[:n])
+            seq += 1
+        batcher.poll()
+        await asyncio.sleep_ms(1000 // PUBLISH_HZ)
+
+async def env_task():
+    counter = 0
+    seq = 0
+    while True:
+        sample = (counter / 10, 100, 1, 1)  # temp, light, vibe, ir_storm
+        action = env_rate.update(sample)
+        if action != SKIP:
+            temp, light, vibe, ir_storm = env_rate.held
+            n = env_encoder.encode_into(seq, temp, int(light), int(vibe), ir_storm > 0,
+                                        flags=FLAG_HAS_ENV)
+            print("Queued frame:", seq, n, "B")
+            # Alarm changes flush the batch immediately
+            batcher.add(memoryview(env_encoder.buf)[:n], urgent=action == URGENT)
+            seq += 1
+        batcher.poll()
+        counter += 1
+        await asyncio.sleep_ms(ENV_PERIOD_MS)
 
+async def main():
+    asyncio.create_task(imu.run())
+    asyncio.create_task(env_task())
+    await imu_task()
 
+asyncio.run(main())
@@ -3,51 +3,135 @@ import machine
 import uasyncio as asyncio
 import time
 
-sensor = dht.DHT22(machine.Pin(9))
+try:
+    import _thread
+except ImportError:  # port built without threads
+    _thread = None
 
 class AsyncDHT22:
+    """Cached DHT22 readings for asyncio code.
+
+    Start run() as a task; it is what refreshes the cache and wakes
+    wait_for_new(). Without it, read() falls back to one blocking poll().
+    """
+
     def __init__(self, sensor, min_interval_ms=2000):
         self.sensor = sensor
         self.min_interval = min_interval_ms
         self.last_read = 0
 
-    async def read(self):
-        now = time.ticks_ms()
+        # Last validated reading, replaced as one tuple so a reader on
+        # another thread never sees a new temp with an old humidity
+        self.reading = None
+        self.new = asyncio.Event()
+        self._flag = None
+        self.running = False  # run() has started
 
-        # Respect DHT22 minimum read interval
-        if time.ticks_diff(now, self.last_read) < self.min_interval:
-            return None
+        self.reads = 0
+        self.errors = 0       # measure() raised: timeout or bad checksum
+        self.rejects = 0      # read fine but out of range
+        self.consecutive = 0  # failures since the last good reading
 
+    def _measure(self):
+        """One blocking transaction (~25 ms); True if it gave a new reading."""
+        self.reads += 1
         try:
             self.sensor.measure()
             temp = self.sensor.temperature()
             hum = self.sensor.humidity()
+        except Exception:
+            self.errors += 1
+            self.consecutive += 1
+            return False
 
-            # Validate ranges
-            if -40 < temp < 80 and 0 <= hum <= 100:
-                self.last_read = now
-                return temp, hum
+        # Validate ranges
+        if -40 < temp < 80 and 0 <= hum <= 100:
+            self.reading = (temp, hum)
+            self.last_read = time.ticks_ms()
+            self.consecutive = 0
+            return True
+        self.rejects += 1
+        self.consecutive += 1
+        return False
 
-        except Exception:
-            pass
+    def poll(self):
+        """Blocking read (~25 ms), rate-limited; (temp, hum) or None."""
+        now = time.ticks_ms()
 
-        return None
-    
-async def dht_task(dht_reader):
-    while True:
-        data = await dht_reader.read()
-        if data:
-            t, h = data
-            print("Temperature:", t, "°C")
-            print("Humidity:", h, "%")
+        # Respect DHT22 minimum read interval
+        if self.reading is not None and time.ticks_diff(now, self.last_read) < self.min_interval:
+            return None
+        return self.reading if self._measure() else None
+
+    def _thread_loop(self):
+        while True:
+            if self._measure():
+                self._flag.set()
+            time.sleep_ms(self.min_interval)
+
+    async def run(self, thread=True):
+        """Background acquisition; the only code that touches the sensor.
+
+        With thread=True on a port with _thread, the blocking transaction
+        runs on its own thread and never stalls the event loop. Otherwise
+        it runs here, one read per interval.
+        """
+        self.running = True
+        if thread and _thread is not None:
+            self._flag = asyncio.ThreadSafeFlag()
+            _thread.start_new_thread(self._thread_loop, ())
+            while True:
+                await self._flag.wait()
+                self.new.set()
+        while True:
+            if self._measure():
+                self.new.set()
+            await asyncio.sleep_ms(self.min_interval)
 
-        # Yield control (non-blocking)
-        await asyncio.sleep_ms(100)
+    async def wait_for_new(self):
+        """Block until run() stores a new validated reading; returns it."""
+        await self.new.wait()
+        self.new.clear()
+        return self.reading
 
-async def main():
-    dht_reader = AsyncDHT22(sensor)
-    await dht_task(dht_reader)
+    def age_ms(self):
+        """ms since the last validated reading, or None before the first."""
+        if self.reading is None:
+            return None
+        return time.ticks_diff(time.ticks_ms(), self.last_read)
+
+    def latest(self):
+        """(temp, hum, age_ms) of the cached reading, or None. Never blocks."""
+        reading = self.reading
+        if reading is None:
+            return None
+        return reading[0], reading[1], self.age_ms()
 
-asyncio.run(main())
+    async def read(self):
+        """Cached (temp, hum); waits only for the very first reading.
+
+        If run() has not been started, nothing would ever set that
+        reading, so this does one blocking poll() instead (None on failure).
+        """
+        if self.reading is None:
+            if not self.running:
+                return self.poll()
+            return await self.wait_for_new()
+        return self.reading
+    
+if __name__ == "__main__":
+    sensor = dht.DHT22(machine.Pin(9))
+
+    async def dht_task(dht_reader):
+        while True:
+            t, h = await dht_reader.wait_for_new()
+            print("Temperature:", t, "°C")
+            print("Humidity:", h, "%")
+            print("Failures:", dht_reader.errors, "errors,", dht_reader.rejects, "rejected")
 
+    async def main():
+        dht_reader = AsyncDHT22(sensor)
+        asyncio.create_task(dht_reader.run())
+        await dht_task(dht_reader)
 
+    asyncio.run(main())
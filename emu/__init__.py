@@ -0,0 +1,13 @@
+"""Host-side stand-ins for the MicroPython modules the rover firmware
+imports (machine, uasyncio, network, umqtt.simple, dht, utime, gc), on
+a virtual clock:
+
+    from emu import Board
+    board = Board(motion=lambda t: (0, 0, 1, 0, 0, 5)).install()
+    from mpu6050 import MPU6050      # firmware imports after install()
+    ...
+    board.run(main(), seconds=600)   # ten virtual minutes
+    board.uninstall()
+"""
+from emu.board import Board, current, square
+from emu.clock import TimeUp
@@ -0,0 +1,415 @@
+import builtins
+import calendar
+import os
+import random
+import sys
+from collections import deque
+
+from emu.clock import Clock, TimeUp
+from emu.devices import MPU6050, PCF8563, level
+from emu.loop import VirtualLoop
+
+# ================= Board =================
+# Everything the shims talk to: one virtual clock, the pins, the devices
+# on the I2C bus, the WiFi link, the MQTT broker and the weather. The shim
+# modules (emu.machine, emu.network, ...) find it through current(), so
+# firmware written against `import machine` runs unchanged once install()
+# has put them in sys.modules.
+
+_board = None
+
+
+def current():
+    if _board is None:
+        raise RuntimeError("no emulated board installed (emu.Board().install())")
+    return _board
+
+
+def _value(v, t):
+    """A scripted quantity: a number, or f(t seconds)."""
+    return v(t) if callable(v) else v
+
+
+def square(hz, start_ms=0, stop_ms=None, high=1, low=0):
+    """(t_ms, level) edges of a square wave for PinState.script()."""
+    half = 500 / hz
+    t = start_ms
+    lvl = high
+    while stop_ms is None or t < stop_ms:
+        yield t, lvl
+        lvl = low if lvl == high else high
+        t += half
+    yield stop_ms, low
+
+
+# ================= Pins =================
+IRQ_RISING = 1
+IRQ_FALLING = 2
+
+
+class PinState:
+    def __init__(self, clock, pin_id, value=0):
+        self.clock = clock
+        self.id = pin_id
+        self.level = value
+        self.analog = 0        # raw ADC counts: number, f(t) or iterator
+        self.handler = None
+        self.trigger = 0
+        self.owner = None      # the Pin passed to the handler
+        self.edges = 0
+        self.irqs = 0
+        self.writes = 0
+
+    def set(self, level):
+        """Drive the pin from outside; fires the IRQ on a matching edge."""
+        level = 1 if level else 0
+        if level == self.level:
+            return
+        self.level = level
+        self.edges += 1
+        if self.handler and self.trigger & (IRQ_RISING if level else IRQ_FALLING):
+            self.irqs += 1
+            self.handler(self.owner)
+
+    def at(self, t_ms, level):
+        self.clock.at(int(t_ms * 1000), lambda: self.set(level))
+
+    def script(self, edges):
+        """Play (t_ms, level) pairs in time order; pulled one at a time, so
+        an endless generator is fine."""
+        it = iter(edges)
+
+        def step():
+            for t_ms, lvl in it:
+                self.clock.at(int(t_ms * 1000), lambda lvl=lvl: (self.set(lvl), step()))
+                return
+        step()
+
+    def read_analog(self):
+        a = self.analog
+        if callable(a):
+            return a(self.clock.us / 1e6)
+        if hasattr(a, "__next__"):
+            return next(a)
+        return a
+
+
+# ================= WiFi =================
+class WiFi:
+    def __init__(self, clock, join_ms=1500, rssi=-60, available=True):
+        self.clock = clock
+        self.join_ms = join_ms
+        self.rssi = rssi            # dBm: number or f(t)
+        self.available = available  # the AP can be joined at all
+        self.outages = []           # (start_us, end_us)
+        self.joined_at = None
+
+    def drop(self, at_ms, for_ms):
+        """Take the link down for for_ms starting at at_ms."""
+        self.outages.append((int(at_ms * 1000), int((at_ms + for_ms) * 1000)))
+
+    def join(self):
+        if self.available:
+            self.joined_at = self.clock.us + self.join_ms * 1000
+
+    def up(self):
+        now = self.clock.us
+        if self.joined_at is None or now < self.joined_at:
+            return False
+        for start, end in self.outages:
+            if start <= now < end:
+                return False
+        return True
+
+    def rssi_now(self):
+        return int(_value(self.rssi, self.clock.us / 1e6))
+
+
+# ================= MQTT broker =================
+def topic_matches(pattern, topic):
+    p = pattern.split("/")
+    t = topic.split("/")
+    for i, part in enumerate(p):
+        if part == "#":
+            return True
+        if i >= len(t) or (part != "+" and part != t[i]):
+            return False
+    return len(p) == len(t)
+
+
+class Broker:
+    def __init__(self, rtt_ms=20, bps=1000000, log=1000, sink=None):
+        """rtt_ms is paid by CONNECT and QoS 1 PUBLISH; bps is the uplink
+        the firmware's socket writes are paced at."""
+        self.rtt_ms = rtt_ms
+        self.bps = bps
+        self.up = True
+        self.sink = sink            # sink(t_ms, topic, payload, qos)
+        self.log = deque((), log)   # (t_ms, topic, payload, qos)
+        self.clients = []
+        self.connects = 0
+        self.messages = 0
+        self.bytes = 0
+        self.topics = {}
+
+    def receive(self, t_ms, topic, payload, qos):
+        self.messages += 1
+        self.bytes += len(payload)
+        self.topics[topic] = self.topics.get(topic, 0) + 1
+        self.log.append((t_ms, topic, payload, qos))
+        if self.sink:
+            self.sink(t_ms, topic, payload, qos)
+
+    def deliver(self, topic, payload):
+        """Queue a message for every client subscribed to topic."""
+        if isinstance(topic, bytes):
+            topic = topic.decode()
+        for c in self.clients:
+            for pattern in c.subscriptions:
+                if topic_matches(pattern, topic):
+                    c.inbox.append((topic.encode(), bytes(payload)))
+                    break
+
+
+# ================= Weather =================
+class Climate:
+    def __init__(self, temp=22.0, humidity=45.0, fail_rate=0.0, seed=1):
+        self.temp = temp          # C: number or f(t)
+        self.humidity = humidity  # %: number or f(t)
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+
+
+# ================= Heap =================
+class Heap:
+    def __init__(self, clock, size=150000, live=40000, churn=4000, base_us=500, us_per_kb=60):
+        """MicroPython's GC heap as numbers for gc.mem_alloc/mem_free.
+        live bytes (number or f(t), so a leak can be scripted) plus garbage
+        made at churn bytes/s; when they fill the heap a collection runs,
+        freezing the board for base_us + us_per_kb per live KB."""
+        self.clock = clock
+        self.size = size
+        self.live = live
+        self.churn = churn
+        self.base_us = base_us
+        self.us_per_kb = us_per_kb
+        self.since = clock.us  # last collection
+        self.gen = 0
+        self.auto = 0
+        self.collects = 0
+        self.pause_us = 0
+        self._schedule()
+
+    def live_now(self):
+        return int(_value(self.live, self.clock.us / 1e6))
+
+    def alloc(self):
+        garbage = self.churn * (self.clock.us - self.since) // 1000000
+        return min(self.size, self.live_now() + garbage)
+
+    def _schedule(self):
+        if not self.churn:
+            return
+        room = max(0, self.size - self.live_now())
+        gen = self.gen
+        # A full heap still leaves 1 ms between collections
+        self.clock.after(max(1000, room * 1000000 // self.churn), lambda: self._auto(gen))
+
+    def _auto(self, gen):
+        if gen == self.gen:
+            self.auto += 1
+            self.collect()
+
+    def collect(self):
+        """Run a collection now; the board is frozen for the pause."""
+        us = self.base_us + self.live_now() * self.us_per_kb // 1024
+        self.collects += 1
+        self.pause_us += us
+        self.gen += 1
+        self.clock.advance(us)
+        self.since = self.clock.us
+        self._schedule()
+        return us
+
+
+# ================= Flash =================
+def _flash_fs(base, root):
+    """outbox.FlashFS with absolute device paths moved under root."""
+
+    class HostFlash(base):
+        def _map(self, path):
+            return os.path.join(root, path.lstrip("/"))
+
+        def listdir(self, path):
+            return base.listdir(self, self._map(path))
+
+        def mkdir(self, path):
+            os.makedirs(self._map(path), exist_ok=True)
+
+        def remove(self, path):
+            base.remove(self, self._map(path))
+
+        def open(self, path, mode):
+            return base.open(self, self._map(path), mode)
+
+    return HostFlash
+
+
+class Board:
+    SHIMS = ("machine", "uasyncio", "network", "umqtt", "umqtt.simple", "dht", "utime",
+             "micropython", "time", "gc")
+
+    def __init__(self, start=(2024, 1, 1, 0, 0, 0), motion=level, call_us=1, flash_dir=None,
+                 threads=False):
+        """start is the wall-clock time at boot (UTC), for utime.time() and
+        the RTC. threads=False hides _thread, so drivers that would hand
+        blocking reads to a thread (dhtasync) run them inline on the
+        virtual clock instead. flash_dir, if given, holds what the
+        firmware writes to absolute paths through outbox.FlashFS."""
+        self.clock = Clock(call_us=call_us)
+        self.epoch = calendar.timegm(tuple(start) + (0, 0, 0))
+        self.threads = threads
+        self.flash_dir = flash_dir
+        self.pins = {}
+        self.i2c = {}
+        self.pwms = {}
+        self.i2c_us = 0
+        self.wifi = WiFi(self.clock)
+        self.broker = Broker()
+        self.climate = Climate()
+        self.heap = Heap(self.clock)
+        self.resets = 0
+        self.mpu = self.add_i2c(MPU6050(self.clock, motion=motion))
+        self.rtc = self.add_i2c(PCF8563(self.clock, when=start))
+        self._saved = None
+
+    def pin(self, pin_id):
+        p = self.pins.get(pin_id)
+        if p is None:
+            p = self.pins[pin_id] = PinState(self.clock, pin_id)
+        return p
+
+    def add_i2c(self, device):
+        self.i2c[device.address] = device
+        return device
+
+    @property
+    def ms(self):
+        return self.clock.us // 1000
+
+    # ================= sys.modules =================
+    def install(self):
+        """Put the shims in sys.modules. Import firmware after this: a
+        module binds time.ticks_ms & co. when it is imported."""
+        global _board
+        if _board is not None:
+            raise RuntimeError("an emulated board is already installed")
+        import threading  # noqa: F401  (before _thread is hidden)
+        from emu import dht, gc, machine, micropython, network, uasyncio, umqtt_simple, utime
+
+        self._saved = {name: sys.modules.get(name) for name in self.SHIMS + ("_thread",)}
+        self._loaded = set(sys.modules)
+        self._const = getattr(builtins, "const", None)
+        mods = {"machine": machine, "uasyncio": uasyncio, "network": network,
+                "umqtt.simple": umqtt_simple, "dht": dht, "utime": utime,
+                "micropython": micropython, "time": utime, "gc": gc}
+        umqtt = type(sys)("umqtt")
+        umqtt.simple = umqtt_simple
+        umqtt.__path__ = []
+        mods["umqtt"] = umqtt
+        sys.modules.update(mods)
+        if not self.threads:
+            sys.modules["_thread"] = None
+        builtins.const = micropython.const
+        utime.bind(self.clock)
+        _board = self
+
+        if self.flash_dir is not None:
+            import outbox
+            self._flash = outbox, outbox.FlashFS
+            outbox.FlashFS = _flash_fs(outbox.FlashFS, self.flash_dir)
+        return self
+
+    def uninstall(self):
+        """Restore sys.modules and forget every module imported since
+        install(), since those hold on to the virtual clock."""
+        global _board
+        if _board is not self:
+            return
+        if self.flash_dir is not None:
+            mod, fs = self._flash
+            mod.FlashFS = fs
+        for name in set(sys.modules) - self._loaded:
+            del sys.modules[name]
+        for name, mod in self._saved.items():
+            if mod is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = mod
+        if self._const is None:
+            del builtins.const
+        else:
+            builtins.const = self._const
+        _board = None
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc):
+        self.uninstall()
+
+    # ================= Running =================
+    def run(self, coro, seconds=None):
+        """Run coro on the virtual loop; with seconds, stop it that much
+        virtual time from now. Returns its result, or None if cut off."""
+        from emu import uasyncio
+        if seconds is not None:
+            self.clock.deadline = self.clock.us + int(seconds * 1e6)
+        try:
+            return uasyncio.run(coro)
+        except TimeUp:
+            return None
+        finally:
+            self.clock.deadline = None
+
+    def run_script(self, path, seconds=None):
+        """Exec a firmware script as __main__ (most end in asyncio.run()),
+        stopping it after seconds of virtual time. Returns its globals.
+
+        As on the board, the script's modules sit next to it: its
+        directory is on sys.path while it runs.
+        """
+        path = os.path.abspath(path)
+        with open(path) as f:
+            code = compile(f.read(), path, "exec")
+        ns = {"__name__": "__main__", "__file__": path}
+        if seconds is not None:
+            self.clock.deadline = self.clock.us + int(seconds * 1e6)
+        here = os.path.dirname(path)
+        added = here not in sys.path
+        if added:
+            sys.path.insert(0, here)
+        try:
+            exec(code, ns)
+        except TimeUp:
+            pass
+        finally:
+            self.clock.deadline = None
+            if added:
+                sys.path.remove(here)
+        return ns
+
+    def new_loop(self):
+        return VirtualLoop(self.clock)
+
+    def stats(self):
+        """Bus, pin and uplink counters for a report."""
+        return {
+            "virtual_s": self.clock.us / 1e6,
+            "i2c": {"0x%02x" % a: d.stats() for a, d in self.i2c.items()},
+            "i2c_ms": self.i2c_us / 1000,
+            "pwm_writes": {p: w.writes for p, w in self.pwms.items()},
+            "irqs": {p: s.irqs for p, s in self.pins.items() if s.irqs},
+            "mqtt": (self.broker.messages, self.broker.bytes),
+            "gc": (self.heap.collects, self.heap.pause_us / 1000),
+        }
@@ -0,0 +1,88 @@
+import heapq
+
+# ================= Virtual clock =================
+# Microseconds since boot, advanced only by the emulation: sleeps, bus
+# transfers, ADC conversions, DHT reads and the event loop jumping to
+# its next timer. Python running the firmware costs nothing, so a loop
+# that would idle for an hour on the board finishes in however long its
+# work takes on the host.
+#
+# Scripted hardware (pin edges, sensor changes) is a heap of callbacks
+# that fire when time reaches them, in the middle of a sleep or a bus
+# transfer, just as an interrupt would.
+
+TICKS_PERIOD = 1 << 30  # MicroPython ticks_* wrap here
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALF = TICKS_PERIOD // 2
+
+
+class TimeUp(Exception):
+    """Raised out of the event loop when a run's virtual deadline passes."""
+
+
+class Clock:
+    def __init__(self, start_us=0, call_us=1):
+        """call_us is charged for every ticks_*() read, so busy-wait loops
+        on the clock make progress."""
+        self.us = start_us
+        self.call_us = call_us
+        self.events = []
+        self.seq = 0
+        self.deadline = None
+        self.fired = 0
+
+    def at(self, t_us, fn):
+        """Run fn() when the clock reaches t_us (now, if already past)."""
+        self.seq += 1
+        heapq.heappush(self.events, (t_us, self.seq, fn))
+
+    def after(self, us, fn):
+        self.at(self.us + us, fn)
+
+    def next_event(self):
+        return self.events[0][0] if self.events else None
+
+    def advance(self, us):
+        """Move time forward by us, firing every event on the way."""
+        target = self.us + us
+        events = self.events
+        while events and events[0][0] <= target:
+            t, _, fn = heapq.heappop(events)
+            if t > self.us:
+                self.us = t
+            self.fired += 1
+            fn()
+        if target > self.us:
+            self.us = target
+
+    def advance_to(self, t_us):
+        if t_us > self.us:
+            self.advance(t_us - self.us)
+
+    def sleep(self, us):
+        """Blocking sleep: advance, then stop the run if it is over (a
+        firmware loop that never yields still ends at the deadline)."""
+        self.advance(us)
+        if self.deadline is not None and self.us >= self.deadline:
+            raise TimeUp()
+
+    # MicroPython time API on this clock
+    def ticks_us(self):
+        us = self.us + self.call_us
+        if self.events and self.events[0][0] <= us:
+            self.advance(self.call_us)
+        else:
+            self.us = us
+        return us & TICKS_MAX
+
+    def ticks_ms(self):
+        self.ticks_us()
+        return (self.us // 1000) & TICKS_MAX
+
+
+def ticks_add(t, delta):
+    return (t + delta) & TICKS_MAX
+
+
+def ticks_diff(a, b):
+    return ((a - b + TICKS_HALF) & TICKS_MAX) - TICKS_HALF
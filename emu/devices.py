@@ -0,0 +1,245 @@
+import calendar
+import time
+
+# ================= I2C devices =================
+# Register-level models behind emu.machine.I2C. A device sees the same
+# transactions the driver issues (register address, then bytes with
+# auto-increment) and counts them, so a driver change shows up as fewer
+# transactions or bytes, not just as a faster host run.
+
+
+class I2CDevice:
+    def __init__(self, clock, address, size=256):
+        self.clock = clock
+        self.address = address
+        self.regs = bytearray(size)
+        self.pointer = 0        # register for address-less reads
+        self.reads = 0          # read transactions
+        self.writes = 0         # write transactions
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def read(self, reg, n):
+        self.reads += 1
+        self.bytes_read += n
+        self.pointer = (reg + n) % len(self.regs)
+        return self.read_regs(reg, n)
+
+    def write(self, reg, data):
+        self.writes += 1
+        self.bytes_written += len(data)
+        self.pointer = (reg + len(data)) % len(self.regs)
+        self.write_regs(reg, bytes(data))
+
+    def read_regs(self, reg, n):
+        size = len(self.regs)
+        return bytes(self.regs[(reg + i) % size] for i in range(n))
+
+    def write_regs(self, reg, data):
+        size = len(self.regs)
+        for i, b in enumerate(data):
+            self.regs[(reg + i) % size] = b
+
+    def stats(self, reset=False):
+        """(reads, writes, bytes_read, bytes_written)"""
+        out = (self.reads, self.writes, self.bytes_read, self.bytes_written)
+        if reset:
+            self.reads = self.writes = self.bytes_read = self.bytes_written = 0
+        return out
+
+
+def _s16(v):
+    v = int(round(v))
+    v = -32768 if v < -32768 else 32767 if v > 32767 else v
+    return v & 0xFFFF
+
+
+# ================= MPU6050 =================
+SMPLRT_DIV = 0x19
+CONFIG = 0x1A
+FIFO_EN = 0x23
+INT_STATUS = 0x3A
+ACCEL_XOUT_H = 0x3B
+USER_CTRL = 0x6A
+PWR_MGMT_1 = 0x6B
+FIFO_COUNTH = 0x72
+FIFO_R_W = 0x74
+WHO_AM_I = 0x75
+
+FIFO_SIZE = 1024
+FIFO_OFLOW = 0x10
+ACCEL_SCALE = 16384  # +-2 g
+GYRO_SCALE = 131     # +-250 deg/s
+
+
+def level(t):
+    """Default motion: sitting flat and still."""
+    return 0.0, 0.0, 1.0, 0.0, 0.0, 0.0
+
+
+class MPU6050(I2CDevice):
+    def __init__(self, clock, address=0x68, motion=level, temp_c=25.0):
+        """motion(t) -> (ax, ay, az in g, gx, gy, gz in deg/s) at t seconds
+        of virtual time. Samples into the FIFO at 1 kHz (DLPF on) or
+        8 kHz (off) / (SMPLRT_DIV + 1) while it is enabled."""
+        super().__init__(clock, address, 128)
+        self.motion = motion
+        self.temp_c = temp_c
+        self.regs[WHO_AM_I] = 0x68
+        self.regs[PWR_MGMT_1] = 0x40  # asleep after power-on
+        self.fifo = bytearray()
+        self.next_sample = None
+        self.samples = 0       # written into the FIFO
+        self.overflows = 0     # FIFO filled up
+
+    @property
+    def awake(self):
+        return not self.regs[PWR_MGMT_1] & 0x40
+
+    def _period_us(self):
+        dlpf = self.regs[CONFIG] & 0x07
+        base = 1000 if 0 < dlpf < 7 else 8000
+        return 1000000 * (self.regs[SMPLRT_DIV] + 1) // base
+
+    def _fifo_on(self):
+        return self.awake and self.regs[USER_CTRL] & 0x40 and self.regs[FIFO_EN]
+
+    def _raw(self, t):
+        ax, ay, az, gx, gy, gz = self.motion(t)
+        return (_s16(ax * ACCEL_SCALE), _s16(ay * ACCEL_SCALE), _s16(az * ACCEL_SCALE),
+                _s16((self.temp_c - 36.53) * 340),
+                _s16(gx * GYRO_SCALE), _s16(gy * GYRO_SCALE), _s16(gz * GYRO_SCALE))
+
+    def _sample_bytes(self, raw):
+        en = self.regs[FIFO_EN]
+        out = bytearray()
+        # FIFO order: accel, temp, gyro x, y, z
+        for bit, k in ((0x08, 0), (0x08, 1), (0x08, 2), (0x80, 3), (0x40, 4), (0x20, 5), (0x10, 6)):
+            if en & bit:
+                out.append(raw[k] >> 8)
+                out.append(raw[k] & 0xFF)
+        return out
+
+    def _fill(self):
+        if self.next_sample is None or not self._fifo_on():
+            return
+        now = self.clock.us
+        if self.next_sample > now:
+            return
+        period = self._period_us()
+        n = (now - self.next_sample) // period + 1
+        first = self.next_sample
+        self.next_sample += n * period
+        width = len(self._sample_bytes(self._raw(0)))
+        room = (FIFO_SIZE - len(self.fifo)) // width if width else 0
+        if n > room:
+            # Full: the oldest data is overwritten and alignment is lost
+            self.overflows += 1
+            self.regs[INT_STATUS] |= FIFO_OFLOW
+            skip = n - FIFO_SIZE // width
+            if skip > 0:
+                first += skip * period
+                n -= skip
+        for i in range(n):
+            self.fifo += self._sample_bytes(self._raw((first + i * period) / 1e6))
+        self.samples += n
+        if len(self.fifo) > FIFO_SIZE:
+            del self.fifo[:len(self.fifo) - FIFO_SIZE]
+
+    def read_regs(self, reg, n):
+        self._fill()
+        if reg == FIFO_R_W:
+            out = bytes(self.fifo[:n])
+            del self.fifo[:n]
+            return out + b"\xff" * (n - len(out))
+        if reg < ACCEL_XOUT_H + 14 and reg + n > ACCEL_XOUT_H:
+            raw = self._raw(self.clock.us / 1e6)
+            for k, v in enumerate(raw):
+                self.regs[ACCEL_XOUT_H + 2 * k] = v >> 8
+                self.regs[ACCEL_XOUT_H + 2 * k + 1] = v & 0xFF
+        count = len(self.fifo)
+        self.regs[FIFO_COUNTH] = count >> 8
+        self.regs[FIFO_COUNTH + 1] = count & 0xFF
+        out = super().read_regs(reg, n)
+        if reg <= INT_STATUS < reg + n:
+            self.regs[INT_STATUS] = 0  # cleared on read
+        return out
+
+    def write_regs(self, reg, data):
+        self._fill()
+        was_on = self._fifo_on()
+        super().write_regs(reg, data)
+        if self.regs[PWR_MGMT_1] & 0x80:
+            # DEVICE_RESET: registers back to power-on, counters kept
+            counts = self.stats()
+            self.__init__(self.clock, self.address, self.motion, self.temp_c)
+            self.reads, self.writes, self.bytes_read, self.bytes_written = counts
+            return
+        if self.regs[USER_CTRL] & 0x04:
+            self.fifo = bytearray()
+            self.regs[USER_CTRL] &= ~0x04
+            self.next_sample = None
+        if self._fifo_on() and (not was_on or self.next_sample is None):
+            self.next_sample = self.clock.us + self._period_us()
+
+
+# ================= PCF8563 =================
+SEC_REG = 0x02
+YEAR_REG = 0x08
+
+
+def _bcd(v):
+    return ((v // 10) << 4) | (v % 10)
+
+
+def _dec(b):
+    return (b >> 4) * 10 + (b & 0x0F)
+
+
+class PCF8563(I2CDevice):
+    def __init__(self, clock, address=0x51, when=(2024, 1, 1, 0, 0, 0), weekday=None):
+        """Counts seconds from when (y, mo, d, h, mi, s, UTC) on the
+        virtual clock. Setting the time registers restarts the second.
+        The weekday register defaults to 0 = Sunday for when."""
+        super().__init__(clock, address, 16)
+        self.secs = calendar.timegm(tuple(when) + (0, 0, 0))
+        # 1970-01-01 was a Thursday
+        self.weekday = (self.secs // 86400 + 4) % 7 if weekday is None else weekday
+        self.set_us = clock.us
+        self.voltage_low = False
+
+    def now(self):
+        """Seconds since 1970 the chip would report now."""
+        return self.secs + (self.clock.us - self.set_us) // 1000000
+
+    def _latch(self):
+        secs = self.now()
+        days = secs // 86400 - self.secs // 86400
+        y, mo, d, h, mi, s = time.gmtime(secs)[:6]
+        r = self.regs
+        r[SEC_REG] = _bcd(s) | (0x80 if self.voltage_low else 0)
+        r[0x03] = _bcd(mi)
+        r[0x04] = _bcd(h)
+        r[0x05] = _bcd(d)
+        r[0x06] = (self.weekday + days) % 7
+        r[0x07] = _bcd(mo) | (0x80 if y >= 2100 else 0)
+        r[YEAR_REG] = _bcd(y % 100)
+
+    def read_regs(self, reg, n):
+        self._latch()
+        return super().read_regs(reg, n)
+
+    def write_regs(self, reg, data):
+        touches_time = reg <= YEAR_REG and reg + len(data) > SEC_REG
+        if touches_time:
+            self._latch()
+        super().write_regs(reg, data)
+        if touches_time:
+            r = self.regs
+            century = 2100 if r[0x07] & 0x80 else 2000
+            self.secs = calendar.timegm((century + _dec(r[YEAR_REG]), _dec(r[0x07] & 0x1F),
+                                         _dec(r[0x05] & 0x3F), _dec(r[0x04] & 0x3F),
+                                         _dec(r[0x03] & 0x7F), _dec(r[SEC_REG] & 0x7F), 0, 0, 0))
+            self.weekday = r[0x06] & 0x07
+            self.voltage_low = bool(r[SEC_REG] & 0x80)
+            self.set_us = self.clock.us
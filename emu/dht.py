@@ -0,0 +1,43 @@
+from emu import board
+
+# ================= dht =================
+# DHT11/DHT22 on board.climate. measure() blocks for the sensor's
+# transaction and fails with ETIMEDOUT at climate.fail_rate.
+
+MEASURE_US = 25000
+
+
+class DHTBase:
+    def __init__(self, pin):
+        b = board.current()
+        self.pin = pin
+        self.clock = b.clock
+        self.climate = b.climate
+        self.measures = 0
+        self._t = self._h = 0
+
+    def measure(self):
+        self.measures += 1
+        self.clock.advance(MEASURE_US)
+        c = self.climate
+        if c.fail_rate and c.rng.random() < c.fail_rate:
+            raise OSError(110)  # ETIMEDOUT
+        t = self.clock.us / 1e6
+        self._t = c.temp(t) if callable(c.temp) else c.temp
+        self._h = c.humidity(t) if callable(c.humidity) else c.humidity
+
+
+class DHT11(DHTBase):
+    def temperature(self):
+        return int(self._t)
+
+    def humidity(self):
+        return int(self._h)
+
+
+class DHT22(DHTBase):
+    def temperature(self):
+        return round(self._t, 1)
+
+    def humidity(self):
+        return round(self._h, 1)
@@ -0,0 +1,29 @@
+import gc as _gc
+
+from emu import board
+
+# ================= gc =================
+# MicroPython's heap figures from board.heap; collect() costs the board
+# the modelled pause. The host's own collector is left alone, and
+# everything else (enable, isenabled, get_objects, ...) is the host's.
+
+
+def collect():
+    board.current().heap.collect()
+
+
+def mem_alloc():
+    return board.current().heap.alloc()
+
+
+def mem_free():
+    h = board.current().heap
+    return h.size - h.alloc()
+
+
+def threshold(amount=None):
+    return -1
+
+
+def __getattr__(name):
+    return getattr(_gc, name)
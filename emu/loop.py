@@ -0,0 +1,60 @@
+import asyncio
+import math
+import selectors
+
+from emu.clock import TimeUp
+
+# ================= Virtual-time event loop =================
+# A stock SelectorEventLoop whose clock is the board's and whose selector
+# never blocks: where the real loop would wait for I/O until its next
+# timer, this one advances virtual time to that timer (or to the next
+# scripted hardware event, which may wake a task first) and returns.
+# There is no real I/O on the emulated board, so nothing is ever ready.
+
+
+class VirtualSelector(selectors.BaseSelector):
+    def __init__(self, clock):
+        self.clock = clock
+        self.keys = {}
+
+    def register(self, fileobj, events, data=None):
+        fd = fileobj if isinstance(fileobj, int) else fileobj.fileno()
+        key = selectors.SelectorKey(fileobj, fd, events, data)
+        self.keys[fd] = key
+        return key
+
+    def unregister(self, fileobj):
+        fd = fileobj if isinstance(fileobj, int) else fileobj.fileno()
+        return self.keys.pop(fd)
+
+    def select(self, timeout=None):
+        clock = self.clock
+        if timeout is not None and timeout <= 0:
+            return []
+        target = None if timeout is None else clock.us + math.ceil(timeout * 1e6)
+        nxt = clock.next_event()
+        if nxt is not None and (target is None or nxt < target):
+            target = nxt
+        if clock.deadline is not None and (target is None or target > clock.deadline):
+            clock.advance_to(clock.deadline)
+            raise TimeUp()
+        if target is None:
+            raise RuntimeError("virtual time: every task is waiting and nothing is scheduled")
+        clock.advance_to(target)
+        return []
+
+    def get_map(self):
+        return self.keys
+
+    def close(self):
+        self.keys.clear()
+
+
+class VirtualLoop(asyncio.SelectorEventLoop):
+    def __init__(self, clock):
+        super().__init__(VirtualSelector(clock))
+        self.clock = clock
+        self._clock_resolution = 1e-6
+
+    def time(self):
+        return self.clock.us / 1e6
@@ -0,0 +1,219 @@
+from collections import deque
+
+from emu import board
+from emu.board import IRQ_FALLING, IRQ_RISING
+
+# ================= machine =================
+# Pins, ADC, PWM and I2C on the emulated board. Blocking hardware costs
+# virtual time: an I2C transfer takes its bits at the bus frequency and
+# an ADC conversion ADC_US, so a driver's bus traffic shows up in its
+# timing as it would on the rover.
+
+ADC_US = 10
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_RISING = IRQ_RISING
+    IRQ_FALLING = IRQ_FALLING
+
+    def __init__(self, pin_id, mode=-1, pull=-1, value=None):
+        self.id = pin_id
+        self.state = board.current().pin(pin_id)
+        self.mode = mode
+        if pull == Pin.PULL_UP and mode == Pin.IN:
+            self.state.level = 1
+        if value is not None:
+            self.value(value)
+
+    def init(self, mode=-1, pull=-1, value=None):
+        self.__init__(self.id, mode, pull, value)
+
+    def value(self, v=None):
+        if v is None:
+            return self.state.level
+        self.state.writes += 1
+        self.state.set(v)
+
+    __call__ = value
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=IRQ_RISING | IRQ_FALLING):
+        s = self.state
+        s.handler = handler
+        s.trigger = trigger
+        s.owner = self
+
+    def __repr__(self):
+        return "Pin(%s)" % self.id
+
+
+class ADC:
+    ATTN_0DB = 0
+    ATTN_2_5DB = 1
+    ATTN_6DB = 2
+    ATTN_11DB = 3
+    WIDTH_12BIT = 3
+
+    def __init__(self, pin, atten=None):
+        self.state = board.current().pin(pin.id if isinstance(pin, Pin) else pin)
+        self.clock = self.state.clock
+        self.reads = 0
+
+    def read(self):
+        """Raw 12-bit counts from the pin's analog source."""
+        self.reads += 1
+        self.clock.advance(ADC_US)
+        v = int(self.state.read_analog())
+        return 0 if v < 0 else 4095 if v > 4095 else v
+
+    def read_u16(self):
+        return self.read() << 4
+
+    def read_uv(self):
+        return self.read() * 3300000 // 4095
+
+    def atten(self, a):
+        pass
+
+    def width(self, w):
+        pass
+
+
+class PWM:
+    def __init__(self, pin, freq=5000, duty=None, duty_u16=None):
+        b = board.current()
+        self.pin = pin
+        self.clock = b.clock
+        self._freq = freq
+        self._duty = 0
+        self.writes = 0
+        self.history = deque((), 256)  # (t_ms, duty 0..1023)
+        b.pwms[pin.id] = self
+        if duty is not None:
+            self.duty(duty)
+        if duty_u16 is not None:
+            self.duty_u16(duty_u16)
+
+    def freq(self, f=None):
+        if f is None:
+            return self._freq
+        self._freq = f
+
+    def duty(self, d=None):
+        if d is None:
+            return self._duty
+        self._duty = max(0, min(1023, int(d)))
+        self.writes += 1
+        self.history.append((self.clock.us // 1000, self._duty))
+
+    def duty_u16(self, d=None):
+        if d is None:
+            return self._duty << 6
+        self.duty(d >> 6)
+
+    def deinit(self):
+        self._duty = 0
+
+
+class I2C:
+    def __init__(self, bus_id=0, scl=None, sda=None, freq=400000, timeout=50000):
+        b = board.current()
+        self.board = b
+        self.clock = b.clock
+        self.freq = freq
+        self.transactions = 0
+
+    def _xfer(self, addr, nbytes):
+        """Address + nbytes on the wire: 9 clocks a byte with the ACK, plus
+        START/STOP (a repeated START is counted in nbytes' extra byte)."""
+        dev = self.board.i2c.get(addr)
+        us = (9 * (nbytes + 1) + 3) * 1000000 // self.freq
+        self.transactions += 1
+        self.board.i2c_us += us
+        self.clock.advance(us)
+        if dev is None:
+            raise OSError(19)  # ENODEV: address NACKed
+        return dev
+
+    def scan(self):
+        for addr in range(0x08, 0x78):
+            self.clock.advance(9 * 1000000 // self.freq)
+        return sorted(self.board.i2c)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        # write reg address, repeated start, read
+        return self._xfer(addr, 2 + nbytes).read(memaddr, nbytes)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        n = len(buf)
+        buf[:] = self._xfer(addr, 2 + n).read(memaddr, n)
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        self._xfer(addr, 1 + len(buf)).write(memaddr, buf)
+
+    def readfrom(self, addr, nbytes, stop=True):
+        dev = self._xfer(addr, nbytes)
+        return dev.read(dev.pointer, nbytes)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        buf[:] = self.readfrom(addr, len(buf))
+
+    def writeto(self, addr, buf, stop=True):
+        dev = self._xfer(addr, len(buf))
+        if len(buf) == 1:
+            dev.pointer = buf[0]
+            dev.writes += 1
+        elif len(buf) > 1:
+            dev.pointer = buf[0]
+            dev.write(buf[0], bytes(buf[1:]))
+        return len(buf)
+
+
+SoftI2C = I2C
+
+
+# ================= Misc =================
+def freq(hz=None):
+    return 160000000
+
+
+def unique_id():
+    return b"\xe4\xb0\x63\x18\x00\x01"
+
+
+def reset():
+    board.current().resets += 1
+    raise SystemExit("machine.reset()")
+
+
+soft_reset = reset
+
+
+def idle():
+    pass
+
+
+def disable_irq():
+    return 0
+
+
+def enable_irq(state=0):
+    pass
+
+
+def lightsleep(ms=None):
+    if ms:
+        board.current().clock.advance(ms * 1000)
+
+
+deepsleep = lightsleep
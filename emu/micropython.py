@@ -0,0 +1,42 @@
+# ================= micropython =================
+# Compiler hints are no-ops on the host; schedule() runs the callback at
+# once, which is when a soft IRQ would run on the emulated board anyway.
+
+
+def const(x):
+    return x
+
+
+def native(f):
+    return f
+
+
+viper = native
+
+
+def opt_level(level=None):
+    return 0
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def mem_info(verbose=False):
+    print("mem: emulated (no MicroPython heap)")
+
+
+def qstr_info(verbose=False):
+    pass
+
+
+def schedule(fn, arg):
+    fn(arg)
+
+
+def heap_lock():
+    return 0
+
+
+def heap_unlock():
+    return 0
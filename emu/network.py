@@ -0,0 +1,68 @@
+from emu import board
+
+# ================= network =================
+# Station interface on board.wifi: connect() joins after wifi.join_ms of
+# virtual time and isconnected() goes false during scripted outages.
+
+STA_IF = 0
+AP_IF = 1
+
+STAT_IDLE = 1000
+STAT_CONNECTING = 1001
+STAT_GOT_IP = 1010
+STAT_NO_AP_FOUND = 201
+
+
+class WLAN:
+    def __init__(self, interface=STA_IF):
+        self.wifi = board.current().wifi
+        self.interface = interface
+        self._active = False
+        self.ssid = None
+
+    def active(self, on=None):
+        if on is None:
+            return self._active
+        self._active = bool(on)
+        if not on:
+            self.wifi.joined_at = None
+
+    def connect(self, ssid=None, key=None, **kw):
+        if not self._active:
+            raise OSError("STA must be active")
+        self.ssid = ssid
+        self.wifi.join()
+
+    def disconnect(self):
+        self.wifi.joined_at = None
+
+    def isconnected(self):
+        return self._active and self.wifi.up()
+
+    def status(self, param=None):
+        if param == "rssi":
+            return self.wifi.rssi_now()
+        if param is not None:
+            raise ValueError("unknown status param")
+        if self.isconnected():
+            return STAT_GOT_IP
+        if self.wifi.joined_at is not None:
+            return STAT_CONNECTING
+        return STAT_IDLE if self.wifi.available else STAT_NO_AP_FOUND
+
+    def ifconfig(self, config=None):
+        if self.isconnected():
+            return ("192.168.0.50", "255.255.255.0", "192.168.0.1", "192.168.0.1")
+        return ("0.0.0.0", "0.0.0.0", "0.0.0.0", "0.0.0.0")
+
+    def config(self, *args, **kw):
+        if args == ("mac",):
+            return b"\xe4\xb0\x63\x18\x00\x01"
+        if args == ("essid",):
+            return self.ssid
+        return None
+
+    def scan(self):
+        if not self.wifi.available:
+            return []
+        return [(b"Parsec-Guest", b"\x00\x11\x22\x33\x44\x55", 6, self.wifi.rssi_now(), 3, False)]
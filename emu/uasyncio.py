@@ -0,0 +1,73 @@
+import asyncio
+from asyncio import *  # noqa: F401,F403
+
+from emu import board
+
+# ================= uasyncio =================
+# CPython asyncio with MicroPython's extras, run on the board's virtual
+# loop: asyncio.sleep() and sleep_ms() cost no real time.
+
+
+def sleep_ms(ms):
+    return asyncio.sleep(ms / 1000)
+
+
+def wait_for_ms(aw, ms):
+    return asyncio.wait_for(aw, ms / 1000)
+
+
+class ThreadSafeFlag:
+    """set() from an IRQ handler, one waiter; wait() clears the flag.
+    Handlers here run on the loop's own thread (inside the virtual clock),
+    so a plain Event does."""
+
+    def __init__(self):
+        self._event = asyncio.Event()
+
+    def set(self):
+        self._event.set()
+
+    def clear(self):
+        self._event.clear()
+
+    async def wait(self):
+        await self._event.wait()
+        self._event.clear()
+
+
+def new_event_loop():
+    loop = board.current().new_loop()
+    asyncio.set_event_loop(loop)
+    return loop
+
+
+def get_event_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return new_event_loop()
+
+
+def _cancel_all(loop):
+    tasks = [t for t in asyncio.all_tasks(loop) if not t.done()]
+    for t in tasks:
+        t.cancel()
+    if tasks:
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+
+
+def run(main):
+    """asyncio.run() on a fresh virtual loop. When the board's deadline
+    cuts it short, TimeUp is raised once the leftover tasks are cancelled."""
+    clock = board.current().clock
+    loop = new_event_loop()
+    try:
+        return loop.run_until_complete(main)
+    finally:
+        deadline, clock.deadline = clock.deadline, None
+        try:
+            _cancel_all(loop)
+        finally:
+            clock.deadline = deadline
+            asyncio.set_event_loop(None)
+            loop.close()
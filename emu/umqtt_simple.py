@@ -0,0 +1,102 @@
+from emu import board
+
+# ================= umqtt.simple =================
+# Blocking client against board.broker. A publish costs its bytes at
+# broker.bps of virtual time (plus a round trip for QoS 1) and raises
+# OSError while the WiFi link or the broker is down, as the socket write
+# would on the rover.
+
+FIXED_US = 200  # per packet: stack + socket write
+
+
+class MQTTException(Exception):
+    pass
+
+
+class MQTTClient:
+    def __init__(self, client_id, server, port=0, user=None, password=None, keepalive=0,
+                 ssl=None, ssl_params={}):
+        b = board.current()
+        self.clock = b.clock
+        self.wifi = b.wifi
+        self.broker = b.broker
+        self.client_id = client_id
+        self.server = server
+        self.port = port or 1883
+        self.keepalive = keepalive
+        self.cb = None
+        self.lw = None
+        self.connected = False
+        self.subscriptions = []
+        self.inbox = []
+        self.pid = 0
+
+    def _link(self):
+        if not (self.connected and self.wifi.up() and self.broker.up):
+            self.connected = False
+            raise OSError(104)  # ECONNRESET
+
+    def _wire(self, nbytes, ack=False):
+        us = FIXED_US + nbytes * 8 * 1000000 // self.broker.bps
+        if ack:
+            us += self.broker.rtt_ms * 1000
+        self.clock.advance(us)
+
+    def set_callback(self, f):
+        self.cb = f
+
+    def set_last_will(self, topic, msg, retain=False, qos=0):
+        self.lw = (topic, msg, retain, qos)
+
+    def connect(self, clean_session=True, timeout=None):
+        if not self.wifi.up():
+            raise OSError(113)  # EHOSTUNREACH
+        self._wire(14 + len(self.client_id), ack=True)
+        if not self.broker.up:
+            raise OSError(111)  # ECONNREFUSED
+        self.connected = True
+        self.broker.connects += 1
+        if self not in self.broker.clients:
+            self.broker.clients.append(self)
+        return False
+
+    def disconnect(self):
+        if self.connected and self.wifi.up():
+            self._wire(2)
+        self.connected = False
+        if self in self.broker.clients:
+            self.broker.clients.remove(self)
+
+    def ping(self):
+        self._link()
+        self._wire(2)
+
+    def publish(self, topic, msg, retain=False, qos=0):
+        self._link()
+        # fixed header + topic length + topic (+ packet id) + payload
+        self._wire(4 + len(topic) + len(msg) + (2 if qos else 0), ack=qos > 0)
+        if qos:
+            self.pid = self.pid % 65535 + 1
+        t = topic.decode() if isinstance(topic, (bytes, bytearray)) else topic
+        self.broker.receive(self.clock.us // 1000, t, bytes(msg), qos)
+
+    def subscribe(self, topic, qos=0):
+        self._link()
+        self._wire(7 + len(topic), ack=True)
+        t = topic.decode() if isinstance(topic, (bytes, bytearray)) else topic
+        self.subscriptions.append(t)
+
+    def check_msg(self):
+        """Deliver one queued message to the callback, if any."""
+        self._link()
+        if self.inbox:
+            topic, msg = self.inbox.pop(0)
+            self._wire(4 + len(topic) + len(msg))
+            if self.cb:
+                self.cb(topic, msg)
+
+    def wait_msg(self):
+        while not self.inbox:
+            self._link()
+            self.clock.sleep(1000)
+        self.check_msg()
@@ -0,0 +1,74 @@
+import calendar
+import time as _time
+
+from emu import board
+from emu.clock import ticks_add, ticks_diff  # noqa: F401
+
+# ================= utime =================
+# MicroPython's time module on the virtual clock; installed as both
+# `utime` and `time`. Wall-clock time counts from Board(start=...) and the
+# tuples are MicroPython's 8-field ones. Anything MicroPython doesn't have
+# (monotonic, perf_counter, strftime, ...) is the host's.
+
+
+def _clock():
+    return board.current().clock
+
+
+def ticks_ms():
+    return _clock().ticks_ms()
+
+
+def ticks_us():
+    return _clock().ticks_us()
+
+
+ticks_cpu = ticks_us
+
+
+def bind(clock):
+    """Point ticks_* straight at clock's methods (done by Board.install),
+    so a busy-wait on ticks_us() is one call per read."""
+    global ticks_ms, ticks_us, ticks_cpu
+    ticks_ms = clock.ticks_ms
+    ticks_us = ticks_cpu = clock.ticks_us
+
+
+def sleep(s):
+    _clock().sleep(int(s * 1000000))
+
+
+def sleep_ms(ms):
+    _clock().sleep(int(ms * 1000))
+
+
+def sleep_us(us):
+    _clock().sleep(int(us))
+
+
+def time():
+    b = board.current()
+    return b.epoch + b.clock.us // 1000000
+
+
+def time_ns():
+    b = board.current()
+    return b.epoch * 1000000000 + b.clock.us * 1000
+
+
+def gmtime(secs=None):
+    """(year, month, mday, hour, minute, second, weekday, yearday)"""
+    if secs is None:
+        secs = time()
+    return tuple(_time.gmtime(secs)[:8])
+
+
+localtime = gmtime
+
+
+def mktime(t):
+    return calendar.timegm(tuple(t[:6]) + (0, 0, 0))
+
+
+def __getattr__(name):
+    return getattr(_time, name)
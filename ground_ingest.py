@@ -0,0 +1,226 @@
+import asyncio
+import collections
+import time
+
+from health import HEALTH_SUFFIX, HealthMonitor
+from outbox import is_replay, unpack_replay
+from rollups import RollupEngine
+from telemetry_batch import BatchDecoder
+from tsstore import ColumnStore
+
+# Configuration
+BROKER = "192.168.0.34"
+PORT = 1883
+TOPICS = [
+    "mars/telemetry",
+    "mars/telemetry/backlog",
+    "mars/telemetry/health",
+    # Fleet mode (simulate_rover.py --rovers N)
+    "mars/rover/+/telemetry",
+    "mars/rover/+/telemetry/backlog",
+    "mars/rover/+/telemetry/health",
+]
+STORE_DIR = "telemetry_store"
+FLUSH_INTERVAL = 1.0  # seconds between store commits
+ROVER_MAX = 32767  # the store's rover column is int16
+DEDUP_WINDOW = 1024  # replayed records remembered per topic
+
+
+def rover_from_topic(topic):
+    parts = topic.split("/")
+    if len(parts) > 2 and parts[1] == "rover":
+        try:
+            return int(parts[2])
+        except ValueError:
+            pass
+    return 0
+
+
+class RecentSet:
+    def __init__(self, size):
+        """The last size distinct keys, oldest forgotten first."""
+        self.size = size
+        self.keys = set()
+        self.order = collections.deque()
+
+    def add(self, key):
+        """False if key is already among the remembered ones."""
+        if key in self.keys:
+            return False
+        self.keys.add(key)
+        self.order.append(key)
+        if len(self.order) > self.size:
+            self.keys.discard(self.order.popleft())
+        return True
+
+
+class Ingestor:
+    def __init__(self, store, rollups=None, health=None):
+        """Decode mars/telemetry messages and append them to a ColumnStore
+        (and a RollupEngine, if given). Health reports go to a
+        health.HealthMonitor, if given, and never into the store.
+
+        Each topic gets its own decoder so the live stream and the replayed
+        backlog keep independent delta state. The rover id is taken from
+        mars/rover/<id>/... topics (0 for the single-rover topics).
+
+        After a reboot the rover's outbox replays its oldest segment from
+        the start, so backlog messages already drained arrive again. Each
+        carries the (boot, seq) of its outbox replay envelope; repeats are
+        dropped here (counted in duplicates) against the last DEDUP_WINDOW
+        ids seen on each topic.
+        """
+        self.store = store
+        self.rollups = rollups
+        self.health = health
+        self.decoders = {}
+        self.messages = 0
+        self.samples = 0
+        self.errors = 0
+        self.duplicates = 0
+
+    def handle(self, topic, payload, recv_time):
+        """Decode one message received at recv_time (epoch seconds)."""
+        if topic.endswith(HEALTH_SUFFIX):
+            if self.health is not None:
+                self.health.handle(rover_from_topic(topic), payload, recv_time)
+            return 0
+        entry = self.decoders.get(topic)
+        if entry is None:
+            entry = self.decoders[topic] = (BatchDecoder(), rover_from_topic(topic),
+                                            RecentSet(DEDUP_WINDOW))
+        dec, rover, seen = entry
+        self.messages += 1
+        if not 0 <= rover <= ROVER_MAX:
+            self.errors += 1
+            print("Rover id out of range on", topic)
+            return 0
+        # Only the outbox id says a message is a replay: equal bytes can be
+        # a genuinely new batch (wrapped seqs, a rover sitting still)
+        if is_replay(payload):
+            boot, seq, payload = unpack_replay(payload)
+            if not seen.add((boot, seq)):
+                self.duplicates += 1
+                return 0
+        try:
+            samples = dec.decode(payload, recv_time * 1000)
+        except Exception as e:
+            self.errors += 1
+            print("Bad message on", topic, ":", e)
+            return 0
+        append = self.store.append
+        rollup = self.rollups.add if self.rollups is not None else None
+        n = 0
+        for s in samples:
+            s["t"] = s.get("t", recv_time * 1000) / 1000
+            try:
+                # A value that does not fit its column leaves the row unused
+                append(s, rover)
+            except Exception as e:
+                self.errors += 1
+                print("Bad sample on", topic, ":", e)
+                continue
+            if rollup:
+                rollup(s, rover)
+            n += 1
+        self.samples += n
+        return n
+
+
+class IngestService:
+    def __init__(self, ingestor, flush_interval=FLUSH_INTERVAL):
+        """Bridge paho's network thread into an asyncio consumer.
+
+        The MQTT callback only appends to a deque and wakes the loop when
+        the consumer is idle, so bursts are decoded in batches with one
+        cross-thread wakeup.
+        """
+        self.ingestor = ingestor
+        self.flush_interval = flush_interval
+        self.pending = collections.deque()
+        self.idle = False
+        self.loop = None
+        self.wakeup = None
+
+    def on_message(self, client, userdata, msg):
+        # Runs on the paho thread
+        self.pending.append((msg.topic, msg.payload, time.time()))
+        if self.idle:
+            self.idle = False
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    async def consume(self):
+        handle = self.ingestor.handle
+        pending = self.pending
+        while True:
+            # Mark idle before the final check so a late append still wakes us
+            self.idle = True
+            if not pending:
+                await self.wakeup.wait()
+            self.idle = False
+            self.wakeup.clear()
+            n = 0
+            while pending:
+                handle(*pending.popleft())
+                n += 1
+                if n % 1024 == 0:
+                    # Let the flusher run under sustained load
+                    await asyncio.sleep(0)
+
+    async def flusher(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.ingestor.store.flush()
+            if self.ingestor.rollups is not None:
+                self.ingestor.rollups.flush()
+
+    async def stats(self, every=10.0):
+        last = self.ingestor.messages
+        health_seen = 0
+        while True:
+            await asyncio.sleep(every)
+            ing = self.ingestor
+            print(f"ingest: {(ing.messages - last) / every:.0f} msg/s, "
+                  f"{ing.samples} samples, {len(ing.store)} rows, {ing.errors} errors, "
+                  f"{ing.duplicates} duplicates")
+            last = ing.messages
+            if ing.health is not None and ing.health.reports > health_seen:
+                health_seen = ing.health.reports
+                for line in ing.health.lines():
+                    print(line)
+
+    def subscribe(self, broker=BROKER, port=PORT, topics=TOPICS):
+        """Connect paho and start feeding consume(); returns the client.
+        Call from inside the running event loop."""
+        import paho.mqtt.client as mqtt
+
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+
+        client = mqtt.Client()
+        client.on_message = self.on_message
+        client.on_connect = lambda c, u, f, rc: [c.subscribe(t) for t in topics]
+        client.connect(broker, port, 60)
+        client.loop_start()
+        return client
+
+    async def run(self, broker=BROKER, port=PORT, topics=TOPICS):
+        client = self.subscribe(broker, port, topics)
+        print(f"📡 Ground station ingesting {topics} from {broker}")
+        try:
+            await asyncio.gather(self.consume(), self.flusher(), self.stats())
+        finally:
+            client.loop_stop()
+            client.disconnect()
+
+
+if __name__ == "__main__":
+    store = ColumnStore(STORE_DIR)
+    rollups = RollupEngine()
+    rollups.rebuild(store)
+    try:
+        asyncio.run(IngestService(Ingestor(store, rollups, HealthMonitor())).run())
+    except KeyboardInterrupt:
+        print("\nStopping ingest.")
+    finally:
+        store.close()
@@ -0,0 +1,463 @@
+from array import array
+
+from telemetry_stream import get_varint, put_varint
+from ticks import ticks_ms, ticks_us, ticks_diff
+
+try:
+    import uasyncio as asyncio
+except ImportError:  # CPython host
+    import asyncio
+
+try:
+    from gc import collect, mem_alloc, mem_free
+except ImportError:  # CPython host: no MicroPython heap to report
+    from gc import collect
+
+    def mem_alloc():
+        return 0
+
+    def mem_free():
+        return 0
+
+
+def _sleep_ms(ms):
+    if hasattr(asyncio, "sleep_ms"):
+        return asyncio.sleep_ms(ms)
+    return asyncio.sleep(ms / 1000)
+
+
+# ================= Health report =================
+# How the firmware itself is doing, published every few seconds on its
+# own topic next to the telemetry. Counters cover the interval since the
+# previous report. Durations go into log2 histograms:
+#
+#   bucket 0 = 0 ms, 1 = 1 ms, 2 = 2-3 ms, 3 = 4-7 ms ... 11 = 1024 ms and up
+#
+# Layout, varints unless noted:
+#   B  0x05 kind          H  seq (big-endian)
+#   uptime_s, interval_ms
+#   mem_free_min, mem_alloc_max, gcs (collections seen), collects (ours),
+#       collect_max_us, collect_total_us
+#   lag: max_ms, hist        event-loop wake lateness (Health.run)
+#   publish: count, failures, max_us, total_us, hist
+#   B task count, then per task:
+#       B name length, name, runs, overruns, missed, errors,
+#       late_max_ms, run_max_us, run_total_us, hist (wake lateness)
+# A hist is a count n then its first n buckets (trailing zeros trimmed).
+
+HEALTH_KIND = 0x05
+BUCKETS = 12
+NAME_MAX = 16
+VARINT_MAX = 5  # counters stay below 2**35 within an interval
+HIST_MAX = 1 + BUCKETS * VARINT_MAX
+
+# Varint fields in pack() order; the buffer sizes are derived from them
+REPORT_FIELDS = ("uptime_s", "interval_ms", "mem_free_min", "mem_alloc_max", "gcs",
+                 "collects", "collect_max_us", "collect_total_us")
+PUBLISH_FIELDS = ("count", "failures", "max_us", "total_us")
+TASK_FIELDS = ("runs", "overruns", "missed", "errors", "late_max_ms", "run_max_us",
+               "run_total_us")
+# seq, report fields, lag max and hist, publish fields and hist, task count
+HEADER_MAX = (3 + (len(REPORT_FIELDS) + 1 + len(PUBLISH_FIELDS)) * VARINT_MAX
+              + 2 * HIST_MAX + 1)
+PROBE_MAX = 1 + NAME_MAX + len(TASK_FIELDS) * VARINT_MAX + HIST_MAX
+
+
+def bucket(ms):
+    """Histogram bucket of a duration in ms."""
+    if ms <= 0:
+        return 0
+    b = 0
+    while ms:
+        ms >>= 1
+        b += 1
+    return b if b < BUCKETS else BUCKETS - 1
+
+
+class Probe:
+    def __init__(self, name):
+        """Wake lateness (ms) and run time (us) of one loop."""
+        self.name = name
+        self.key = name.encode()[:NAME_MAX]
+        self.hist = array('I', [0] * BUCKETS)
+        self.task = None  # scheduler.Task, for its overrun / missed counts
+        self.last = (0, 0, 0)
+        self.reset()
+
+    def reset(self):
+        for i in range(BUCKETS):
+            self.hist[i] = 0
+        self.runs = 0
+        self.late_max = 0
+        self.run_max = 0
+        self.run_total = 0
+
+    def record(self, late_ms, run_us):
+        """One wakeup; safe in the loop, allocates nothing."""
+        self.hist[bucket(late_ms)] += 1
+        self.runs += 1
+        if late_ms > self.late_max:
+            self.late_max = late_ms
+        if run_us > self.run_max:
+            self.run_max = run_us
+        self.run_total += run_us
+
+
+class TimedClient:
+    def __init__(self, client, stats):
+        """MQTT client whose publish() is timed into stats."""
+        self.client = client
+        self.stats = stats
+
+    def publish(self, topic, msg, retain=False, qos=0):
+        t0 = ticks_us()
+        try:
+            self.client.publish(topic, msg, retain, qos)
+        except Exception:
+            self.stats.failures += 1
+            raise
+        finally:
+            self.stats.record(ticks_diff(ticks_us(), t0))
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+class PublishStats:
+    def __init__(self):
+        self.hist = array('I', [0] * BUCKETS)
+        self.reset()
+
+    def reset(self):
+        for i in range(BUCKETS):
+            self.hist[i] = 0
+        self.count = 0
+        self.failures = 0
+        self.max_us = 0
+        self.total_us = 0
+
+    def record(self, us):
+        self.hist[bucket(us // 1000)] += 1
+        self.count += 1
+        self.total_us += us
+        if us > self.max_us:
+            self.max_us = us
+
+
+class Health:
+    def __init__(self, lag_ms=100, collect_ms=0):
+        """Collects the report. run() is the lag monitor: it sleeps lag_ms
+        at a time, records how late it woke and samples the heap; with
+        collect_ms it also runs (and times) gc.collect() that often, so
+        collections happen at a known point instead of mid-driver."""
+        self.lag_ms = lag_ms
+        self.collect_ms = collect_ms
+        self.lag = Probe("lag")
+        self.publish = PublishStats()
+        self.probes = []
+        self.seq = 0
+        self.buf = bytearray(HEADER_MAX)
+        self.started = ticks_ms()
+        self.since = self.started
+        self.last_alloc = mem_alloc()
+        self._reset_mem()
+
+    def _reset_mem(self):
+        self.free_min = mem_free()
+        self.alloc_max = mem_alloc()
+        self.gcs = 0
+        self.collects = 0
+        self.collect_max = 0
+        self.collect_total = 0
+
+    def probe(self, name):
+        p = Probe(name)
+        self.probes.append(p)
+        self.buf = bytearray(HEADER_MAX + len(self.probes) * PROBE_MAX)
+        return p
+
+    def watch(self, sched):
+        """Probe every task of a scheduler.Scheduler."""
+        for t in sched.tasks:
+            t.probe = self.probe(t.name)
+            t.probe.task = t
+
+    def timed(self, client):
+        """Wrap a connected MQTT client so every publish is timed."""
+        return TimedClient(client, self.publish)
+
+    def sample_mem(self):
+        alloc = mem_alloc()
+        if alloc < self.last_alloc:
+            self.gcs += 1  # the heap shrank: something collected
+        self.last_alloc = alloc
+        if alloc > self.alloc_max:
+            self.alloc_max = alloc
+        free = mem_free()
+        if free < self.free_min:
+            self.free_min = free
+
+    def collect(self):
+        self.sample_mem()
+        t0 = ticks_us()
+        collect()
+        us = ticks_diff(ticks_us(), t0)
+        self.collects += 1
+        self.collect_total += us
+        if us > self.collect_max:
+            self.collect_max = us
+        self.last_alloc = mem_alloc()
+
+    async def run(self):
+        lag = self.lag
+        since_collect = 0
+        while True:
+            t0 = ticks_ms()
+            await _sleep_ms(self.lag_ms)
+            woke = ticks_ms()
+            lag.record(ticks_diff(woke, t0) - self.lag_ms, 0)
+            self.sample_mem()
+            if self.collect_ms:
+                since_collect += ticks_diff(woke, t0)
+                if since_collect >= self.collect_ms:
+                    since_collect = 0
+                    self.collect()
+
+    def pack(self):
+        """Encode the report into self.buf and start a new interval;
+        returns a memoryview of the message."""
+        buf = self.buf
+        now = ticks_ms()
+        self.sample_mem()
+        buf[0] = HEALTH_KIND
+        buf[1] = (self.seq >> 8) & 0xFF
+        buf[2] = self.seq & 0xFF
+        self.seq = (self.seq + 1) & 0xFFFF
+        pos = put_varint(buf, 3, ticks_diff(now, self.started) // 1000)
+        pos = put_varint(buf, pos, ticks_diff(now, self.since))
+        for v in (self.free_min, self.alloc_max, self.gcs, self.collects, self.collect_max,
+                  self.collect_total):
+            pos = put_varint(buf, pos, v)
+        pos = put_varint(buf, pos, max(0, self.lag.late_max))
+        pos = _put_hist(buf, pos, self.lag.hist)
+        p = self.publish
+        for v in (p.count, p.failures, p.max_us, p.total_us):
+            pos = put_varint(buf, pos, v)
+        pos = _put_hist(buf, pos, p.hist)
+        probes = self.probes
+        buf[pos] = len(probes)
+        pos += 1
+        for pr in probes:
+            n = len(pr.key)
+            buf[pos] = n
+            buf[pos + 1:pos + 1 + n] = pr.key
+            pos += 1 + n
+            t = pr.task
+            if t is not None:
+                o, m, e = pr.last
+                counts = (t.overruns - o, t.missed - m, t.errors - e)
+                pr.last = (t.overruns, t.missed, t.errors)
+            else:
+                counts = (0, 0, 0)
+            pos = put_varint(buf, pos, pr.runs)
+            for v in counts:
+                pos = put_varint(buf, pos, v)
+            for v in (max(0, pr.late_max), pr.run_max, pr.run_total):
+                pos = put_varint(buf, pos, v)
+            pos = _put_hist(buf, pos, pr.hist)
+            pr.reset()
+        self.lag.reset()
+        p.reset()
+        self._reset_mem()
+        self.since = now
+        return memoryview(buf)[:pos]
+
+
+def _put_hist(buf, pos, hist):
+    n = BUCKETS
+    while n and not hist[n - 1]:
+        n -= 1
+    buf[pos] = n
+    pos += 1
+    for i in range(n):
+        pos = put_varint(buf, pos, hist[i])
+    return pos
+
+
+# ================= Host side =================
+HEALTH_SUFFIX = "/health"
+
+
+def _get_hist(data, pos):
+    n = data[pos]
+    pos += 1
+    hist = [0] * BUCKETS
+    for i in range(n):
+        hist[i], pos = get_varint(data, pos)
+    return hist, pos
+
+
+def _get_varints(data, pos, n):
+    out = []
+    for _ in range(n):
+        v, pos = get_varint(data, pos)
+        out.append(v)
+    return out, pos
+
+
+def decode_health(data):
+    """Decode one health report into a dict."""
+    data = bytes(data)
+    if len(data) < 3 or data[0] != HEALTH_KIND:
+        raise ValueError("not a health report")
+    out = {"seq": (data[1] << 8) | data[2]}
+    v, pos = _get_varints(data, 3, len(REPORT_FIELDS))
+    for k, x in zip(REPORT_FIELDS, v):
+        out[k] = x
+    late_max, pos = get_varint(data, pos)
+    hist, pos = _get_hist(data, pos)
+    out["lag"] = {"late_max_ms": late_max, "hist": hist}
+    v, pos = _get_varints(data, pos, len(PUBLISH_FIELDS))
+    hist, pos = _get_hist(data, pos)
+    out["publish"] = dict(zip(PUBLISH_FIELDS, v), hist=hist)
+    tasks = out["tasks"] = {}
+    n = data[pos]
+    pos += 1
+    for _ in range(n):
+        k = data[pos]
+        name = data[pos + 1:pos + 1 + k].decode()
+        v, pos = _get_varints(data, pos + 1 + k, len(TASK_FIELDS))
+        hist, pos = _get_hist(data, pos)
+        tasks[name] = dict(zip(TASK_FIELDS, v), hist=hist)
+    return out
+
+
+def percentile(hist, q):
+    """Upper edge (ms) of the bucket holding the q-quantile; None if empty."""
+    total = sum(hist)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for b, c in enumerate(hist):
+        seen += c
+        if seen >= rank and c:
+            return 0 if b == 0 else (1 << b) - 1 if b < BUCKETS - 1 else 1 << (b - 1)
+    return 1 << (BUCKETS - 2)
+
+
+def _merge(total, part):
+    """Add a decoded counter dict into a running total."""
+    for k, v in part.items():
+        if k == "hist":
+            total[k] = [a + b for a, b in zip(total.get(k, [0] * BUCKETS), v)]
+        elif k.endswith("_max_ms") or k.endswith("max_us"):
+            total[k] = max(total.get(k, 0), v)
+        else:
+            total[k] = total.get(k, 0) + v
+
+
+class RoverHealth:
+    def __init__(self):
+        self.latest = None
+        self.received = None
+        self.reports = 0
+        self.lost = 0      # seq gaps
+        self.reboots = 0   # uptime went backwards
+        self.mem_free_min = None
+        self.gcs = 0
+        self.collects = 0
+        self.collect_max_us = 0
+        self.lag = {}
+        self.publish = {}
+        self.tasks = {}
+
+    def add(self, r, recv_time):
+        prev = self.latest
+        if prev is not None:
+            if r["uptime_s"] < prev["uptime_s"]:
+                self.reboots += 1
+            else:
+                self.lost += (r["seq"] - prev["seq"] - 1) % 65536
+        self.latest = r
+        self.received = recv_time
+        self.reports += 1
+        if r["mem_free_min"] and (self.mem_free_min is None or r["mem_free_min"] < self.mem_free_min):
+            self.mem_free_min = r["mem_free_min"]
+        self.gcs += r["gcs"]
+        self.collects += r["collects"]
+        self.collect_max_us = max(self.collect_max_us, r["collect_max_us"])
+        _merge(self.lag, r["lag"])
+        _merge(self.publish, r["publish"])
+        for name, t in r["tasks"].items():
+            _merge(self.tasks.setdefault(name, {}), t)
+
+    def summary(self):
+        """Whole-history figures for one rover, for a report line."""
+        pub = self.publish
+        out = {
+            "reports": self.reports, "lost": self.lost, "reboots": self.reboots,
+            "uptime_s": self.latest["uptime_s"],
+            "lag_p50_ms": percentile(self.lag.get("hist", ()), 0.5),
+            "lag_p99_ms": percentile(self.lag.get("hist", ()), 0.99),
+            "lag_max_ms": self.lag.get("late_max_ms", 0),
+            "mem_free_min": self.mem_free_min, "mem_free": self.latest["mem_free_min"],
+            "gcs": self.gcs, "collects": self.collects,
+            "collect_max_ms": self.collect_max_us / 1000,
+            "publishes": pub.get("count", 0), "publish_failures": pub.get("failures", 0),
+            "publish_p99_ms": percentile(pub.get("hist", ()), 0.99),
+            "publish_max_ms": pub.get("max_us", 0) / 1000,
+            "publish_avg_ms": pub.get("total_us", 0) / 1000 / max(1, pub.get("count", 0)),
+            "tasks": {},
+        }
+        for name, t in self.tasks.items():
+            out["tasks"][name] = {
+                "runs": t["runs"], "missed": t["missed"], "overruns": t["overruns"],
+                "errors": t["errors"],
+                "late_p99_ms": percentile(t["hist"], 0.99), "late_max_ms": t["late_max_ms"],
+                "run_avg_ms": t["run_total_us"] / 1000 / max(1, t["runs"]),
+                "run_max_ms": t["run_max_us"] / 1000,
+                "load": t["run_total_us"] / 1e6 / max(1, self.latest["uptime_s"]),
+            }
+        return out
+
+
+class HealthMonitor:
+    def __init__(self):
+        """Host-side aggregation of health reports, per rover."""
+        self.rovers = {}
+        self.reports = 0
+        self.errors = 0
+
+    def handle(self, rover, payload, recv_time):
+        try:
+            r = decode_health(payload)
+        except Exception as e:
+            self.errors += 1
+            print("Bad health report from rover", rover, ":", e)
+            return None
+        h = self.rovers.get(rover)
+        if h is None:
+            h = self.rovers[rover] = RoverHealth()
+        h.add(r, recv_time)
+        self.reports += 1
+        return r
+
+    def lines(self):
+        """One line per rover plus its busiest / latest tasks."""
+        out = []
+        for rover in sorted(self.rovers):
+            s = self.rovers[rover].summary()
+            free = "-" if s["mem_free_min"] is None else f"{s['mem_free_min'] / 1024:.0f} kB"
+            out.append(
+                f"rover {rover}: up {s['uptime_s']} s, lag p50 {s['lag_p50_ms']} p99 {s['lag_p99_ms']} "
+                f"max {s['lag_max_ms']} ms, heap free min {free}, gc {s['gcs']} seen "
+                f"{s['collects']} ours max {s['collect_max_ms']:.1f} ms, publish {s['publishes']} "
+                f"avg {s['publish_avg_ms']:.1f} max {s['publish_max_ms']:.1f} ms "
+                f"fail {s['publish_failures']}, reports {s['reports']} lost {s['lost']}")
+            for name, t in sorted(s["tasks"].items(), key=lambda kv: -kv[1]["load"]):
+                out.append(
+                    f"  {name:<8} runs {t['runs']:6d} missed {t['missed']:4d} late p99 "
+                    f"{t['late_p99_ms']} max {t['late_max_ms']} ms, run avg {t['run_avg_ms']:.2f} "
+                    f"max {t['run_max_ms']:.1f} ms, load {t['load'] * 100:.1f}%")
+        return out
@@ -0,0 +1,102 @@
+import math
+
+try:
+    import uasyncio as asyncio
+except ImportError:  # CPython host
+    import asyncio
+
+from mpu6050 import FIFO_SAMPLE, FIFO_SIZE, GYRO_SCALE
+
+RAD2DEG = 180 / math.pi
+
+
+def _s16(buf, i):
+    v = (buf[i] << 8) | buf[i + 1]
+    return v - 0x10000 if v & 0x8000 else v
+
+
+def _wrap(a):
+    # Into [-180, 180)
+    return (a + 180) % 360 - 180
+
+
+# ================= Fusion =================
+class ComplementaryFilter:
+    def __init__(self, alpha=0.98):
+        """Gyro-integrated angles pulled towards the accelerometer's gravity
+        estimate with weight 1 - alpha per sample.
+
+        Pitch and roll are drift-free; yaw has no absolute reference
+        without a magnetometer, so it is integrated gyro and drifts slowly.
+        """
+        self.alpha = alpha
+        self.pitch = 0.0
+        self.roll = 0.0
+        self.yaw = 0.0
+        self.samples = 0
+
+    def update(self, ax, ay, az, gx, gy, gz, dt):
+        """One sample: accel in any consistent unit, gyro in deg/s."""
+        acc_roll = math.atan2(ay, az) * RAD2DEG
+        acc_pitch = math.atan2(-ax, math.sqrt(ay * ay + az * az)) * RAD2DEG
+        if self.samples == 0:
+            self.roll, self.pitch = acc_roll, acc_pitch
+        else:
+            k = 1 - self.alpha
+            roll = self.roll + gx * dt
+            pitch = self.pitch + gy * dt
+            # Blend along the short way round so +-180 doesn't snap
+            self.roll = _wrap(roll + k * _wrap(acc_roll - roll))
+            self.pitch = _wrap(pitch + k * _wrap(acc_pitch - pitch))
+        self.yaw = _wrap(self.yaw + gz * dt)
+        self.samples += 1
+
+    def update_fifo(self, buf, n, dt):
+        """Fold in n raw FIFO samples (mpu6050 FIFO_SAMPLE layout) from buf.
+
+        Accel stays in raw counts (only its direction matters) and gyro is
+        scaled as it goes, so no per-sample tuples or arrays are built.
+        """
+        for i in range(0, n * FIFO_SAMPLE, FIFO_SAMPLE):
+            self.update(_s16(buf, i), _s16(buf, i + 2), _s16(buf, i + 4),
+                        _s16(buf, i + 6) / GYRO_SCALE, _s16(buf, i + 8) / GYRO_SCALE,
+                        _s16(buf, i + 10) / GYRO_SCALE, dt)
+
+    def angles(self):
+        """(pitch, roll, yaw) in degrees, 0..360 like the dashboard expects."""
+        return self.pitch % 360, self.roll % 360, self.yaw % 360
+
+
+# ================= Streaming task =================
+class ImuStream:
+    def __init__(self, imu, rate_hz=200, drain_hz=25, filt=None):
+        """Run an mpu6050.MPU6050 in FIFO mode and fuse it in the background.
+
+        The sensor samples at rate_hz on its own clock; the task wakes only
+        drain_hz times a second to burst-read everything queued, so the
+        publisher just reads filter.angles() at whatever rate it sends.
+        """
+        self.imu = imu
+        self.rate_hz = imu.configure_fifo(rate_hz)
+        self.dt = 1 / self.rate_hz
+        self.filter = filt if filt is not None else ComplementaryFilter()
+        self.buf = bytearray(FIFO_SIZE // FIFO_SAMPLE * FIFO_SAMPLE)
+        self.period_ms = 1000 // drain_hz
+        self.drains = 0
+        self.samples = 0
+
+    def poll(self):
+        n = self.imu.read_fifo_into(self.buf)
+        if n:
+            self.filter.update_fifo(self.buf, n, self.dt)
+            self.samples += n
+        self.drains += 1
+        return n
+
+    def angles(self):
+        return self.filter.angles()
+
+    async def run(self):
+        while True:
+            self.poll()
+            await asyncio.sleep(self.period_ms / 1000)
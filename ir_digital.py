@@ -1,5 +1,7 @@
 import machine
+import time
 import uasyncio as asyncio
+from array import array
 
 class IRDigital:
     def __init__(self, pin, active_low=True):
@@ -7,10 +9,14 @@ class IRDigital:
         self.active_low = active_low
         self.state = False
 
+    def poll(self):
+        val = self.pin.value()
+        self.state = (not val) if self.active_low else bool(val)
+        return self.state
+
     async def run(self):
         while True:
-            val = self.pin.value()
-            self.state = (not val) if self.active_low else bool(val)
+            self.poll()
 
             # yield to event loop
             await asyncio.sleep_ms(1)
@@ -18,21 +24,146 @@ class IRDigital:
     def read(self):
         return self.state
     
-import uasyncio as asyncio
-#from ir_digital import IRDigital
+# ================= Edge-triggered mode =================
+# Pin.irq timestamps every edge into a preallocated ring and sets a
+# ThreadSafeFlag; run() then sleeps only until something changes instead
+# of polling. Edges are debounced there: a level counts once it has held
+# for debounce_ms.
+#
+# ev_head and ev_tail count modulo 2 * ring: a multiple of the ring size,
+# so index % ring never jumps at the wrap, and twice it, so a full ring
+# (head - tail == ring) is not mistaken for an empty one.
+
+
+class IRStormDetector:
+    def __init__(self, pin, active_low=True, debounce_ms=20, ring=32, on_change=None):
+        self.pin = machine.Pin(pin, machine.Pin.IN)
+        self.active_low = active_low
+        self.debounce_ms = debounce_ms
+        self.on_change = on_change
+
+        self.ev_ticks = array('i', [0] * ring)
+        self.ev_level = bytearray(ring)
+        self.ev_wrap = 2 * ring
+        self.ev_head = 0  # advanced by the ISR
+        self.ev_tail = 0  # advanced by run()
+        self.overflows = 0
+        self.bounces = 0
+
+        self.state = self._level()
+        self.last_edge = time.ticks_ms()
+        self.onsets = 0
+        self.storm_start = self.last_edge if self.state else None
+        self.storm_ms_total = 0
+        self.last_storm_ms = 0
+        self._seen = self.state
+
+        self.flag = asyncio.ThreadSafeFlag()
+        self.changed = asyncio.Event()
+        self.pin.irq(
+            trigger=machine.Pin.IRQ_RISING | machine.Pin.IRQ_FALLING,
+            handler=self._irq_handler
+        )
+
+    def _level(self):
+        val = self.pin.value()
+        return (not val) if self.active_low else bool(val)
+
+    def _irq_handler(self, pin):
+        # Keep ISR short: stamp, store, wake; no allocation
+        n = len(self.ev_level)
+        if (self.ev_head - self.ev_tail) % self.ev_wrap >= n:
+            self.overflows += 1
+            return
+        i = self.ev_head % n
+        self.ev_ticks[i] = time.ticks_ms()
+        val = pin.value()
+        self.ev_level[i] = 1 - val if self.active_low else val
+        self.ev_head = (self.ev_head + 1) % self.ev_wrap
+        self.flag.set()
 
-ir = IRDigital(pin=1)  # GPIO4 = D2
+    def _commit(self, state, t):
+        self.state = state
+        self.last_edge = t
+        if state:
+            self.onsets += 1
+            self.storm_start = t
+            self._seen = True
+        elif self.storm_start is not None:
+            d = time.ticks_diff(t, self.storm_start)
+            self.last_storm_ms = d
+            self.storm_ms_total += d
+            self.storm_start = None
+        if self.on_change:
+            self.on_change(state, t)
+        self.changed.set()
 
-async def main():
-    asyncio.create_task(ir.run())
+    def _drain(self):
+        n = len(self.ev_level)
+        now = time.ticks_ms()
+        while self.ev_tail != self.ev_head:
+            i = self.ev_tail % n
+            t = self.ev_ticks[i]
+            level = bool(self.ev_level[i])
+            nxt = (self.ev_tail + 1) % self.ev_wrap
+            if nxt != self.ev_head:
+                held = time.ticks_diff(self.ev_ticks[nxt % n], t)
+            else:
+                held = time.ticks_diff(now, t)
+                if held < self.debounce_ms:
+                    # Too recent to judge; the next wakeup will see it
+                    break
+            self.ev_tail = nxt
+            if held < self.debounce_ms or level == self.state:
+                self.bounces += 1
+                continue
+            self._commit(level, t)
+        if self.ev_tail == self.ev_head:
+            # An overflowed ring can drop the last edge; trust the pin
+            level = self._level()
+            if level != self.state:
+                self._commit(level, now)
 
-    while True:
-        if ir.read():
-            print("Object detected")
-        else:
-            print("No object")
+    async def run(self):
+        while True:
+            await self.flag.wait()
+            await asyncio.sleep_ms(self.debounce_ms)
+            self._drain()
+
+    async def wait_change(self):
+        """Block until the debounced state changes; returns the new state."""
+        await self.changed.wait()
+        self.changed.clear()
+        return self.state
+
+    def read(self):
+        return self.state
+
+    def storm_seen(self):
+        """True if a storm was active at any point since the last call, so
+        a short storm between two publishes is still reported."""
+        seen = self._seen or self.state
+        self._seen = self.state
+        return seen
+
+    def storm_ms(self):
+        """Total storm time so far, including the one in progress."""
+        total = self.storm_ms_total
+        if self.storm_start is not None:
+            total += time.ticks_diff(time.ticks_ms(), self.storm_start)
+        return total
 
-        await asyncio.sleep_ms(100)
 
-asyncio.run(main())
+if __name__ == "__main__":
+    ir = IRStormDetector(pin=1)  # GPIO4 = D2
+
+    async def main():
+        asyncio.create_task(ir.run())
+
+        while True:
+            if await ir.wait_change():
+                print("Object detected (storm #%d)" % ir.onsets)
+            else:
+                print("No object (lasted %d ms)" % ir.last_storm_ms)
 
+    asyncio.run(main())
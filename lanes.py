@@ -0,0 +1,166 @@
+from array import array
+
+from ticks import ticks_ms, ticks_diff
+
+# ================= Priority lanes =================
+# Outbound messages wait in one preallocated ring per class instead of a
+# single FIFO:
+#
+#   ALARM    ir_storm / vibe changes; always sent first, at its own QoS
+#   CONTROL  routine env / status frames
+#   BULK     IMU and acoustic batches; the first thing dropped
+#
+# CONTROL and BULK share what is left by deficit round robin in the ratio
+# of their weights. With link_bps set, service() paces sends with a token
+# bucket so the queueing happens here, where it can be reordered, rather
+# than in a radio or socket buffer. Once more than high_water bytes are
+# waiting, the oldest bulk frames are dropped.
+
+ALARM, CONTROL, BULK = 0, 1, 2
+LANE_NAMES = ("alarm", "control", "bulk")
+
+
+class Lane:
+    def __init__(self, capacity, slot_size, qos=0, weight=1):
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self.qos = qos
+        self.weight = weight
+        self.slots = bytearray(capacity * slot_size)
+        self.mv = memoryview(self.slots)
+        self.lens = array('H', [0] * capacity)
+        self.ticks = array('i', [0] * capacity)
+        self.head = 0
+        self.count = 0
+        self.bytes = 0
+        self.deficit = 0
+
+        self.queued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.max_wait_ms = 0
+
+    def push(self, msg, now):
+        if self.count == self.capacity:
+            self.drop()
+        i = (self.head + self.count) % self.capacity
+        n = len(msg)
+        base = i * self.slot_size
+        self.slots[base:base + n] = msg
+        self.lens[i] = n
+        self.ticks[i] = now
+        self.count += 1
+        self.bytes += n
+        self.queued += 1
+
+    def peek_len(self):
+        return self.lens[self.head]
+
+    def drop(self):
+        """Discard the oldest message."""
+        self.bytes -= self.lens[self.head]
+        self.head = (self.head + 1) % self.capacity
+        self.count -= 1
+        self.dropped += 1
+
+
+class LaneQueue:
+    def __init__(self, publish, link_bps=0, burst_bytes=256, high_water=1024,
+                 lanes=None, clock=ticks_ms):
+        """publish(msg, qos) sends one message (e.g. Uplink.send).
+
+        link_bps=0 sends everything on each service() call, still in
+        priority order. lanes overrides the default (capacity, slot_size,
+        qos, weight) per class.
+        """
+        self.publish = publish
+        self.link_bps = link_bps
+        self.burst = burst_bytes
+        self.high_water = high_water
+        self.clock = clock
+        if lanes is None:
+            lanes = ((8, 32, 1, 0), (16, 224, 0, 3), (16, 224, 0, 1))
+        self.lanes = [Lane(*cfg) for cfg in lanes]
+        self.quantum = max(lane.slot_size for lane in self.lanes)
+        self.rr = CONTROL
+        self.visited = False
+        self.tokens = burst_bytes
+        self.last_fill = clock()
+        self.bulk_drops = 0  # dropped for backpressure, not lane overflow
+
+    def pending_bytes(self):
+        total = 0
+        for lane in self.lanes:
+            total += lane.bytes
+        return total
+
+    def put(self, lane, msg):
+        """Queue msg on a lane (ALARM, CONTROL or BULK)."""
+        q = self.lanes[lane]
+        if len(msg) > q.slot_size:
+            raise ValueError("message larger than %s slot: %d bytes" % (LANE_NAMES[lane], len(msg)))
+        q.push(msg, self.clock())
+        bulk = self.lanes[BULK]
+        while bulk.count and self.pending_bytes() > self.high_water:
+            bulk.drop()
+            self.bulk_drops += 1
+
+    def _pick(self):
+        if self.lanes[ALARM].count:
+            return ALARM
+        lanes = self.lanes
+        n = len(lanes)
+        for _ in range(2 * n):
+            lane = lanes[self.rr]
+            if self.rr != ALARM and lane.count:
+                if not self.visited:
+                    lane.deficit += self.quantum * lane.weight
+                    self.visited = True
+                if lane.deficit >= lane.peek_len():
+                    return self.rr
+            elif not lane.count:
+                lane.deficit = 0
+            self.rr = (self.rr + 1) % n
+            self.visited = False
+        return -1
+
+    def service(self):
+        """Send what the link allows, highest class first; returns the
+        number of messages sent."""
+        now = self.clock()
+        if self.link_bps:
+            elapsed = ticks_diff(now, self.last_fill)
+            self.last_fill = now
+            self.tokens = min(self.burst, self.tokens + elapsed * self.link_bps / 8000)
+        sent = 0
+        while True:
+            i = self._pick()
+            if i < 0:
+                return sent
+            q = self.lanes[i]
+            n = q.peek_len()
+            if self.link_bps and n > self.tokens and self.tokens < self.burst:
+                return sent
+            base = q.head * q.slot_size
+            self.publish(q.mv[base:base + n], q.qos)
+            wait = ticks_diff(now, q.ticks[q.head])
+            if wait > q.max_wait_ms:
+                q.max_wait_ms = wait
+            q.head = (q.head + 1) % q.capacity
+            q.count -= 1
+            q.bytes -= n
+            q.sent += 1
+            if i != ALARM:
+                q.deficit -= n
+            if self.link_bps:
+                self.tokens -= n
+            sent += 1
+
+    def stats(self, reset=False):
+        """(name, queued, sent, dropped, waiting, max_wait_ms) per lane."""
+        out = []
+        for k, q in enumerate(self.lanes):
+            out.append((LANE_NAMES[k], q.queued, q.sent, q.dropped, q.count, q.max_wait_ms))
+            if reset:
+                q.max_wait_ms = 0
+        return out
@@ -10,16 +10,16 @@ class LDR:
         return self.adc.read()
 
 
-#from ldr import LDR
-import uasyncio as asyncio
+if __name__ == "__main__":
+    #from ldr import LDR
+    import uasyncio as asyncio
 
-ldr = LDR()
+    ldr = LDR()
 
-async def main():
-    while True:
-        value = ldr.read()
-        print("LDR:", value)
-        await asyncio.sleep_ms(500)
-
-asyncio.run(main())
+    async def main():
+        while True:
+            value = ldr.read()
+            print("LDR:", value)
+            await asyncio.sleep_ms(500)
 
+    asyncio.run(main())
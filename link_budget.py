@@ -0,0 +1,109 @@
+import numpy as np
+
+# ================= Link budget =================
+# NumPy port of linkb.txt (MATLAB), same formulas and defaults. Every
+# argument may be a scalar or an array; they broadcast together, so one
+# call evaluates a whole grid of scenarios, and terms that only depend on
+# scalar arguments (the receiver noise chain, say) are computed once.
+#
+# Units follow the script: powers and gains in dB (P_t is treated as dBm,
+# as C = Pr is), f in Hz, r in metres. bitrate is in bit/s, where the
+# script takes Mbit/s and subtracts 60 dB, which is the same thing.
+
+C_LIGHT = 299792458
+K_BOLTZMANN = 1.380649e-23
+R_EARTH = 6371e3
+
+KEYS = ("EIRP", "L_fspl", "L_prop", "Pr", "N", "NF", "F", "Tr", "Ts_actual", "Ts_spec",
+        "correction", "S_actual", "margin_sensitivity", "No", "CNo", "EbNo", "margin_ebno")
+
+
+def slant_range(alt, elev_deg, radius=R_EARTH):
+    """Distance to a satellite at altitude alt seen at elev_deg above the horizon."""
+    e = np.radians(elev_deg)
+    rs = radius + np.asarray(alt, np.float64)
+    return np.sqrt(rs * rs - (radius * np.cos(e)) ** 2) - radius * np.sin(e)
+
+
+def link_budget(f=433e6, r=450e3, p_t=15, g_t=2, l_txsystem=0, l_atm=0, l_plrz=0,
+                l_point=1.5, g_r=3, g_lna_ext=0, l_rxsystem=1, s_datasheet=-135,
+                t_ant=750, b_datasheet=125e3, snr_required=-17.5, bitrate=980,
+                ebno_threshold=7.1, elev_deg=None, radius=R_EARTH):
+    """Evaluate linkb.txt; returns a dict of arrays keyed by KEYS.
+
+    r is the path length, or the altitude when elev_deg is given (the
+    range is then slant_range(r, elev_deg, radius)). The two link margins
+    are margin_sensitivity and margin_ebno.
+    """
+    if elev_deg is not None:
+        r = slant_range(r, elev_deg, radius)
+    log10 = np.log10
+
+    eirp = np.add(p_t, g_t) - l_txsystem
+    l_fspl = 20 * log10(4 * np.pi * np.multiply(r, f) / C_LIGHT)
+    l_prop = l_fspl + l_atm
+    pr = eirp - l_prop - l_plrz - l_point + np.add(g_r, g_lna_ext) - l_rxsystem
+
+    # Receiver noise chain from the datasheet sensitivity
+    n = np.subtract(s_datasheet, snr_required)
+    nf = n + 174 - 10 * log10(b_datasheet)
+    big_f = 10 ** (nf / 10)
+    tr = (big_f - 1) * 290
+    ts_actual = np.add(t_ant, tr)
+    ts_spec = big_f * 290
+    correction = 10 * log10(ts_actual / ts_spec)
+    s_actual = s_datasheet + correction
+
+    no = 10 * log10(K_BOLTZMANN * ts_actual)
+    cno = (pr - 30) - no
+    ebno = cno - 10 * log10(bitrate)
+    return {
+        "EIRP": eirp, "L_fspl": l_fspl, "L_prop": l_prop, "Pr": pr,
+        "N": n, "NF": nf, "F": big_f, "Tr": tr, "Ts_actual": ts_actual, "Ts_spec": ts_spec,
+        "correction": correction, "S_actual": s_actual,
+        "margin_sensitivity": pr - s_actual,
+        "No": no, "CNo": cno, "EbNo": ebno,
+        "margin_ebno": ebno - ebno_threshold,
+    }
+
+
+def sweep(fixed=None, **axes):
+    """Budget over the outer product of 1-D axes, e.g.
+    sweep(r=ranges, bitrate=rates)["margin_ebno"] has shape
+    (len(ranges), len(rates)). fixed overrides other defaults."""
+    args = dict(fixed or {})
+    names = list(axes)
+    for k, name in enumerate(names):
+        shape = [1] * len(names)
+        shape[k] = -1
+        args[name] = np.asarray(axes[name], np.float64).reshape(shape)
+    out = link_budget(**args)
+    full = tuple(len(axes[name]) for name in names)
+    return {key: np.broadcast_to(v, full) for key, v in out.items()}
+
+
+def margin(**params):
+    """The smaller of the two link margins (dB)."""
+    b = link_budget(**params)
+    return np.minimum(b["margin_sensitivity"], b["margin_ebno"])
+
+
+def max_bitrate(margin_db=3, **params):
+    """Highest bit/s that keeps margin_db of Eb/No margin."""
+    b = link_budget(**params)
+    return 10 ** ((b["CNo"] - params.get("ebno_threshold", 7.1) - margin_db) / 10)
+
+
+def max_range(margin_db=3, **params):
+    """Longest path (m) that keeps margin_db on both margins. Both fall
+    20 dB per decade of range, so this is closed form."""
+    r = params.get("r", 450e3)
+    if params.get("elev_deg") is not None:
+        raise ValueError("max_range works on path length; drop elev_deg")
+    return r * 10 ** ((margin(**params) - margin_db) / 20)
+
+
+if __name__ == "__main__":
+    b = link_budget()
+    for key in KEYS:
+        print(f"{key:>20s} = {float(b[key]):.4f}")
@@ -0,0 +1,174 @@
+import argparse
+import asyncio
+
+# ================= Local MQTT broker stand-in =================
+# Just enough MQTT 3.1.1 for benchmarks and local runs without an external
+# broker: CONNECT, PUBLISH (QoS 0/1 in, always QoS 0 out), SUBSCRIBE with
+# +/# wildcards, UNSUBSCRIBE, PINGREQ, DISCONNECT. No retained messages,
+# sessions or auth. A subscriber whose socket buffer exceeds
+# max_buffer bytes has messages dropped (and counted) instead of
+# stalling the publisher, like a real broker's queue limit.
+
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK = 8, 9, 10, 11
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+
+def topic_matches(filt, topic):
+    f = filt.split("/")
+    t = topic.split("/")
+    for i, part in enumerate(f):
+        if part == "#":
+            return True
+        if i >= len(t) or (part != "+" and part != t[i]):
+            return False
+    return len(f) == len(t)
+
+
+def encode_length(n):
+    out = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        out.append(b | 0x80 if n else b)
+        if not n:
+            return bytes(out)
+
+
+def publish_packet(topic, payload):
+    t = topic.encode()
+    body = len(t).to_bytes(2, "big") + t + payload
+    return bytes([PUBLISH << 4]) + encode_length(len(body)) + body
+
+
+class Session:
+    def __init__(self, broker, reader, writer):
+        self.broker = broker
+        self.reader = reader
+        self.writer = writer
+        self.filters = set()
+        self.dropped = 0
+
+    def send(self, packet):
+        transport = self.writer.transport
+        if transport.is_closing():
+            return
+        if transport.get_write_buffer_size() > self.broker.max_buffer:
+            self.dropped += 1
+            self.broker.dropped += 1
+            return
+        self.writer.write(packet)
+
+    async def read_packet(self):
+        head = await self.reader.readexactly(1)
+        n = 0
+        shift = 0
+        while True:
+            b = (await self.reader.readexactly(1))[0]
+            n |= (b & 0x7F) << shift
+            if b < 0x80:
+                break
+            shift += 7
+        body = await self.reader.readexactly(n) if n else b""
+        return head[0] >> 4, head[0] & 0x0F, body
+
+    async def serve(self):
+        broker = self.broker
+        try:
+            while True:
+                kind, flags, body = await self.read_packet()
+                if kind == CONNECT:
+                    self.writer.write(b"\x20\x02\x00\x00")
+                elif kind == PUBLISH:
+                    qos = (flags >> 1) & 0x03
+                    tlen = int.from_bytes(body[:2], "big")
+                    topic = body[2:2 + tlen].decode()
+                    pos = 2 + tlen
+                    if qos:
+                        pid = body[pos:pos + 2]
+                        pos += 2
+                        self.writer.write(b"\x40\x02" + pid)
+                    broker.route(topic, body[pos:])
+                elif kind == SUBSCRIBE:
+                    pid = body[:2]
+                    pos = 2
+                    granted = bytearray()
+                    while pos < len(body):
+                        flen = int.from_bytes(body[pos:pos + 2], "big")
+                        self.filters.add(body[pos + 2:pos + 2 + flen].decode())
+                        pos += 2 + flen + 1
+                        granted.append(0)
+                    self.writer.write(bytes([SUBACK << 4]) + encode_length(2 + len(granted))
+                                      + pid + granted)
+                elif kind == UNSUBSCRIBE:
+                    pid = body[:2]
+                    pos = 2
+                    while pos < len(body):
+                        flen = int.from_bytes(body[pos:pos + 2], "big")
+                        self.filters.discard(body[pos + 2:pos + 2 + flen].decode())
+                        pos += 2 + flen
+                    self.writer.write(b"\xb0\x02" + pid)
+                elif kind == PINGREQ:
+                    self.writer.write(b"\xd0\x00")
+                elif kind == DISCONNECT:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            broker.sessions.discard(self)
+            self.writer.close()
+
+
+class LocalBroker:
+    def __init__(self, host="127.0.0.1", port=1883, max_buffer=4 << 20):
+        self.host = host
+        self.port = port
+        self.max_buffer = max_buffer
+        self.sessions = set()
+        self.routed = 0
+        self.dropped = 0
+        self.server = None
+
+    def route(self, topic, payload):
+        self.routed += 1
+        packet = None
+        for s in self.sessions:
+            for f in s.filters:
+                if f == topic or topic_matches(f, topic):
+                    if packet is None:
+                        packet = publish_packet(topic, payload)
+                    s.send(packet)
+                    break
+
+    async def _accept(self, reader, writer):
+        s = Session(self, reader, writer)
+        self.sessions.add(s)
+        await s.serve()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._accept, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+
+async def main(host, port):
+    broker = await LocalBroker(host, port).start()
+    print(f"🛰️  Local broker on {host}:{broker.port}", flush=True)
+    await broker.serve_forever()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Minimal local MQTT broker stand-in")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=1883, help="0 picks a free port")
+    args = ap.parse_args()
+    try:
+        asyncio.run(main(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nBroker stopped.")
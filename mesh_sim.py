@@ -0,0 +1,471 @@
+import argparse
+import heapq
+import math
+import random
+import time
+from collections import deque
+
+import numpy as np
+
+from link_budget import link_budget
+from simulate_rover import IMU_BATCH, SENSOR_BATCH, VirtualRover
+
+# ================= Mesh simulator =================
+# Discrete-event model of a rover/relay mesh feeding a few gateways (the
+# nodes that reach the broker). One heap of (time, seq, kind, node)
+# events drives everything:
+#
+#   GEN   a rover's publisher emits its next message (from a trace of the
+#         real VirtualRover encoders and batchers)
+#   TRY   a node with a queued packet wants the channel: carrier sense,
+#         random backoff if busy, otherwise start transmitting
+#   END   a transmission ends: the next hop gets it unless another
+#         neighbour transmitted over it or the PER draw fails; failures
+#         are retried up to max_retries (ACKs are assumed free)
+#
+# Links come from link_budget.py: distance -> margin -> BER -> PER, with a
+# ground path-loss exponent on top of the script's free-space loss and a
+# fixed log-normal shadowing draw per link. Neighbours are found on a
+# grid with one radio range per cell, and routes are least-ETX paths to
+# the nearest gateway.
+
+GEN, TRY, END = 0, 1, 2
+MESH_HEADER = 8  # bytes per hop: src, dst, origin, seq, hops
+
+
+# ================= Traffic =================
+class _Recorder:
+    def __init__(self, clock):
+        self.clock = clock
+        self.sent = []
+
+    def publish(self, topic, payload, qos=0):
+        self.sent.append((self.clock.now / 1000, len(payload)))
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class _Stats:
+    messages = samples = 0
+
+    def lateness(self, seconds):
+        pass
+
+
+def publisher_trace(seconds=3600, imu_hz=0, sensor_hz=0.02, imu_batch=IMU_BATCH,
+                    sensor_batch=SENSOR_BATCH, seed=1):
+    """(t_s, bytes) of every message one VirtualRover publishes, on a
+    virtual clock, so sizes and batching match simulate_rover.py."""
+    clock = _Clock()
+    client = _Recorder(clock)
+    rover = VirtualRover(0, client, "mesh", _Stats(), imu_batch=imu_batch,
+                         sensor_batch=sensor_batch, seed=seed)
+    rover.imu_batcher.clock = clock
+    rover.sensor_batcher.clock = clock
+    steps = []
+    if imu_hz:
+        steps.append((1000 / imu_hz, rover.imu_step))
+    if sensor_hz:
+        steps.append((1000 / sensor_hz, rover.sensor_step))
+    due = [0.0] * len(steps)
+    end = seconds * 1000
+    while steps:
+        k = min(range(len(steps)), key=due.__getitem__)
+        if due[k] >= end:
+            break
+        clock.now = int(due[k])
+        steps[k][1]()
+        due[k] += steps[k][0]
+    return client.sent
+
+
+# ================= Radio =================
+class Radio:
+    def __init__(self, bitrate=980, path_exponent=3.0, shadow_db=4.0, min_margin_db=-3.0,
+                 **budget):
+        """Link model on top of link_budget(); extra keywords go to it."""
+        self.bitrate = bitrate
+        self.n = path_exponent
+        self.shadow_db = shadow_db
+        self.min_margin = min_margin_db
+        self.budget = dict(budget, bitrate=bitrate)
+        self.ebno_threshold = budget.get("ebno_threshold", 7.1)
+        # Margin falls 10 * n dB per decade, so the range is closed form;
+        # leave room for two sigma of favourable shadowing
+        m1 = float(self.margin(np.array([1.0]))[0])
+        self.range_m = 10 ** ((m1 - min_margin_db + 2 * shadow_db) / (10 * path_exponent))
+
+    def margin(self, d):
+        """Smaller of the two linkb.txt margins (dB) at distance d (m)."""
+        d = np.maximum(d, 1.0)
+        # Ground clutter beyond free space, booked as the script's L_atm
+        extra = 10 * (self.n - 2) * np.log10(d)
+        b = link_budget(r=d, l_atm=self.budget.get("l_atm", 0) + extra,
+                        **{k: v for k, v in self.budget.items() if k != "l_atm"})
+        return np.minimum(b["margin_sensitivity"], b["margin_ebno"])
+
+    def ber(self, margin_db):
+        """Coherent BPSK bit error rate at ebno_threshold + margin."""
+        ebno = 10 ** ((self.ebno_threshold + np.asarray(margin_db)) / 10)
+        return np.array([0.5 * math.erfc(math.sqrt(v)) for v in np.ravel(ebno)])
+
+    def airtime(self, nbytes):
+        return (nbytes + MESH_HEADER) * 8 / self.bitrate
+
+
+# ================= Topology =================
+def neighbours(x, y, radius):
+    """All pairs (i, j), i < j, closer than radius, from a uniform grid."""
+    cx = np.floor(x / radius).astype(np.int64)
+    cy = np.floor(y / radius).astype(np.int64)
+    cells = {}
+    for i, key in enumerate(zip(cx.tolist(), cy.tolist())):
+        cells.setdefault(key, []).append(i)
+    cells = {k: np.array(v) for k, v in cells.items()}
+    pi, pj = [], []
+    for (a, b), members in cells.items():
+        # Half of the 3x3 block, so each cell pair is visited once
+        for da, db in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+            other = cells.get((a + da, b + db))
+            if other is None:
+                continue
+            d = np.hypot(x[members][:, None] - x[other][None, :],
+                         y[members][:, None] - y[other][None, :])
+            ii, jj = np.nonzero(d < radius)
+            ii, jj = members[ii], other[jj]
+            if da == 0 and db == 0:
+                keep = ii < jj
+                ii, jj = ii[keep], jj[keep]
+            pi.append(ii)
+            pj.append(jj)
+    if not pi:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64)
+    return np.concatenate(pi), np.concatenate(pj)
+
+
+class Mesh:
+    def __init__(self, n_nodes, n_gateways, radio, degree=12, rover_fraction=0.5, seed=1):
+        """Random field sized for about degree neighbours per node, with
+        gateways on a regular grid across it."""
+        self.n = n_nodes
+        self.radio = radio
+        rng = np.random.default_rng(seed)
+        r = radio.range_m / 2  # typical usable hop, not the shadowed limit
+        side = math.sqrt(n_nodes * math.pi * r * r / degree)
+        self.side = side
+        self.x = rng.uniform(0, side, n_nodes)
+        self.y = rng.uniform(0, side, n_nodes)
+        k = max(1, math.ceil(math.sqrt(n_gateways)))
+        gw = []
+        for g in range(n_gateways):
+            gx = (g % k + 0.5) * side / k
+            gy = (g // k + 0.5) * side / k
+            gw.append(int(np.argmin(np.hypot(self.x - gx, self.y - gy))))
+        self.gateway = bytearray(n_nodes)
+        for g in gw:
+            self.gateway[g] = 1
+        self.rover = bytearray((rng.random(n_nodes) < rover_fraction).astype(np.uint8).tobytes())
+        for g in gw:
+            self.rover[g] = 0
+
+        # Links: margin with a shadowing draw per pair, then the BER once
+        i, j = neighbours(self.x, self.y, radio.range_m)
+        d = np.hypot(self.x[i] - self.x[j], self.y[i] - self.y[j])
+        m = radio.margin(d) - rng.normal(0, radio.shadow_db, d.size)
+        keep = m >= radio.min_margin
+        i, j, m = i[keep], j[keep], m[keep]
+        log_ok = np.log1p(-np.minimum(radio.ber(m), 0.5))
+        self.links = i.size
+        self.nbr = [[] for _ in range(n_nodes)]
+        self.nbr_ok = [[] for _ in range(n_nodes)]
+        for a, b, l in zip(i.tolist(), j.tolist(), log_ok.tolist()):
+            self.nbr[a].append(b)
+            self.nbr_ok[a].append(l)
+            self.nbr[b].append(a)
+            self.nbr_ok[b].append(l)
+        self.route()
+
+    def route(self, ref_bytes=64):
+        """Least expected-transmissions path from every node to a gateway."""
+        bits = (ref_bytes + MESH_HEADER) * 8
+        n = self.n
+        inf = float("inf")
+        cost = [inf] * n
+        self.next_hop = [-1] * n
+        self.next_ok = [0.0] * n  # log(1 - BER) of the link to next_hop
+        self.hops = [0] * n
+        heap = []
+        for g in range(n):
+            if self.gateway[g]:
+                cost[g] = 0.0
+                heap.append((0.0, g))
+        heapq.heapify(heap)
+        while heap:
+            c, u = heapq.heappop(heap)
+            if c > cost[u]:
+                continue
+            for v, l in zip(self.nbr[u], self.nbr_ok[u]):
+                c2 = c + 1 / max(1e-9, math.exp(bits * l))  # ETX of v -> u
+                if c2 < cost[v]:
+                    cost[v] = c2
+                    self.next_hop[v] = u
+                    self.next_ok[v] = l
+                    self.hops[v] = self.hops[u] + 1
+                    heapq.heappush(heap, (c2, v))
+        self.reachable = sum(1 for c in cost if c < inf)
+
+
+# ================= Simulation =================
+class MeshSim:
+    def __init__(self, mesh, trace, trace_period, queue_len=16, max_retries=3,
+                 backoff_slots=8, seed=1):
+        self.mesh = mesh
+        self.trace = trace
+        self.trace_period = trace_period
+        self.queue_len = queue_len
+        self.max_retries = max_retries
+        self.backoff_slots = backoff_slots
+        self.rng = random.Random(seed)
+        self.slot = mesh.radio.airtime(16)
+
+        n = mesh.n
+        self.queue = [deque() for _ in range(n)]
+        self.tx = bytearray(n)         # transmitting now
+        self.heard = [0] * n           # neighbour transmissions on the air here
+        self.rx_from = [-1] * n        # first sender this node locked onto
+        self.garbled = bytearray(n)    # that reception was overlapped
+        self.try_pending = bytearray(n)
+        self.trace_pos = [0] * n
+        self.trace_base = [0.0] * n
+        self.airtime_total = 0.0
+
+        self.events = []
+        self.seq = 0
+        self.now = 0.0
+        self.processed = 0
+
+        self.generated = 0
+        self.no_route = 0
+        self.delivered = 0
+        self.queue_drops = 0
+        self.retry_drops = 0
+        self.collisions = 0
+        self.bit_errors = 0
+        self.tx_attempts = 0
+        self.latency = []
+        self.hop_counts = []
+
+        # Rovers start their trace at a random phase; an empty trace (no
+        # traffic in trace_period) leaves the mesh silent
+        for i in range(n):
+            if mesh.rover[i] and trace:
+                off = self.rng.random() * trace_period
+                self.trace_base[i] = -off
+                k = 0
+                while k < len(trace) and trace[k][0] < off:
+                    k += 1
+                self.trace_pos[i] = k
+                self._next_gen(i)
+
+    def _push(self, t, kind, node):
+        self.seq += 1
+        heapq.heappush(self.events, (t, self.seq, kind, node))
+
+    def _next_gen(self, i):
+        k = self.trace_pos[i]
+        if k >= len(self.trace):
+            self.trace_base[i] += self.trace_period
+            k = 0
+        self.trace_pos[i] = k
+        self._push(self.trace_base[i] + self.trace[k][0], GEN, i)
+
+    def _enqueue(self, i, pkt):
+        q = self.queue[i]
+        if len(q) >= self.queue_len:
+            self.queue_drops += 1
+            return
+        q.append(pkt)
+        if not self.tx[i] and not self.try_pending[i]:
+            self.try_pending[i] = 1
+            self._push(self.now, TRY, i)
+
+    def _backoff(self, i, slots):
+        self.try_pending[i] = 1
+        self._push(self.now + self.rng.randint(1, slots) * self.slot, TRY, i)
+
+    def _gen(self, i):
+        size = self.trace[self.trace_pos[i]][1]
+        self.trace_pos[i] += 1
+        self._next_gen(i)
+        self.generated += 1
+        if self.mesh.next_hop[i] < 0:
+            self.no_route += 1
+            return
+        # origin, created, bytes, hops, retries
+        self._enqueue(i, [i, self.now, size, 0, 0])
+
+    def _try(self, s):
+        self.try_pending[s] = 0
+        q = self.queue[s]
+        if self.tx[s] or not q:
+            return
+        if self.heard[s]:
+            # Carrier sense: someone in range is talking
+            self._backoff(s, self.backoff_slots)
+            return
+        self.tx_attempts += 1
+        self.tx[s] = 1
+        heard, rx_from, garbled = self.heard, self.rx_from, self.garbled
+        if rx_from[s] >= 0:
+            garbled[s] = 1  # half duplex: whatever it was receiving is lost
+        for j in self.mesh.nbr[s]:
+            if heard[j] == 0 and not self.tx[j]:
+                rx_from[j] = s
+                garbled[j] = 0
+            else:
+                garbled[j] = 1
+            heard[j] += 1
+        t = self.mesh.radio.airtime(q[0][2])
+        self.airtime_total += t
+        self._push(self.now + t, END, s)
+
+    def _end(self, s):
+        mesh = self.mesh
+        self.tx[s] = 0
+        q = self.queue[s]
+        pkt = q[0]
+        nh = mesh.next_hop[s]
+        ok = self.rx_from[nh] == s and not self.garbled[nh]
+        if not ok:
+            self.collisions += 1
+        else:
+            bits = (pkt[2] + MESH_HEADER) * 8
+            if self.rng.random() >= math.exp(bits * mesh.next_ok[s]):
+                ok = False
+                self.bit_errors += 1
+        heard, rx_from, garbled = self.heard, self.rx_from, self.garbled
+        for j in mesh.nbr[s]:
+            heard[j] -= 1
+            if rx_from[j] == s:
+                rx_from[j] = -1
+            if heard[j] == 0:
+                rx_from[j] = -1
+                garbled[j] = 0
+
+        if ok:
+            q.popleft()
+            pkt[3] += 1
+            pkt[4] = 0
+            if mesh.gateway[nh]:
+                self.delivered += 1
+                self.latency.append(self.now - pkt[1])
+                self.hop_counts.append(pkt[3])
+            else:
+                self._enqueue(nh, pkt)
+        else:
+            pkt[4] += 1
+            if pkt[4] > self.max_retries:
+                q.popleft()
+                self.retry_drops += 1
+        if q:
+            # Backoff after every frame, wider after a failure
+            self._backoff(s, self.backoff_slots * (1 if ok else 1 << min(pkt[4], 4)))
+
+    def run(self, seconds):
+        events = self.events
+        pop = heapq.heappop
+        gen, try_, end = self._gen, self._try, self._end
+        while events and events[0][0] < seconds:
+            t, _, kind, node = pop(events)
+            self.now = t
+            self.processed += 1
+            if kind == TRY:
+                try_(node)
+            elif kind == END:
+                end(node)
+            else:
+                gen(node)
+        self.now = seconds
+
+    def summary(self):
+        lat = sorted(self.latency)
+
+        def pct(p):
+            return lat[min(len(lat) - 1, int(p * len(lat)))] if lat else float("nan")
+
+        sent = self.generated - self.no_route
+        return {
+            "generated": self.generated,
+            "no_route": self.no_route,
+            "delivered": self.delivered,
+            "delivery_ratio": self.delivered / sent if sent else float("nan"),
+            "queue_drops": self.queue_drops,
+            "retry_drops": self.retry_drops,
+            "collisions": self.collisions,
+            "bit_errors": self.bit_errors,
+            "tx_attempts": self.tx_attempts,
+            "latency_p50_s": pct(0.5),
+            "latency_p99_s": pct(0.99),
+            "mean_hops": sum(self.hop_counts) / len(self.hop_counts) if self.hop_counts else 0,
+            "channel_util": self.airtime_total / max(self.now, 1e-9) / self.mesh.n,
+            "events": self.processed,
+        }
+
+
+def simulate(nodes=1000, gateways=4, hours=1.0, imu_hz=0, sensor_hz=0.02, degree=12,
+             rover_fraction=0.5, seed=1, **radio):
+    """Build a mesh and run it; returns (summary dict, mesh, wall seconds)."""
+    t0 = time.perf_counter()
+    period = 3600
+    trace = publisher_trace(period, imu_hz, sensor_hz, seed=seed)
+    mesh = Mesh(nodes, gateways, Radio(**radio), degree, rover_fraction, seed)
+    sim = MeshSim(mesh, trace, period, seed=seed)
+    setup = time.perf_counter() - t0
+    sim.run(hours * 3600)
+    out = sim.summary()
+    out["setup_s"] = setup
+    out["wall_s"] = time.perf_counter() - t0
+    return out, mesh
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Discrete-event rover/relay mesh simulator")
+    ap.add_argument("--nodes", type=int, default=1000)
+    ap.add_argument("--gateways", type=int, default=4)
+    ap.add_argument("--hours", type=float, default=1.0)
+    ap.add_argument("--imu-hz", type=float, default=0, help="IMU samples/s per rover")
+    ap.add_argument("--sensor-hz", type=float, default=0.02, help="env samples/s per rover")
+    ap.add_argument("--degree", type=float, default=12, help="target neighbours per node")
+    ap.add_argument("--rovers", type=float, default=0.5, help="fraction of nodes that publish")
+    ap.add_argument("--bitrate", type=float, default=980)
+    ap.add_argument("--path-exponent", type=float, default=3.0)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+    if args.imu_hz < 0 or args.sensor_hz < 0 or not (args.imu_hz or args.sensor_hz):
+        ap.error("--imu-hz and --sensor-hz must be >= 0, and not both 0")
+
+    out, mesh = simulate(args.nodes, args.gateways, args.hours, args.imu_hz, args.sensor_hz,
+                         args.degree, args.rovers, args.seed, bitrate=args.bitrate,
+                         path_exponent=args.path_exponent)
+    print(f"🛰️  {mesh.n} nodes ({sum(mesh.rover)} rovers, {sum(mesh.gateway)} gateways) over "
+          f"{mesh.side / 1000:.1f} km square, radio range {mesh.radio.range_m / 1000:.2f} km, "
+          f"{mesh.links} links, {mesh.reachable} routable")
+    print(f"   {args.hours:g} h simulated in {out['wall_s']:.1f} s ({out['events']} events, "
+          f"{out['events'] / max(out['wall_s'] - out['setup_s'], 1e-9):.0f} events/s)")
+    print(f"   generated {out['generated']}  delivered {out['delivered']} "
+          f"({out['delivery_ratio'] * 100:.1f}%)  no route {out['no_route']}  "
+          f"queue drops {out['queue_drops']}  retry drops {out['retry_drops']}")
+    print(f"   collisions {out['collisions']}  bit errors {out['bit_errors']}  "
+          f"attempts {out['tx_attempts']}  channel use {out['channel_util'] * 100:.2f}%/node")
+    print(f"   latency p50 {out['latency_p50_s']:.2f} s  p99 {out['latency_p99_s']:.2f} s  "
+          f"mean hops {out['mean_hops']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
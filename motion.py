@@ -0,0 +1,111 @@
+import math
+from array import array
+
+try:
+    import uasyncio as asyncio
+except ImportError:  # CPython host
+    import asyncio
+
+
+def _sleep_ms(ms):
+    if hasattr(asyncio, "sleep_ms"):
+        return asyncio.sleep_ms(ms)
+    return asyncio.sleep(ms / 1000)
+
+
+# ================= Motion controller =================
+# One task moves every servo. Each axis follows a trapezoidal profile:
+# accelerate at max_accel up to max_vel, then brake so it stops on the
+# target. PWM is written only when the integer duty changes, and once
+# every axis has settled the task sleeps on an Event until set_target().
+#
+# A servo is anything with target_angle, current_angle, min_angle,
+# max_angle and write(angle) -> True if the PWM was touched (AsyncServo).
+
+
+class MotionController:
+    def __init__(self, update_ms=20, capacity=8):
+        self.update_ms = update_ms
+        self.dt = update_ms / 1000
+        self.servos = []
+        self.vel = array('f', [0] * capacity)
+        self.max_vel = array('f', [0] * capacity)
+        self.max_accel = array('f', [0] * capacity)
+        self.wake = asyncio.Event()
+        self.moving = False
+
+        self.ticks = 0     # control steps run
+        self.writes = 0    # PWM writes issued
+        self.suspends = 0  # times the task went idle
+
+    def add(self, servo, max_vel=180, max_accel=720):
+        """Take over servo; limits in deg/s and deg/s^2. Returns its index."""
+        i = len(self.servos)
+        if i == len(self.vel):
+            raise ValueError("controller full: %d servos" % i)
+        self.servos.append(servo)
+        self.vel[i] = 0
+        self.max_vel[i] = max_vel
+        self.max_accel[i] = max_accel
+        servo.controller = self
+        self.moving = True
+        return i
+
+    def set_target(self, i, angle):
+        self.servos[i].set_target(angle)
+
+    def notify(self):
+        """Called by AsyncServo.set_target: resume the task if idle."""
+        self.moving = True
+        self.wake.set()
+
+    def step(self):
+        """Advance every axis by update_ms; returns True while any moves."""
+        dt = self.dt
+        moving = False
+        self.ticks += 1
+        for i in range(len(self.servos)):
+            s = self.servos[i]
+            pos = s.current_angle
+            v = self.vel[i]
+            err = s.target_angle - pos
+            if err == 0 and v == 0:
+                continue
+            a = self.max_accel[i]
+            dv = a * dt
+            # Fastest speed that can still stop on the target, shedding dv
+            # per step (discrete form of sqrt(2 * a * err))
+            want = min(self.max_vel[i], dv * (math.sqrt(0.25 + 2 * abs(err) / (dv * dt)) - 0.5))
+            if err < 0:
+                want = -want
+            if want > v + dv:
+                v += dv
+            elif want < v - dv:
+                v -= dv
+            else:
+                v = want
+            nxt = pos + v * dt
+            if (err > 0 and nxt >= s.target_angle) or (err < 0 and nxt <= s.target_angle) \
+                    or (abs(err) < dv * dt and abs(v) <= dv):
+                # Arrived (or would overshoot): land exactly and stop
+                nxt = s.target_angle
+                v = 0
+            else:
+                moving = True
+            self.vel[i] = v
+            s.current_angle = nxt
+            if s.write(nxt):
+                self.writes += 1
+        self.moving = moving
+        return moving
+
+    async def run(self):
+        while True:
+            if self.step():
+                await _sleep_ms(self.update_ms)
+            else:
+                # Everything settled: no wakeups until a new target
+                self.suspends += 1
+                self.wake.clear()
+                if not self.moving:
+                    await self.wake.wait()
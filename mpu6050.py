@@ -1,27 +1,149 @@
-from machine import I2C
 import struct
+from array import array
+
+# Registers
+PWR_MGMT_1 = 0x6B
+ACCEL_XOUT_H = 0x3B  # 14 bytes: accel x/y/z, temp, gyro x/y/z (big-endian int16)
+SMPLRT_DIV = 0x19
+CONFIG = 0x1A
+FIFO_EN = 0x23
+USER_CTRL = 0x6A
+FIFO_COUNTH = 0x72
+FIFO_R_W = 0x74
+
+# FIFO streaming: accel x/y/z then gyro x/y/z per sample, big-endian int16
+FIFO_SIZE = 1024
+FIFO_SAMPLE = 12
+FIFO_EN_ACCEL_GYRO = 0x78
+USER_CTRL_FIFO_EN = 0x40
+USER_CTRL_FIFO_RESET = 0x04
+DLPF_44HZ = 3  # any DLPF setting 1..6 gives a 1 kHz base sample rate
+
+# Default full-scale ranges: +-2 g, +-250 deg/s
+ACCEL_SCALE = 16384  # LSB per g
+GYRO_SCALE = 131     # LSB per deg/s
+
+# read_into() output layout
+AX, AY, AZ, GX, GY, GZ, TEMP = range(7)
+
 
 class MPU6050:
     def __init__(self, i2c, addr=0x68):
+        """For 1 kHz sampling create the bus with freq=400000: a 14-byte
+        burst takes ~0.4 ms at 400 kHz but ~1.6 ms at 100 kHz."""
         self.i2c = i2c
         self.addr = addr
+        self._buf = bytearray(14)
+        self._raw = array('h', [0] * 7)
+        self._out = array('f', [0] * 7)
+        self._reg = bytearray(2)
+        self._fifo_buf = None
+        self._fifo_mv = None
+        self.rate_hz = None
+        self.fifo_overflows = 0
 
         # Wake up MPU6050
-        self.i2c.writeto_mem(self.addr, 0x6B, b'\x00')
+        self.i2c.writeto_mem(self.addr, PWR_MGMT_1, b'\x00')
+
+    def read_raw_into(self, raw=None):
+        """One burst read of all sensors into raw (array('h', 7)), in
+        register order: ax, ay, az, temp, gx, gy, gz.
+
+        Uses the preallocated bus buffer and small ints only, so it does
+        not touch the heap.
+        """
+        buf = self._buf
+        if raw is None:
+            raw = self._raw
+        self.i2c.readfrom_mem_into(self.addr, ACCEL_XOUT_H, buf)
+        for i in range(7):
+            v = (buf[2 * i] << 8) | buf[2 * i + 1]
+            raw[i] = v - 0x10000 if v & 0x8000 else v
+        return raw
+
+    def read_into(self, out=None):
+        """One burst read, scaled into out (array('f', 7) or any list of 7):
+        ax, ay, az in g, gx, gy, gz in deg/s, temp in C (see AX..TEMP).
+
+        Without out, an internal array is reused and returned; copy it if
+        you keep it past the next call.
+        """
+        raw = self.read_raw_into()
+        if out is None:
+            out = self._out
+        out[AX] = raw[0] / ACCEL_SCALE
+        out[AY] = raw[1] / ACCEL_SCALE
+        out[AZ] = raw[2] / ACCEL_SCALE
+        out[GX] = raw[4] / GYRO_SCALE
+        out[GY] = raw[5] / GYRO_SCALE
+        out[GZ] = raw[6] / GYRO_SCALE
+        out[TEMP] = raw[3] / 340 + 36.53
+        return out
+
+    def read_all(self):
+        """((ax, ay, az), (gx, gy, gz), temp) from a single transaction."""
+        o = self.read_into()
+        return (o[AX], o[AY], o[AZ]), (o[GX], o[GY], o[GZ]), o[TEMP]
+
+    # ================= FIFO streaming =================
+    def _write(self, reg, value):
+        self._reg[0] = value
+        self.i2c.writeto_mem(self.addr, reg, memoryview(self._reg)[:1])
+
+    def configure_fifo(self, rate_hz=200, dlpf=DLPF_44HZ):
+        """Sample accel + gyro into the FIFO at ~rate_hz (1 kHz / divider).
+
+        Returns the actual rate. The 1024-byte FIFO holds 85 samples, so
+        it must be drained at least every 85 / rate seconds.
+        """
+        div = max(0, min(255, int(1000 / rate_hz + 0.5) - 1))
+        self._write(CONFIG, dlpf)
+        self._write(SMPLRT_DIV, div)
+        self._write(FIFO_EN, FIFO_EN_ACCEL_GYRO)
+        self.reset_fifo()
+        self.rate_hz = 1000 / (div + 1)
+        return self.rate_hz
+
+    def reset_fifo(self):
+        self._write(USER_CTRL, USER_CTRL_FIFO_RESET)
+        self._write(USER_CTRL, USER_CTRL_FIFO_EN)
+
+    def fifo_count(self):
+        self.i2c.readfrom_mem_into(self.addr, FIFO_COUNTH, self._reg)
+        return (self._reg[0] << 8) | self._reg[1]
+
+    def read_fifo_into(self, buf):
+        """Drain whole samples (up to len(buf) bytes) in one burst.
+
+        Returns the number of FIFO_SAMPLE-byte samples now at the start of
+        buf. A full FIFO has been overwriting itself and lost sample
+        alignment, so it is reset, counted in fifo_overflows and 0 returned.
+        """
+        n = self.fifo_count()
+        if n >= FIFO_SIZE:
+            self.fifo_overflows += 1
+            self.reset_fifo()
+            return 0
+        n = min(n, len(buf)) // FIFO_SAMPLE * FIFO_SAMPLE
+        if n:
+            if buf is not self._fifo_buf:
+                self._fifo_buf = buf
+                self._fifo_mv = memoryview(buf)
+            self.i2c.readfrom_mem_into(self.addr, FIFO_R_W, self._fifo_mv[:n])
+        return n // FIFO_SAMPLE
 
     def _read(self, reg):
         data = self.i2c.readfrom_mem(self.addr, reg, 14)
         return struct.unpack('>hhhhhhh', data)
 
     def get_accel(self):
-        ax, ay, az, _, _, _, _ = self._read(0x3B)
-        return ax/16384, ay/16384, az/16384
+        ax, ay, az, _, _, _, _ = self._read(ACCEL_XOUT_H)
+        return ax/ACCEL_SCALE, ay/ACCEL_SCALE, az/ACCEL_SCALE
 
     def get_gyro(self):
-        _, _, _, gx, gy, gz, _ = self._read(0x3B)
-        return gx/131, gy/131, gz/131
+        _, _, _, _, gx, gy, gz = self._read(ACCEL_XOUT_H)
+        return gx/GYRO_SCALE, gy/GYRO_SCALE, gz/GYRO_SCALE
 
     def get_temp(self):
-        _, _, _, _, _, _, temp = self._read(0x3B)
+        _, _, _, temp, _, _, _ = self._read(ACCEL_XOUT_H)
         return temp / 340 + 36.53
-
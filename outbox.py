@@ -0,0 +1,296 @@
+import os
+import struct
+
+from ticks import ticks_ms, ticks_diff, ticks_add
+
+# ================= Outbox =================
+# Store-and-forward queue on the flash filesystem.
+#
+# Messages are appended to numbered segment files under `root`, each record
+# being a 2-byte big-endian length followed by the payload. When the total
+# exceeds max_segments the oldest segment is deleted whole, which is cheap
+# on flash. The read position is only kept in RAM, so after a reboot the
+# oldest segment is replayed from the start (at-least-once delivery). With
+# replay_ids=True every record is stored inside a replay envelope, so
+# ground_ingest.Ingestor can tell a replay from a new message that happens
+# to have the same bytes. A record torn by power loss is skipped.
+
+SEG_SUFFIX = ".seg"
+
+# ================= Replay envelope =================
+# Written around a record when it is stored, so it is replayed with it:
+#
+#   B   0x06    replay marker
+#   4s  boot    random per Outbox instance, i.e. per boot
+#   I   seq     records appended since then
+#
+# (boot, seq) identifies the record; decoders strip it transparently.
+
+REPLAY_KIND = 0x06
+REPLAY_FMT = ">B4sI"
+REPLAY_SIZE = struct.calcsize(REPLAY_FMT)
+
+
+def is_replay(data):
+    return len(data) >= REPLAY_SIZE and data[0] == REPLAY_KIND
+
+
+def unpack_replay(data):
+    """Return (boot, seq, message) for a replay-wrapped record."""
+    _, boot, seq = struct.unpack_from(REPLAY_FMT, data)
+    return bytes(boot), seq, memoryview(data)[REPLAY_SIZE:]
+
+
+class FlashFS:
+    """Thin wrapper over os/open so a fake filesystem can be swapped in."""
+
+    def listdir(self, path):
+        return os.listdir(path)
+
+    def mkdir(self, path):
+        try:
+            os.mkdir(path)
+        except OSError:
+            pass
+
+    def remove(self, path):
+        os.remove(path)
+
+    def open(self, path, mode):
+        return open(path, mode)
+
+
+class Outbox:
+    def __init__(self, root="/outbox", segment_size=4096, max_segments=8, fs=None,
+                 replay_ids=False):
+        self.root = root
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        self.fs = fs if fs is not None else FlashFS()
+        self.hdr = bytearray(2)
+
+        # Replay envelope, preallocated; boot is new every time we start
+        self.envelope = bytearray(REPLAY_SIZE) if replay_ids else None
+        self.boot = os.urandom(4)
+        self.seq = 0
+
+        self.fs.mkdir(root)
+        self.segments = sorted(
+            int(name[:-len(SEG_SUFFIX)])
+            for name in self.fs.listdir(root)
+            if name.endswith(SEG_SUFFIX)
+        )
+        # Never append after a possibly torn tail: start a fresh segment
+        self.write_size = segment_size
+        self.read_off = 0
+        self._next = None
+
+        self.appended = 0
+        self.evicted_segments = 0
+
+    def _path(self, seg):
+        return "%s/%08d%s" % (self.root, seg, SEG_SUFFIX)
+
+    def __len__(self):
+        """Number of segments on flash (0 means the outbox is empty)."""
+        return len(self.segments)
+
+    def append(self, data):
+        env = self.envelope
+        n = len(data) + (REPLAY_SIZE if env is not None else 0)
+        if n > 0xFFFF:
+            raise ValueError("record too large: %d bytes" % n)
+        if not self.segments or self.write_size + 2 + n > self.segment_size:
+            self.segments.append(self.segments[-1] + 1 if self.segments else 0)
+            self.write_size = 0
+            self._evict()
+
+        self.hdr[0] = n >> 8
+        self.hdr[1] = n & 0xFF
+        with self.fs.open(self._path(self.segments[-1]), "ab") as f:
+            f.write(self.hdr)
+            if env is not None:
+                struct.pack_into(REPLAY_FMT, env, 0, REPLAY_KIND, self.boot, self.seq)
+                self.seq = (self.seq + 1) & 0xFFFFFFFF
+                f.write(env)
+            f.write(data)
+        self.write_size += 2 + n
+        self.appended += 1
+
+    def _evict(self):
+        # Oldest-first eviction, a whole segment at a time
+        while len(self.segments) > self.max_segments:
+            seg = self.segments.pop(0)
+            self.fs.remove(self._path(seg))
+            self.read_off = 0
+            self._next = None
+            self.evicted_segments += 1
+
+    def peek(self):
+        """Return the oldest stored record, or None if the outbox is empty."""
+        while self._next is None and self.segments:
+            data = None
+            with self.fs.open(self._path(self.segments[0]), "rb") as f:
+                f.seek(self.read_off)
+                hdr = f.read(2)
+                if len(hdr) == 2:
+                    data = f.read((hdr[0] << 8) | hdr[1])
+                    if len(data) != (hdr[0] << 8) | hdr[1]:
+                        data = None  # torn by power loss
+            if data is not None:
+                self._next = data
+            elif len(self.segments) == 1:
+                # Caught up with the writer
+                return None
+            else:
+                self._drop_head()
+        return self._next
+
+    def pop(self):
+        """Discard the record returned by peek() once it has been sent."""
+        if self._next is None:
+            return
+        self.read_off += 2 + len(self._next)
+        self._next = None
+        if len(self.segments) == 1 and self.read_off >= self.write_size:
+            self._drop_head()
+
+    def _drop_head(self):
+        self.fs.remove(self._path(self.segments.pop(0)))
+        self.read_off = 0
+        if not self.segments:
+            self.write_size = 0
+
+
+# ================= Uplink =================
+class Uplink:
+    def __init__(self, connect, topic, outbox, backlog_topic=None,
+                 backoff_ms=1000, max_backoff_ms=60000,
+                 drain_bps=200, drain_burst=512,
+                 on_connect=None, on_disconnect=None, clock=ticks_ms):
+        """Publish through an MQTT client, parking messages in an Outbox
+        while the link is down.
+
+        connect() must return a connected client, None while the link is
+        still coming up (it is polled again on the next service() call), or
+        raise. Failed reconnects back off exponentially from backoff_ms to
+        max_backoff_ms. The backlog is
+        replayed on backlog_topic, paced by a drain_bps token bucket so live
+        telemetry keeps priority.
+        """
+        self.connect = connect
+        self.topic = topic
+        self.backlog_topic = backlog_topic if backlog_topic is not None else topic
+        self.outbox = outbox
+        self.backoff_ms = backoff_ms
+        self.max_backoff_ms = max_backoff_ms
+        self.drain_bps = drain_bps
+        self.drain_burst = drain_burst
+        self.on_connect = on_connect
+        self.on_disconnect = on_disconnect
+        self.clock = clock
+
+        self.client = None
+        self.delay_ms = backoff_ms
+        self.next_try = clock()
+        self.tokens = 0
+        self.fill_rem = 0
+        self.last_fill = clock()
+
+        self.sent = 0
+        self.stored = 0
+        self.drained = 0
+        self.reconnects = 0
+        self.failures = 0
+
+    @property
+    def connected(self):
+        return self.client is not None
+
+    def send(self, msg, qos=0):
+        """Publish a live message, or store it if the uplink is down."""
+        if self.client is not None:
+            try:
+                if qos:
+                    self.client.publish(self.topic, msg, qos=qos)
+                else:
+                    self.client.publish(self.topic, msg)
+                self.sent += 1
+                return True
+            except Exception as e:
+                print("Publish failed:", e)
+                self._lost()
+        self.outbox.append(msg)
+        self.stored += 1
+        return False
+
+    def publish(self, topic, msg):
+        """Publish on another topic if connected; never stored. For
+        status messages that are worthless once stale."""
+        if self.client is None:
+            return False
+        try:
+            self.client.publish(topic, msg)
+            return True
+        except Exception as e:
+            print("Publish failed:", e)
+            self._lost()
+            return False
+
+    def service(self):
+        """Reconnect when the backoff expires and drain some backlog."""
+        now = self.clock()
+        if self.client is None:
+            if ticks_diff(now, self.next_try) < 0:
+                return
+            try:
+                client = self.connect()
+            except Exception as e:
+                print("Reconnect failed:", e, "retry in", self.delay_ms, "ms")
+                self.failures += 1
+                self.next_try = ticks_add(now, self.delay_ms)
+                self.delay_ms = min(self.delay_ms * 2, self.max_backoff_ms)
+                return
+            if client is None:
+                return
+            self.client = client
+            self.delay_ms = self.backoff_ms
+            self.reconnects += 1
+            self.last_fill = now
+            if self.on_connect:
+                self.on_connect()
+        self._drain(now)
+
+    def _drain(self, now):
+        # Credit in byte-ms, keeping the sub-byte remainder, so the rate
+        # does not depend on how often service() is called
+        credit = ticks_diff(now, self.last_fill) * self.drain_bps + self.fill_rem
+        self.last_fill = now
+        self.tokens += credit // 1000
+        self.fill_rem = credit % 1000
+        if self.tokens >= self.drain_burst:
+            self.tokens = self.drain_burst
+            self.fill_rem = 0
+        while self.client is not None:
+            msg = self.outbox.peek()
+            if msg is None or (len(msg) > self.tokens and self.tokens < self.drain_burst):
+                return
+            try:
+                self.client.publish(self.backlog_topic, msg)
+            except Exception as e:
+                print("Backlog publish failed:", e)
+                self._lost()
+                return
+            self.outbox.pop()
+            self.tokens -= len(msg)
+            self.drained += 1
+
+    def _lost(self):
+        try:
+            self.client.disconnect()
+        except Exception:
+            pass
+        self.client = None
+        self.next_try = ticks_add(self.clock(), self.delay_ms)
+        if self.on_disconnect:
+            self.on_disconnect()
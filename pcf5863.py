@@ -79,6 +79,8 @@ class PCF8563:
         self.address = address if address else PCF8563_SLAVE_ADDRESS
         self.buffer = bytearray(16)
         self.bytebuf = memoryview(self.buffer[0:1])
+        self.timebuf = bytearray(7)
+        self.voltage_low = False
 
     def __write_byte(self, reg, val):
         self.bytebuf[0] = val
@@ -134,10 +136,19 @@ class PCF8563:
     def datetime(self):
         """Return a tuple such as (year, month, date, day, hours, minutes,
         seconds).
+
+        Registers 0x02-0x08 are read in one burst, which the chip latches
+        for the duration of the transfer, so fields can't tear across a
+        rollover. voltage_low is set if the VL flag says the clock may have
+        stopped since it was last set.
         """
-        return (self.year(), self.month(), self.date(),
-                self.day(), self.hours(), self.minutes(),
-                self.seconds())
+        b = self.timebuf
+        self.i2c.readfrom_mem_into(self.address, PCF8563_SEC_REG, b)
+        self.voltage_low = bool(b[0] & PCF8563_VOL_LOW_MASK)
+        bcd = self.__bcd2dec
+        return (bcd(b[6]), bcd(b[5] & PCF8563_MONTH_MASK), bcd(b[3] & PCF8563_DAY_MASK),
+                bcd(b[4] & PCF8563_WEEKDAY_MASK), bcd(b[2] & PCF8563_HOUR_MASK),
+                bcd(b[1] & PCF8563_minuteS_MASK), bcd(b[0] & 0x7F))
 
     def write_all(self, seconds=None, minutes=None, hours=None, day=None,
                   date=None, month=None, year=None):
@@ -0,0 +1,149 @@
+from array import array
+
+from ticks import ticks_ms, ticks_diff
+
+# ================= Send-on-delta =================
+# Decides, sample by sample, whether a stream needs a frame at all. Each
+# value slot has a deadband: a slot whose value moved less than that
+# since it was last sent keeps its last sent value in held[], so the
+# telemetry_stream delta leaves it out of the change mask. A frame goes
+# out when any slot leaves its deadband, when an alarm slot changes at
+# all (urgent, never rate limited), or after heartbeat_ms of silence
+# (every slot refreshed, so the receiver can bound its error).
+#
+# set_margin() widens the deadbands and the minimum spacing between
+# non-alarm frames as the link margin shrinks, up to max_scale.
+
+SKIP, SEND, URGENT = 0, 1, 2
+
+# Slot layouts used by the publishers, in encode_into() argument order
+ENV_SLOTS = ("temp", "light", "vibe", "ir_storm")
+ENV_DEADBANDS = (0.2, 25, 0, 0)  # degC, ADC counts; vibe / ir_storm are alarms
+ENV_ALARMS = (2, 3)
+IMU_SLOTS = ("pitch", "roll", "yaw")
+IMU_DEADBANDS = (1.0, 1.0, 2.0)  # degrees
+IMU_ANGLES = (0, 1, 2)
+
+
+class SendOnDelta:
+    def __init__(self, deadbands, heartbeat_ms=30000, min_interval_ms=0, alarms=(),
+                 angles=(), good_margin_db=10, max_scale=8, clock=ticks_ms):
+        n = len(deadbands)
+        self.n = n
+        self.deadband = array('f', deadbands)
+        self.held = array('f', [0] * n)
+        self.alarm = bytearray(n)
+        for i in alarms:
+            self.alarm[i] = 1
+        self.angle = bytearray(n)
+        for i in angles:
+            self.angle[i] = 1
+        self.heartbeat_ms = heartbeat_ms
+        self.min_interval_ms = min_interval_ms
+        self.good_margin_db = good_margin_db
+        self.max_scale = max_scale
+        self.scale = 1.0
+        self.clock = clock
+        self.last_send = 0
+        self.started = False
+
+        self.samples = 0
+        self.sent = 0
+        self.urgent = 0
+        self.heartbeats = 0
+
+    def set_margin(self, margin_db):
+        """Scale deadbands and spacing: 1x at good_margin_db and above,
+        max_scale at 0 dB and below, geometric in between."""
+        if margin_db >= self.good_margin_db:
+            self.scale = 1.0
+        elif margin_db <= 0:
+            self.scale = float(self.max_scale)
+        else:
+            self.scale = self.max_scale ** (1 - margin_db / self.good_margin_db)
+        return self.scale
+
+    def _moved(self, i, v):
+        d = v - self.held[i]
+        if self.angle[i]:
+            d %= 360
+            if d > 180:
+                d -= 360
+        return d if d >= 0 else -d
+
+    def update(self, values, now=None):
+        """SKIP, SEND or URGENT for this sample; on a send, held[] has the
+        values to encode."""
+        if now is None:
+            now = self.clock()
+        self.samples += 1
+        held = self.held
+        n = self.n
+        if not self.started:
+            for i in range(n):
+                held[i] = values[i]
+            self.started = True
+            return self._sent(now, SEND)
+
+        # Alarms first: a change landing on the heartbeat tick is still urgent
+        urgent = False
+        for i in range(n):
+            if self.alarm[i] and values[i] != held[i]:
+                urgent = True
+        silent = ticks_diff(now, self.last_send)
+        if silent >= self.heartbeat_ms:
+            for i in range(n):
+                held[i] = values[i]
+            self.heartbeats += 1
+            if urgent:
+                self.urgent += 1
+                return self._sent(now, URGENT)
+            return self._sent(now, SEND)
+
+        spaced = silent >= self.min_interval_ms * self.scale
+        if not urgent and not spaced:
+            return SKIP
+
+        scale = self.scale
+        changed = urgent
+        for i in range(n):
+            if self.alarm[i]:
+                held[i] = values[i]
+            elif self._moved(i, values[i]) > self.deadband[i] * scale:
+                held[i] = values[i]
+                changed = True
+        if not changed:
+            return SKIP
+        if urgent:
+            self.urgent += 1
+            return self._sent(now, URGENT)
+        return self._sent(now, SEND)
+
+    def _sent(self, now, action):
+        self.last_send = now
+        self.sent += 1
+        return action
+
+
+# ================= Host (NumPy) =================
+def reconstruct(t, v, grid, mode="linear", angle=False):
+    """Continuous series on grid from sparse (t, v) updates.
+
+    mode "hold" repeats the last received value (exact for alarm slots);
+    "linear" interpolates between updates, which follows a ramp the rover
+    only reported each time it left the deadband. Angles are unwrapped
+    first, so 359 -> 1 interpolates through 0.
+    """
+    import numpy as np
+
+    t = np.asarray(t, np.float64)
+    v = np.asarray(v, np.float64)
+    grid = np.asarray(grid, np.float64)
+    if angle:
+        v = np.degrees(np.unwrap(np.radians(v)))
+    if mode == "hold":
+        i = np.clip(np.searchsorted(t, grid, side="right") - 1, 0, len(t) - 1)
+        out = v[i]
+    else:
+        out = np.interp(grid, t, v)
+    return out % 360 if angle else out
@@ -0,0 +1,223 @@
+import numpy as np
+
+from tsstore import MISSING_INT
+
+# ================= Rollups =================
+# Incremental min / max / sum / count per field at several resolutions.
+#
+# Buckets are indexed by floor(t / resolution) and stored in dense blocks
+# of BLOCK buckets that are allocated on first use, so sparse histories
+# cost little memory while a query over a range only touches the blocks
+# it covers. Samples are buffered and folded in with vectorized ufunc.at
+# updates, which also handles out-of-order (backlog) data.
+#
+# Each rover (the store's rover column) has its own set of rollups, so a
+# fleet's series are never mixed; queries default to rover 0, the
+# single-rover topics.
+
+RESOLUTIONS = (1, 60, 3600)
+FIELDS = ("temp", "light", "vibe", "ir_storm", "pitch", "roll", "yaw")
+BLOCK = 4096
+
+
+class Rollup:
+    def __init__(self, res, n_fields):
+        self.res = res
+        self.n_fields = n_fields
+        self.blocks = {}
+
+    def _block(self, b):
+        blk = self.blocks.get(b)
+        if blk is None:
+            shape = (BLOCK, self.n_fields)
+            blk = self.blocks[b] = (
+                np.zeros(shape, np.int64),
+                np.zeros(shape, np.float64),
+                np.full(shape, np.inf),
+                np.full(shape, -np.inf),
+            )
+        return blk
+
+    def add_many(self, t, x):
+        """Fold samples in: t is (n,) seconds, x is (n, fields), NaN = missing."""
+        idx = np.floor(t / self.res).astype(np.int64)
+        valid = ~np.isnan(x)
+        x0 = np.where(valid, x, 0.0)
+        lo = np.where(valid, x, np.inf)
+        hi = np.where(valid, x, -np.inf)
+        blocks = idx // BLOCK
+        for b in np.unique(blocks):
+            sel = blocks == b
+            i = idx[sel] - b * BLOCK
+            cnt, tot, mn, mx = self._block(int(b))
+            np.add.at(cnt, i, valid[sel])
+            np.add.at(tot, i, x0[sel])
+            np.minimum.at(mn, i, lo[sel])
+            np.maximum.at(mx, i, hi[sel])
+
+    def series(self, f, t0, t1):
+        """Non-empty buckets of field index f in [t0, t1).
+
+        Returns (t, mean, min, max, count); t is the bucket centre.
+        """
+        first = int(np.floor(t0 / self.res))
+        last = int(np.ceil(t1 / self.res))
+        parts = []
+        for b in range(first // BLOCK, (last - 1) // BLOCK + 1):
+            blk = self.blocks.get(b)
+            if blk is None:
+                continue
+            lo = max(first - b * BLOCK, 0)
+            hi = min(last - b * BLOCK, BLOCK)
+            cnt = blk[0][lo:hi, f]
+            nz = np.nonzero(cnt)[0]
+            if len(nz):
+                parts.append((b * BLOCK + lo + nz, cnt[nz], blk[1][lo:hi, f][nz],
+                              blk[2][lo:hi, f][nz], blk[3][lo:hi, f][nz]))
+        if not parts:
+            empty = np.empty(0)
+            return empty, empty, empty, empty, np.empty(0, np.int64)
+        idx, cnt, tot, mn, mx = (np.concatenate(p) for p in zip(*parts))
+        return (idx + 0.5) * self.res, tot / cnt, mn, mx, cnt
+
+
+class RollupEngine:
+    def __init__(self, fields=FIELDS, resolutions=RESOLUTIONS, buffer_rows=4096):
+        self.fields = tuple(fields)
+        self.col = {name: i for i, name in enumerate(self.fields)}
+        self.resolutions = tuple(sorted(resolutions))
+        self.rovers = {}  # rover id -> [Rollup per resolution]
+        self.empty = self._new()
+        self.buffer_rows = buffer_rows
+        self._t = []
+        self._x = []
+        self._r = []
+
+    def _new(self):
+        return [Rollup(res, len(self.fields)) for res in self.resolutions]
+
+    def rollups(self, rover=0):
+        """The rover's rollups, finest first (empty ones if it has none)."""
+        return self.rovers.get(rover, self.empty)
+
+    def add(self, sample, rover=0):
+        """Buffer one decoded sample dict ("t" in seconds); a "rover" key
+        in the sample wins over the argument, as in ColumnStore.append."""
+        get = sample.get
+        self._t.append(sample["t"])
+        self._x.append([np.nan if get(f) is None else float(get(f)) for f in self.fields])
+        self._r.append(get("rover", rover))
+        if len(self._t) >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._t:
+            return
+        t = np.asarray(self._t, np.float64)
+        x = np.asarray(self._x, np.float64)
+        r = np.asarray(self._r, np.int64)
+        self._t = []
+        self._x = []
+        self._r = []
+        self._add_rovers(t, x, r)
+
+    def _add_rovers(self, t, x, r):
+        rovers = np.unique(r)
+        if len(rovers) == 1:
+            self.add_many(t, x, int(rovers[0]))
+            return
+        for rover in rovers:
+            sel = r == rover
+            self.add_many(t[sel], x[sel], int(rover))
+
+    def add_many(self, t, x, rover=0):
+        rollups = self.rovers.get(rover)
+        if rollups is None:
+            rollups = self.rovers[rover] = self._new()
+        for ru in rollups:
+            ru.add_many(t, x)
+
+    def rebuild(self, store):
+        """Recompute all rollups from a tsstore.ColumnStore, chunk by chunk."""
+        self.rovers.clear()
+        for start, stop in store.chunks_between(-np.inf, np.inf):
+            t = np.asarray(store.read("t", start, stop), np.float64)
+            r = np.asarray(store.read("rover", start, stop), np.int64)
+            x = np.empty((len(t), len(self.fields)))
+            for j, name in enumerate(self.fields):
+                col = np.asarray(store.read(name, start, stop), np.float64)
+                if dict(store.schema)[name] not in "fd":
+                    col[col == MISSING_INT] = np.nan
+                x[:, j] = col
+            self._add_rovers(t, x, r)
+
+    def pick(self, t0, t1, max_points, rover=0):
+        """Coarsest rollup that still has max_points buckets in the range.
+
+        The next resolution down is at most 60x finer, so the buckets read
+        stay a constant multiple of the points rendered.
+        """
+        rollups = self.rollups(rover)
+        for r in reversed(rollups):
+            if (t1 - t0) / r.res >= max_points:
+                return r
+        return rollups[0]
+
+    def series(self, field, t0, t1, res, rover=0):
+        for r in self.rollups(rover):
+            if r.res == res:
+                return r.series(self.col[field], t0, t1)
+        raise ValueError("no rollup at %s s" % res)
+
+    def history(self, field, t0, t1, max_points=500, rover=0):
+        """(t, mean) for [t0, t1) with at most max_points points.
+
+        Work is bounded by the bucket count of the chosen resolution, not
+        by the number of raw samples in the range.
+        """
+        self.flush()
+        r = self.pick(t0, t1, max_points, rover)
+        t, mean, _, _, _ = r.series(self.col[field], t0, t1)
+        idx = lttb(t, mean, max_points)
+        return t[idx], mean[idx]
+
+
+# ================= LTTB =================
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets; returns the indices to keep.
+
+    Bucket averages are computed in one pass with cumulative sums; the
+    per-bucket pick depends on the previous pick, so it walks the buckets
+    in order with a vectorized argmax inside each.
+    """
+    x = np.asarray(x, np.float64)
+    y = np.asarray(y, np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    # Areas are translation invariant; rebasing keeps the cumsums exact
+    x = x - x[0]
+
+    # n_out - 2 buckets over the interior points [1, n - 1)
+    edges = (1 + np.arange(n_out - 1) * ((n - 2) / (n_out - 2))).astype(np.int64)
+    edges[-1] = n - 1
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    size = np.diff(edges)
+    avg_x = (cx[edges[1:]] - cx[edges[:-1]]) / size
+    avg_y = (cy[edges[1:]] - cy[edges[:-1]]) / size
+    # The "next" point for bucket k is bucket k+1's average (last point at the end)
+    nxt_x = np.append(avg_x[1:], x[-1])
+    nxt_y = np.append(avg_y[1:], y[-1])
+
+    out = np.empty(n_out, np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+    a = 0
+    for k in range(n_out - 2):
+        lo, hi = edges[k], edges[k + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - nxt_x[k]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (nxt_y[k] - ay))
+        a = lo + int(np.argmax(area))
+        out[k + 1] = a
+    return out
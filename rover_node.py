@@ -0,0 +1,303 @@
+import network
+import time
+import uasyncio as asyncio
+from umqtt.simple import MQTTClient
+import machine
+import dht
+from acoustic import PEAK, RMS, ZCR
+from dhtasync import AsyncDHT22
+from health import Health
+from imu_fusion import ImuStream
+from ir_digital import IRStormDetector
+from lanes import ALARM, BULK, CONTROL, LaneQueue
+from ldr import LDR
+from MIC import Microphone
+from motion import MotionController
+from mpu6050 import MPU6050
+from outbox import Outbox, Uplink
+from rate_control import (ENV_ALARMS, ENV_DEADBANDS, IMU_ANGLES, IMU_DEADBANDS, SKIP, URGENT,
+                          SendOnDelta)
+from scheduler import Scheduler, SampleBus
+from servoasync import AsyncServo
+from telemetry_batch import BatchPublisher
+from telemetry_codec import ACOUSTIC_SIZE, FLAG_HAS_ENV, FLAG_HAS_IMU, pack_acoustic_into
+from telemetry_stream import StreamEncoder
+
+# Importable name for the hyphenated driver script
+DigitalInterruptWindow = __import__("vibration-sensor").DigitalInterruptWindow
+
+# Whole rover from one event loop: every driver is a scheduler task that
+# writes into the shared sample bus, and the publisher tasks read it.
+
+# ================= WiFi =================
+SSID = "Parsec-Guest"
+PASSWORD = "Parsec@Guest"
+
+# ================= MQTT =================
+MQTT_BROKER = "192.168.0.34"
+MQTT_PORT = 1883
+TOPIC = b"mars/telemetry"
+BACKLOG_TOPIC = b"mars/telemetry/backlog"
+HEALTH_TOPIC = b"mars/telemetry/health"
+CLIENT_ID = b"esp32c3_team18"
+
+# ================= Pins =================
+LDR_PIN = 0
+IR_PIN = 1
+VIBE_PIN = 2
+MIC_PIN = 3
+I2C_SDA, I2C_SCL = 4, 5
+SERVO_PIN = 6
+LED_PIN = 8
+DHT_PIN = 9
+
+# ================= Bus channels =================
+CH_LIGHT = 0
+CH_SOUND = 1  # rms, peak, zcr
+CH_IR = 2
+CH_VIBE = 3   # intensity 0..100, edge rate Hz, longest burst ms
+CH_ENV = 4   # temp, humidity
+CH_IMU = 5   # pitch, roll, yaw
+
+# ================= Rates =================
+IMU_RATE_HZ = 200
+IMU_DRAIN_HZ = 25
+PUBLISH_HZ = 20
+ENV_PERIOD_MS = 1000       # fastest non-alarm env rate
+ENV_HEARTBEAT_MS = 30000   # longest silence per stream
+IMU_HEARTBEAT_MS = 10000
+RSSI_FLOOR_DBM = -90       # link margin = RSSI above this
+UPLINK_BPS = 0             # 0 = WiFi, no pacing; 980 behind the mesh radio
+SOUND_RATE_HZ = 8000
+SOUND_BLOCK = 256  # 32 ms of audio per block
+SOUND_PERIOD_MS = 1000
+HEALTH_PERIOD_MS = 10000
+LAG_PROBE_MS = 100
+GC_PERIOD_MS = 10000       # collect here, between drivers, and time it
+
+led = machine.Pin(LED_PIN, machine.Pin.OUT)
+wlan = network.WLAN(network.STA_IF)
+join_start = None
+
+# ================= WiFi Connect =================
+def connect_wifi(timeout_ms=15000):
+    """Start joining and return at once: True once connected, False while
+    still joining. Polled from the uplink, so the loop never waits on it."""
+    global join_start
+    if wlan.isconnected():
+        if join_start is not None:
+            join_start = None
+            print("WiFi connected")
+            print("IP:", wlan.ifconfig()[0])
+        return True
+
+    now = time.ticks_ms()
+    if join_start is None:
+        print("Connecting to WiFi...")
+        wlan.active(True)
+        wlan.connect(SSID, PASSWORD)
+        join_start = now
+    elif time.ticks_diff(now, join_start) > timeout_ms:
+        join_start = None
+        raise OSError("WiFi connect timeout")
+    return False
+
+# ================= MQTT Connect =================
+def connect():
+    if not connect_wifi():
+        return None
+    print("Connecting to MQTT...")
+    client = MQTTClient(CLIENT_ID, MQTT_BROKER, port=MQTT_PORT, keepalive=60)
+    client.connect()
+    print("MQTT connected")
+    # Every publish is timed into the health report
+    return health.timed(client)
+
+def on_connect():
+    led.on()
+    imu_encoder.reset()
+    env_encoder.reset()
+
+def on_disconnect():
+    print("Uplink lost, storing to flash")
+    led.off()
+
+# ================= Drivers =================
+bus = SampleBus(capacity=64)
+sched = Scheduler(coalesce_ms=4)
+health = Health(lag_ms=LAG_PROBE_MS, collect_ms=GC_PERIOD_MS)
+
+i2c = machine.I2C(0, scl=machine.Pin(I2C_SCL), sda=machine.Pin(I2C_SDA), freq=400000)
+imu = ImuStream(MPU6050(i2c), rate_hz=IMU_RATE_HZ, drain_hz=IMU_DRAIN_HZ)
+ldr = LDR(LDR_PIN)
+mic = Microphone(MIC_PIN).sampler(SOUND_RATE_HZ, SOUND_BLOCK)
+# IR edges go on the bus from the debounce task; no polling
+ir = IRStormDetector(IR_PIN, on_change=lambda state, t: bus.put(CH_IR, t, state))
+vibration = DigitalInterruptWindow(VIBE_PIN, active_high=True, window_ms=500)
+climate = AsyncDHT22(dht.DHT22(machine.Pin(DHT_PIN)))
+servo = AsyncServo(SERVO_PIN)
+# Servo moves run in their own task, which sleeps while nothing is moving
+motion = MotionController(update_ms=20)
+motion.add(servo, max_vel=120, max_accel=360)
+
+def imu_step(now):
+    imu.poll()
+    pitch, roll, yaw = imu.angles()
+    bus.put(CH_IMU, now, pitch, roll, yaw)
+
+def light_step(now):
+    bus.put(CH_LIGHT, now, ldr.read())
+
+def sound_step(now):
+    global sound_seq
+    # Blocks for one audio block; only the features go uplink
+    f = mic.features()
+    bus.put(CH_SOUND, now, f[RMS], f[PEAK], f[ZCR])
+    pack_acoustic_into(sound_frame, sound_seq, f)
+    bulk.add(sound_frame)
+    sound_seq += 1
+
+def vibe_step(now):
+    intensity = vibration.process()
+    t = vibration.tremor
+    bus.put(CH_VIBE, now, intensity, t.edge_rate, t.burst_ms)
+
+async def env_task():
+    # climate.run() owns the DHT22; this only wakes on a new reading
+    while True:
+        temp, hum = await climate.wait_for_new()
+        bus.put(CH_ENV, time.ticks_ms(), temp, hum)
+
+# ================= Publisher =================
+imu_encoder = StreamEncoder(stream_id=0, keyframe_interval=20)
+env_encoder = StreamEncoder(stream_id=1, keyframe_interval=20)
+uplink = Uplink(
+    connect,
+    TOPIC,
+    Outbox("/outbox", segment_size=4096, max_segments=8, replay_ids=True),
+    backlog_topic=BACKLOG_TOPIC,
+    on_connect=on_connect,
+    on_disconnect=on_disconnect
+)
+# Alarms jump the queue; routine env frames beat IMU / audio batches,
+# which are dropped first when the uplink backs up
+lanes = LaneQueue(uplink.send, link_bps=UPLINK_BPS)
+control = BatchPublisher(lambda m: lanes.put(CONTROL, m), capacity=16, max_count=8, max_bytes=200,
+                         max_age_ms=10000)
+bulk = BatchPublisher(lambda m: lanes.put(BULK, m), capacity=32, max_count=8, max_bytes=200,
+                      max_age_ms=10000)
+alarm_encoder = StreamEncoder(stream_id=2, keyframe_interval=1)  # keyframes only
+# Frames only when something moved past its deadband; alarms at once
+env_rate = SendOnDelta(ENV_DEADBANDS, heartbeat_ms=ENV_HEARTBEAT_MS, min_interval_ms=ENV_PERIOD_MS,
+                       alarms=ENV_ALARMS)
+imu_rate = SendOnDelta(IMU_DEADBANDS, heartbeat_ms=IMU_HEARTBEAT_MS,
+                       min_interval_ms=1000 // PUBLISH_HZ, angles=IMU_ANGLES)
+env_vals = [0.0] * 4
+imu_vals = [0.0] * 3
+imu_seq = 0
+env_seq = 0
+alarm_seq = 0
+sound_seq = 0
+sound_frame = bytearray(ACOUSTIC_SIZE)
+
+def latest(chan, k=0, default=0):
+    slot = bus.latest(chan)
+    return default if slot < 0 else bus.value(slot, k)
+
+def publish_env(now):
+    global env_seq, alarm_seq
+    env_vals[0] = latest(CH_ENV)
+    env_vals[1] = latest(CH_LIGHT)
+    # Peak tremor / latched storm since the last check, so a short alarm
+    # between two publisher ticks still registers as a change
+    env_vals[2] = vibration.peak()
+    env_vals[3] = 1 if ir.storm_seen() else 0
+    action = env_rate.update(env_vals, now)
+    if action == SKIP:
+        return
+    held = env_rate.held
+    if action == URGENT:
+        # Own stream of self-contained frames, so it can overtake the env
+        # stream's queued deltas without breaking their order
+        n = alarm_encoder.encode_into(alarm_seq, held[0], int(held[1]), int(held[2]), held[3] > 0,
+                                      flags=FLAG_HAS_ENV)
+        lanes.put(ALARM, memoryview(alarm_encoder.buf)[:n])
+        alarm_seq += 1
+        return
+    n = env_encoder.encode_into(env_seq, held[0], int(held[1]), int(held[2]), held[3] > 0,
+                                flags=FLAG_HAS_ENV)
+    control.add(memoryview(env_encoder.buf)[:n])
+    env_seq += 1
+
+def publish_step(now):
+    global imu_seq
+    # Polls the WiFi join, reconnects with backoff and drains the flash
+    # backlog; never waits, so the other tasks keep their rates offline
+    uplink.service()
+    publish_env(now)
+
+    slot = bus.latest(CH_IMU)
+    if slot >= 0:
+        for k in range(3):
+            imu_vals[k] = bus.value(slot, k)
+        if imu_rate.update(imu_vals, now) != SKIP:
+            held = imu_rate.held
+            n = imu_encoder.encode_into(imu_seq, pitch=held[0], roll=held[1], yaw=held[2],
+                                        flags=FLAG_HAS_IMU)
+            bulk.add(memoryview(imu_encoder.buf)[:n])
+            imu_seq += 1
+    control.poll()
+    bulk.poll()
+    lanes.service()
+
+def link_step(now):
+    # Weaker link: wider deadbands and fewer frames
+    if wlan.isconnected():
+        margin = wlan.status("rssi") - RSSI_FLOOR_DBM
+        env_rate.set_margin(margin)
+        imu_rate.set_margin(margin)
+
+def health_step(now):
+    # Loop lag, task lateness, heap and publish times since the last
+    # report. Never stored: while the uplink is down the counters keep
+    # accumulating, and the next report covers the whole gap
+    if uplink.connected:
+        uplink.publish(HEALTH_TOPIC, health.pack())
+
+def report_step(now):
+    for name, runs, overruns, missed, errors, late, run in sched.stats(reset=True):
+        print("%-8s runs %6d overruns %4d missed %4d errors %3d late %3d ms run %3d ms"
+              % (name, runs, overruns, missed, errors, late, run))
+    print("wakeups", sched.wakeups)
+    for name, queued, sent, dropped, waiting, wait in lanes.stats(reset=True):
+        print("lane %-8s queued %5d sent %5d dropped %4d waiting %2d max wait %5d ms"
+              % (name, queued, sent, dropped, waiting, wait))
+    print("sent env %d/%d imu %d/%d urgent %d scale %.1f" % (env_rate.sent, env_rate.samples,
+          imu_rate.sent, imu_rate.samples, env_rate.urgent, imu_rate.scale))
+    print("vibe windows", vibration.tremor.windows, "ring overflows", vibration.ring.overflows)
+    print("ir storms", ir.onsets, "storm ms", ir.storm_ms(), "bounces", ir.bounces,
+          "overflows", ir.overflows)
+    print("servo steps", motion.ticks, "pwm writes", motion.writes, "idle", motion.suspends)
+    print("dht age", climate.age_ms(), "ms reads", climate.reads, "errors", climate.errors,
+          "rejects", climate.rejects)
+
+# ================= Main =================
+sched.add("imu", imu_step, hz=IMU_DRAIN_HZ, deadline_ms=20)
+sched.add("sound", sound_step, period_ms=SOUND_PERIOD_MS, deadline_ms=100)
+sched.add("vibe", vibe_step, hz=10)
+sched.add("light", light_step, hz=2)
+sched.add("publish", publish_step, hz=PUBLISH_HZ)
+sched.add("link", link_step, period_ms=5000)
+sched.add("report", report_step, period_ms=60000)
+sched.add("health", health_step, period_ms=HEALTH_PERIOD_MS)
+health.watch(sched)
+
+async def main():
+    asyncio.create_task(ir.run())
+    asyncio.create_task(climate.run())
+    asyncio.create_task(motion.run())
+    asyncio.create_task(env_task())
+    asyncio.create_task(health.run())
+    await sched.run()
+
+asyncio.run(main())
@@ -1,23 +1,101 @@
 import machine
+import time
 import pcf8563
 
+# Re-anchor the cached clock against the RTC this often
+RESYNC_MS = 10 * 60 * 1000
+
+
 class RTC:
-    def __init__(self, scl=5, sda=4):
+    def __init__(self, scl=5, sda=4, resync_ms=RESYNC_MS):
         self.i2c = machine.I2C(
             scl=machine.Pin(scl),
             sda=machine.Pin(sda)
         )
         self.rtc = pcf8563.PCF8563(self.i2c)
+        self.resync_ms = resync_ms
+        self.corrections = 0
+        self.sync(edge=True)
+
+    # ================= Cached clock =================
+    # The RTC is read once and then extrapolated with ticks_ms(), so now()
+    # and time() cost no bus traffic. resync() re-reads it and nudges the
+    # estimate back inside the RTC's current second when the two disagree.
+
+    def _read(self):
+        """(RTC seconds since 2000-01-01, weekday register) in one burst."""
+        y, mo, d, wd, h, mi, s = self.rtc.datetime()
+        return time.mktime((2000 + y, mo, d, h, mi, s, 0, 0)), wd
+
+    def _anchor(self, secs, wd, ticks):
+        self.anchor_s = secs
+        self.anchor_wd = wd
+        self.anchor_ticks = ticks
+        self.synced = ticks
+
+    def sync(self, edge=False):
+        """Anchor to the RTC. With edge=True, wait for the next seconds
+        rollover (up to ~1 s of polling) so the sub-second phase is known
+        rather than up to a second off; meant for boot, not per sample.
+        """
+        secs, wd = self._read()
+        if edge:
+            start = time.ticks_ms()
+            while time.ticks_diff(time.ticks_ms(), start) < 1100:
+                time.sleep_ms(5)
+                nxt, wd = self._read()
+                if nxt != secs:
+                    secs = nxt
+                    break
+        self._anchor(secs, wd, time.ticks_ms())
+
+    def resync(self):
+        """One RTC read; keep our phase unless it falls outside the RTC's
+        current second, then move by the smallest amount that fixes it."""
+        secs, wd = self._read()
+        now = time.ticks_ms()
+        est = (self.anchor_s - secs) * 1000 + time.ticks_diff(now, self.anchor_ticks)
+        phase = min(max(est, 0), 999)
+        if phase != est:
+            self.corrections += 1
+        self._anchor(secs, wd, time.ticks_add(now, -phase))
+
+    def maybe_resync(self):
+        if time.ticks_diff(time.ticks_ms(), self.synced) >= self.resync_ms:
+            self.resync()
+
+    async def run(self):
+        """Background re-anchoring; also keeps ticks_ms() wrap-around
+        (every ~12 days) from ever reaching the extrapolation."""
+        import uasyncio as asyncio
+        while True:
+            self.maybe_resync()
+            await asyncio.sleep_ms(1000)
+
+    def time_ms(self):
+        """Milliseconds since 2000-01-01, no bus traffic."""
+        return self.anchor_s * 1000 + time.ticks_diff(time.ticks_ms(), self.anchor_ticks)
+
+    def time(self):
+        """Seconds since 2000-01-01, no bus traffic."""
+        return self.anchor_s + time.ticks_diff(time.ticks_ms(), self.anchor_ticks) // 1000
 
     def now(self):
         """
         Returns:
         (year, month, day, weekday, hour, minute, second)
         """
-        return self.rtc.datetime()
+        secs = self.time()
+        y, mo, d, h, mi, s, _, _ = time.localtime(secs)
+        # Weekday follows the RTC register's own numbering
+        wd = (self.anchor_wd + secs // 86400 - self.anchor_s // 86400) % 7
+        return y % 100, mo, d, wd, h, mi, s
 
     def set(self, dt):
         """
         dt = (year, month, day, weekday, hour, minute, second)
         """
-        self.rtc.datetime(dt)
+        y, mo, d, wd, h, mi, s = dt
+        self.rtc.write_all(seconds=s, minutes=mi, hours=h, day=wd,
+                           date=d, month=mo, year=y % 100)
+        self.sync()
@@ -0,0 +1,192 @@
+from array import array
+
+from ticks import ticks_ms, ticks_us, ticks_diff, ticks_add
+
+try:
+    import uasyncio as asyncio
+except ImportError:  # CPython host
+    import asyncio
+
+
+def _sleep_ms(ms):
+    if hasattr(asyncio, "sleep_ms"):
+        return asyncio.sleep_ms(ms)
+    return asyncio.sleep(ms / 1000)
+
+
+# ================= Sample bus =================
+# Shared ring of preallocated slots. Producers write a channel id, a
+# ticks_ms stamp and up to WIDTH floats straight into the arrays;
+# consumers read the same slots by index through a Cursor (every sample,
+# in order) or latest() (current value of a channel). Nothing is
+# allocated per sample.
+
+WIDTH = 3
+MAX_CHANNELS = 32
+_WRAP = 1 << 24  # sample counter wraps long before it stops being a small int
+
+
+class SampleBus:
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.chan = bytearray(capacity)
+        self.ticks = array('i', [0] * capacity)
+        self.vals = array('f', [0] * (capacity * WIDTH))
+        self.last = array('i', [-1] * MAX_CHANNELS)
+        self.head = 0
+
+    def put(self, chan, t, a, b=0, c=0):
+        """Append one sample; returns its slot."""
+        i = self.head % self.capacity
+        self.chan[i] = chan
+        self.ticks[i] = t
+        j = i * WIDTH
+        vals = self.vals
+        vals[j] = a
+        vals[j + 1] = b
+        vals[j + 2] = c
+        self.last[chan] = i
+        self.head = (self.head + 1) % _WRAP
+        return i
+
+    def latest(self, chan):
+        """Slot of the newest sample on chan, or -1 if there is none."""
+        return self.last[chan]
+
+    def value(self, slot, k=0):
+        return self.vals[slot * WIDTH + k]
+
+    def cursor(self):
+        return Cursor(self)
+
+
+class Cursor:
+    def __init__(self, bus):
+        """Independent read position; starts at the current head."""
+        self.bus = bus
+        self.pos = bus.head
+        self.lost = 0
+
+    def next(self):
+        """Slot of the next unread sample, or -1 when caught up.
+
+        If producers lapped this reader, the overwritten samples are
+        skipped and counted in lost.
+        """
+        bus = self.bus
+        behind = (bus.head - self.pos) % _WRAP
+        if behind == 0:
+            return -1
+        if behind > bus.capacity:
+            self.lost += behind - bus.capacity
+            self.pos = (bus.head - bus.capacity) % _WRAP
+        i = self.pos % bus.capacity
+        self.pos = (self.pos + 1) % _WRAP
+        return i
+
+
+# ================= Scheduler =================
+class Task:
+    def __init__(self, name, fn, period_ms, deadline_ms, due):
+        self.name = name
+        self.fn = fn
+        self.period = period_ms
+        self.deadline = deadline_ms
+        self.due = due
+        self.slack = 0
+        self.runs = 0
+        self.overruns = 0  # finished later than due + deadline
+        self.missed = 0    # whole periods skipped after falling behind
+        self.errors = 0
+        self.last_error = None
+        self.max_late_ms = 0
+        self.max_run_ms = 0
+        self.probe = None  # health.Probe: lateness histogram, run time in us
+
+
+class Scheduler:
+    def __init__(self, coalesce_ms=4, clock=ticks_ms):
+        """Runs every registered driver from one coroutine.
+
+        Each wakeup also runs tasks due within coalesce_ms (capped at a
+        quarter of their period), so drivers with nearby deadlines share
+        one wakeup instead of each sleeping on its own. Tasks run
+        tightest-deadline first and are plain functions fn(now_ms) that
+        should return quickly.
+        """
+        self.coalesce = coalesce_ms
+        self.clock = clock
+        self.tasks = []
+        self.wakeups = 0
+
+    def add(self, name, fn, hz=None, period_ms=None, deadline_ms=None, phase_ms=0):
+        """Register fn at hz (or every period_ms). deadline_ms defaults to
+        one period: a run must finish before the next one is due."""
+        if period_ms is None:
+            period_ms = max(1, int(1000 / hz))
+        if deadline_ms is None:
+            deadline_ms = period_ms
+        task = Task(name, fn, period_ms, deadline_ms, ticks_add(self.clock(), phase_ms))
+        task.slack = min(self.coalesce, period_ms // 4)
+        self.tasks.append(task)
+        self.tasks.sort(key=lambda t: t.deadline)
+        return task
+
+    def run_due(self):
+        """Run everything due in the coalescing window; return ms to sleep."""
+        clock = self.clock
+        self.wakeups += 1
+        now = clock()
+        for t in self.tasks:
+            if ticks_diff(t.due, now) > t.slack:
+                continue
+            start = clock()
+            probe = t.probe
+            if probe is not None:
+                t0 = ticks_us()
+            try:
+                t.fn(start)
+            except Exception as e:
+                # One failing sensor must not stop the rest of the rover
+                t.errors += 1
+                t.last_error = e
+            end = clock()
+            t.runs += 1
+            late = ticks_diff(start, t.due)
+            if probe is not None:
+                probe.record(late, ticks_diff(ticks_us(), t0))
+            if late > t.max_late_ms:
+                t.max_late_ms = late
+            if ticks_diff(end, start) > t.max_run_ms:
+                t.max_run_ms = ticks_diff(end, start)
+            if ticks_diff(end, t.due) > t.deadline:
+                t.overruns += 1
+            t.due = ticks_add(t.due, t.period)
+            behind = ticks_diff(end, t.due)
+            if behind >= t.period:
+                # Skip (and count) missed periods rather than running a burst
+                skip = behind // t.period
+                t.missed += skip
+                t.due = ticks_add(t.due, skip * t.period)
+
+        now = clock()
+        wait = None
+        for t in self.tasks:
+            d = ticks_diff(t.due, now)
+            if wait is None or d < wait:
+                wait = d
+        return 0 if wait is None or wait < 0 else wait
+
+    async def run(self):
+        while True:
+            # Sleeping 0 still yields, so other coroutines (uplink) get in
+            await _sleep_ms(self.run_due())
+
+    def stats(self, reset=False):
+        out = []
+        for t in self.tasks:
+            out.append((t.name, t.runs, t.overruns, t.missed, t.errors, t.max_late_ms, t.max_run_ms))
+            if reset:
+                t.max_late_ms = 0
+                t.max_run_ms = 0
+        return out
@@ -22,8 +22,10 @@ class AsyncServo:
 
         self.current_angle = 90
         self.target_angle = 90
+        self.duty = -1
+        self.controller = None  # set by MotionController.add
 
-        self._apply(self.current_angle)
+        self.write(self.current_angle)
 
     def _angle_to_duty(self, angle):
         angle = max(self.min_angle, min(self.max_angle, angle))
@@ -34,38 +36,53 @@ class AsyncServo:
             / (self.max_angle - self.min_angle)
         )
 
-    def _apply(self, angle):
-        self.pwm.duty(self._angle_to_duty(angle))
+    def write(self, angle):
+        """Drive the PWM for angle; skipped (False) if the duty is unchanged."""
+        duty = self._angle_to_duty(angle)
+        if duty == self.duty:
+            return False
+        self.pwm.duty(duty)
+        self.duty = duty
+        return True
 
     def set_target(self, angle):
         self.target_angle = max(self.min_angle, min(self.max_angle, angle))
+        if self.controller:
+            self.controller.notify()
+
+    def step(self):
+        # Damping (exponential smoothing)
+        delta = self.target_angle - self.current_angle
+        self.current_angle += delta * self.damping
+
+        self.write(self.current_angle)
 
     async def run(self):
         while True:
-            # Damping (exponential smoothing)
-            delta = self.target_angle - self.current_angle
-            self.current_angle += delta * self.damping
-
-            self._apply(self.current_angle)
+            self.step()
 
             await asyncio.sleep_ms(self.update_ms)
             
             
-servo = AsyncServo(pin=3)  # GPIO14 = D5
+if __name__ == "__main__":
+    from motion import MotionController
 
-async def servo_test():
-    while True:
-        servo.set_target(0)
-        await asyncio.sleep(2)
-        servo.set_target(90)
-        await asyncio.sleep(2)
-        servo.set_target(180)
-        await asyncio.sleep(2)
+    servo = AsyncServo(pin=3)  # GPIO14 = D5
+    motion = MotionController()
+    motion.add(servo, max_vel=120, max_accel=360)
 
-async def main():
-    asyncio.create_task(servo.run())
-    await servo_test()
-
-asyncio.run(main())
+    async def servo_test():
+        while True:
+            servo.set_target(0)
+            await asyncio.sleep(2)
+            servo.set_target(90)
+            await asyncio.sleep(2)
+            servo.set_target(180)
+            await asyncio.sleep(2)
+            print("steps", motion.ticks, "writes", motion.writes, "idle", motion.suspends)
 
+    async def main():
+        asyncio.create_task(motion.run())
+        await servo_test()
 
+    asyncio.run(main())
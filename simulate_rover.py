@@ -1,95 +1,353 @@
-import paho.mqtt.client as mqtt
-import json
-import time
+import argparse
+import asyncio
+import multiprocessing
 import random
-import threading  # Required to run both loops at once
+import time
+
+from telemetry_codec import FLAG_HAS_ENV
+from rate_control import (ENV_ALARMS, ENV_DEADBANDS, IMU_ANGLES, IMU_DEADBANDS, SKIP, URGENT,
+                          SendOnDelta)
+from telemetry_batch import BatchPublisher, pack_probe
+from telemetry_stream import StreamEncoder
 
 # Configuration
 BROKER = "192.168.0.34"  # Or use your laptop's IP
 PORT = 1883
 TOPIC = "mars/telemetry"
+FLEET_TOPIC = "mars/rover/{id}/telemetry"  # per-rover topic in fleet mode
 
-client = mqtt.Client()
+# Delta stream ids / keyframe spacing (see telemetry_stream.py)
+IMU_STREAM = 0
+SENSOR_STREAM = 1
+KEYFRAME_INTERVAL = 20
 
+# Batching: samples per message / max age before a partial batch is sent
+IMU_BATCH = 10
+SENSOR_BATCH = 5
+BATCH_MAX_AGE_MS = 5000
 
-def simulate_imu():
-    # Use a separate connection for this thread to avoid collisions
-    imu_client = mqtt.Client()
-    imu_client.connect(BROKER, PORT, 60)
+IMU_HZ = 20  # Higher frequency for smooth 3D movement
+SENSOR_HZ = 1
 
-    # Starting angles
-    p, r, y = 0, 0, 0
 
-    while True:
-        # Simulate slight tilting (Replace this with actual MPU6050 sensor reading logic)
-        p += random.uniform(-2, 2)
-        r += random.uniform(-2, 2)
-        y += random.uniform(-1, 1)
+# ================= Connections =================
+class NullClient:
+    """Stands in for a broker connection; counts what would be sent."""
+
+    def __init__(self):
+        self.published = 0
+        self.bytes = 0
+
+    def publish(self, topic, payload, qos=0):
+        self.published += 1
+        self.bytes += len(payload)
+
+    def disconnect(self):
+        pass
+
+    def loop_stop(self):
+        pass
+
+
+class ConnectionPool:
+    def __init__(self, broker, port, size):
+        """A few shared MQTT connections, each with its own network thread.
+
+        Rovers are assigned round-robin, so thousands of virtual rovers
+        share `size` sockets instead of opening two each.
+        """
+        self.clients = []
+        for _ in range(size):
+            if broker == "null":
+                self.clients.append(NullClient())
+                continue
+            import paho.mqtt.client as mqtt
+            client = mqtt.Client()
+            client.connect(broker, port, 60)
+            client.loop_start()
+            self.clients.append(client)
+
+    def client_for(self, rover_id):
+        return self.clients[rover_id % len(self.clients)]
+
+    def close(self):
+        for c in self.clients:
+            c.loop_stop()
+            c.disconnect()
+
+
+# ================= Stats =================
+class FleetStats:
+    def __init__(self, reservoir=4096):
+        self.messages = 0
+        self.samples = 0
+        self.missed = 0
+        self.late = []
+        self.reservoir = reservoir
+        self.seen = 0
+
+    def lateness(self, seconds):
+        # Reservoir sample of wake-up lateness for percentiles
+        self.seen += 1
+        if len(self.late) < self.reservoir:
+            self.late.append(seconds)
+        else:
+            i = random.randrange(self.seen)
+            if i < self.reservoir:
+                self.late[i] = seconds
+
+    def snapshot(self):
+        late = sorted(self.late)
+
+        def pct(p):
+            return late[min(len(late) - 1, int(p * len(late)))] * 1000 if late else 0.0
+
+        out = {
+            "messages": self.messages,
+            "samples": self.samples,
+            "missed": self.missed,
+            "late_p50_ms": pct(0.50),
+            "late_p99_ms": pct(0.99),
+            "late_max_ms": late[-1] * 1000 if late else 0.0,
+        }
+        self.late = []
+        self.seen = 0
+        return out
 
-        payload = {
+
+# ================= Virtual rover =================
+class VirtualRover:
+    def __init__(self, rover_id, client, topic, stats, imu_hz=IMU_HZ, sensor_hz=SENSOR_HZ,
+                 imu_batch=IMU_BATCH, sensor_batch=SENSOR_BATCH, verbose=False, seed=None,
+                 probe=False, send_on_delta=False):
+        self.rover_id = rover_id
+        self.topic = topic
+        self.stats = stats
+        self.imu_hz = imu_hz
+        self.sensor_hz = sensor_hz
+        self.verbose = verbose
+        self.rng = random.Random(seed if seed is not None else rover_id)
+
+        # Starting state
+        self.p, self.r, self.y = 0.0, 0.0, 0.0
+        self.temp = 22.0
+        self.imu_seq = 0
+        self.sensor_seq = 0
+        self.msg_seq = 0
+
+        def publish(m):
+            if probe:
+                # Stamp seq + send time for end-to-end latency (bench_e2e.py)
+                m = pack_probe(self.msg_seq, time.monotonic_ns(), m)
+            self.msg_seq += 1
+            client.publish(topic, bytes(m))
+            stats.messages += 1
+
+        self.imu_encoder = StreamEncoder(IMU_STREAM, KEYFRAME_INTERVAL)
+        self.imu_batcher = BatchPublisher(publish, max_count=imu_batch, max_age_ms=BATCH_MAX_AGE_MS)
+        self.sensor_encoder = StreamEncoder(SENSOR_STREAM, KEYFRAME_INTERVAL)
+        self.sensor_batcher = BatchPublisher(publish, max_count=sensor_batch, max_age_ms=BATCH_MAX_AGE_MS)
+
+        # Optional send-on-delta: samples inside the deadbands are skipped
+        self.imu_rate = self.sensor_rate = None
+        if send_on_delta:
+            self.imu_rate = SendOnDelta(IMU_DEADBANDS, heartbeat_ms=10000, angles=IMU_ANGLES)
+            self.sensor_rate = SendOnDelta(ENV_DEADBANDS, heartbeat_ms=30000, alarms=ENV_ALARMS)
+
+    def imu_payload(self):
+        # Simulate slight tilting (Replace this with actual MPU6050 sensor reading logic)
+        rng = self.rng
+        self.p += rng.uniform(-2, 2)
+        self.r += rng.uniform(-2, 2)
+        self.y += rng.uniform(-1, 1)
+        return {
             "temp": 22.5,
             "light": 500,
             "vibe": 0,
             "ir_storm": False,
-            "pitch": round(p % 360, 2),
-            "roll": round(r % 360, 2),
-            "yaw": round(y % 360, 2),
+            "pitch": round(self.p % 360, 2),
+            "roll": round(self.r % 360, 2),
+            "yaw": round(self.y % 360, 2),
         }
 
-        imu_client.publish(TOPIC, json.dumps(payload))
-        print(
-            f"Sent Orientation: P:{payload['pitch']} R:{payload['roll']} Y:{payload['yaw']}"
-        )
-        time.sleep(0.05)  # Higher frequency for smooth 3D movement (20Hz)
+    def sensor_payload(self):
+        rng = self.rng
+        self.temp += rng.uniform(-0.5, 0.5)
+        return {
+            "temp": round(self.temp, 2),
+            "light": rng.randint(300, 800),
+            "vibe": 1 if rng.random() > 0.9 else 0,  # 10% chance of tremor
+            # Simulate IR Dust Storm (~every 20 s on average)
+            "ir_storm": rng.random() > 0.95,
+        }
+
+    def imu_step(self):
+        payload = self.imu_payload()
+        if self.imu_rate:
+            fields = [payload[k] for k in ("pitch", "roll", "yaw")]
+            if self.imu_rate.update(fields) == SKIP:
+                self.imu_batcher.poll()
+                self.stats.samples += 1
+                return
+            payload["pitch"], payload["roll"], payload["yaw"] = self.imu_rate.held
+        self.imu_batcher.add(self.imu_encoder.encode(self.imu_seq, **payload))
+        self.imu_batcher.poll()
+        self.imu_seq += 1
+        self.stats.samples += 1
+        if self.verbose:
+            print(f"Sent Orientation: P:{payload['pitch']} R:{payload['roll']} Y:{payload['yaw']}")
 
+    def sensor_step(self):
+        payload = self.sensor_payload()
+        urgent = payload["ir_storm"] or payload["vibe"] > 0
+        if self.sensor_rate:
+            fields = [payload[k] for k in ("temp", "light", "vibe", "ir_storm")]
+            action = self.sensor_rate.update(fields)
+            if action == SKIP:
+                self.sensor_batcher.poll()
+                self.stats.samples += 1
+                return
+            temp, light, vibe, storm = self.sensor_rate.held
+            payload.update(temp=temp, light=int(light), vibe=int(vibe), ir_storm=storm > 0)
+            urgent = action == URGENT
+        message = self.sensor_encoder.encode(self.sensor_seq, flags=FLAG_HAS_ENV, **payload)
+        # Alarms go out immediately
+        self.sensor_batcher.add(message, urgent=urgent)
+        self.sensor_batcher.poll()
+        self.sensor_seq += 1
+        self.stats.samples += 1
+        if self.verbose:
+            status = "⚠️ ALARM!" if payload["ir_storm"] else "Normal"
+            print(f"Published: {payload} ({len(message)} B) | Status: {status}")
 
-def simulate_sensors():
-    sensor_client = mqtt.Client()
-    sensor_client.connect(BROKER, PORT, 60)
-    print(f"🚀 Virtual Rover connected to {BROKER}. Sending telemetry...")
+    async def every(self, hz, step):
+        """Call step() at hz on absolute deadlines, so jitter never accumulates.
 
-    # Base values for simulation
-    temp = 22.0
+        Start phases are randomised to spread a fleet over the period; if the
+        loop falls a whole period behind, missed ticks are skipped (and
+        counted) rather than sent as a burst.
+        """
+        loop = asyncio.get_running_loop()
+        period = 1 / hz
+        deadline = loop.time() + self.rng.random() * period
+        while True:
+            delay = deadline - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            now = loop.time()
+            self.stats.lateness(now - deadline)
+            step()
+            deadline += period
+            behind = now - deadline
+            if behind > period:
+                skipped = int(behind / period)
+                deadline += skipped * period
+                self.stats.missed += skipped
 
-    while True:
-        # 1. Generate fake sensor data
-        temp += random.uniform(-0.5, 0.5)
-        light = random.randint(300, 800)
-        vibration = 1 if random.random() > 0.9 else 0  # 10% chance of tremor
+    def tasks(self):
+        return [
+            asyncio.create_task(self.every(self.imu_hz, self.imu_step)),
+            asyncio.create_task(self.every(self.sensor_hz, self.sensor_step)),
+        ]
 
-        # 2. Simulate IR Dust Storm (Trigger every ~15 seconds for testing)
-        # We'll trigger an alarm if a random roll is very high
-        ir_storm = True if random.random() > 0.95 else False
 
-        payload = {
-            "temp": round(temp, 2),
-            "light": light,
-            "vibe": vibration,
-            "ir_storm": ir_storm,
-        }
+# ================= Fleet =================
+async def run_fleet(rover_ids, args, shard=0):
+    stats = FleetStats()
+    pool = ConnectionPool(args.broker, args.port, args.connections)
+    single = args.rovers == 1
+    if single:
+        print(f"🚀 Virtual Rover connected to {args.broker}. Sending telemetry...")
 
-        # 3. Publish to MQTT
-        message = json.dumps(payload)
-        sensor_client.publish(TOPIC, message)
+    rovers = [
+        VirtualRover(
+            rid,
+            pool.client_for(rid),
+            args.topic or (TOPIC if single else FLEET_TOPIC.format(id=rid)),
+            stats,
+            imu_hz=args.imu_hz,
+            sensor_hz=args.sensor_hz,
+            imu_batch=args.imu_batch,
+            sensor_batch=args.sensor_batch,
+            verbose=single,
+            probe=args.probe,
+            send_on_delta=args.send_on_delta,
+        )
+        for rid in rover_ids
+    ]
+    tasks = [t for r in rovers for t in r.tasks()]
 
-        status = "⚠️ ALARM!" if ir_storm else "Normal"
-        print(f"Published: {message} | Status: {status}")
+    loop = asyncio.get_running_loop()
+    start = last = loop.time()
+    last_msgs = last_samples = 0
+    try:
+        while args.duration is None or loop.time() - start < args.duration:
+            await asyncio.sleep(args.report)
+            now = loop.time()
+            snap = stats.snapshot()
+            dt = now - last
+            rate = (snap["messages"] - last_msgs) / dt
+            srate = (snap["samples"] - last_samples) / dt
+            if not single:
+                print(f"[shard {shard}] {len(rovers)} rovers  {rate:8.0f} msg/s  {srate:8.0f} samples/s  "
+                      f"late p50 {snap['late_p50_ms']:.1f} ms p99 {snap['late_p99_ms']:.1f} ms "
+                      f"max {snap['late_max_ms']:.1f} ms  missed {snap['missed']}")
+            last, last_msgs, last_samples = now, snap["messages"], snap["samples"]
+    finally:
+        for t in tasks:
+            t.cancel()
+        pool.close()
+    elapsed = loop.time() - start
+    return {
+        "shard": shard,
+        "rovers": len(rovers),
+        "messages": stats.messages,
+        "samples": stats.samples,
+        "msg_per_s": stats.messages / elapsed,
+        "missed": stats.missed,
+    }
 
-        time.sleep(1)  # Send data every second
 
+def run_shard(shard, args):
+    ids = range(shard, args.rovers, args.procs)
+    return asyncio.run(run_fleet(ids, args, shard))
 
-if __name__ == "__main__":
-    try:
-        # Create two threads
-        thread_imu = threading.Thread(target=simulate_imu)
-        thread_sensors = threading.Thread(target=simulate_sensors)
 
-        # Start both threads
-        thread_imu.start()
-        thread_sensors.start()
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Virtual rover / fleet load generator")
+    ap.add_argument("--broker", default=BROKER, help='broker host, or "null" to only count')
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--topic", default=None, help="override the per-rover topic")
+    ap.add_argument("--rovers", type=int, default=1)
+    ap.add_argument("--procs", type=int, default=1, help="shard rovers over processes")
+    ap.add_argument("--connections", type=int, default=4, help="MQTT connections per process")
+    ap.add_argument("--imu-hz", type=float, default=IMU_HZ)
+    ap.add_argument("--sensor-hz", type=float, default=SENSOR_HZ)
+    ap.add_argument("--imu-batch", type=int, default=IMU_BATCH)
+    ap.add_argument("--sensor-batch", type=int, default=SENSOR_BATCH)
+    ap.add_argument("--duration", type=float, default=None, help="seconds (default: forever)")
+    ap.add_argument("--report", type=float, default=5.0, help="stats interval in seconds")
+    ap.add_argument("--probe", action="store_true",
+                    help="wrap messages with seq + send time for latency measurement")
+    ap.add_argument("--send-on-delta", action="store_true",
+                    help="only send samples that left their deadband (see rate_control.py)")
+    args = ap.parse_args(argv)
+    if args.rovers == 1:
+        args.connections = 1
+    return args
 
-        # Keep the main thread alive while background threads work
-        while True:
-            time.sleep(1)
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        if args.procs == 1:
+            results = [run_shard(0, args)]
+        else:
+            with multiprocessing.Pool(args.procs) as pool:
+                results = pool.starmap(run_shard, [(i, args) for i in range(args.procs)])
+        for r in results:
+            print(f"shard {r['shard']}: {r['rovers']} rovers, {r['msg_per_s']:.0f} msg/s, "
+                  f"{r['samples']} samples, {r['missed']} missed ticks")
+        print(f"total: {sum(r['msg_per_s'] for r in results):.0f} msg/s")
     except KeyboardInterrupt:
         print("\nStopping Mission Simulation.")
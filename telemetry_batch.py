@@ -0,0 +1,219 @@
+import struct
+
+from outbox import is_replay, unpack_replay
+from telemetry_stream import get_varint, put_varint
+from ticks import ticks_ms, ticks_diff
+
+# ================= Batch layout =================
+# One MQTT message carrying several encoded samples.
+#
+#   B       0x02            batch marker
+#   B       count
+#   varint  age_ms          age of the newest sample when the batch was sent
+#   count records, oldest first:
+#     varint  gap_ms        time since the previous record (0 for the first)
+#     B       len
+#     len bytes             telemetry_codec frame or telemetry_stream delta
+#
+# The receiver timestamps samples as receive_time - age_ms - later gaps,
+# so no clock synchronisation with the rover is needed.
+
+BATCH_KIND = 0x02
+BATCH_HEADER_MAX = 2 + 5
+RECORD_OVERHEAD = 1 + 3  # len byte + gap varint (up to ~35 min)
+
+
+class BatchPublisher:
+    def __init__(self, publish, capacity=32, slot_size=24, max_count=10,
+                 max_bytes=200, max_age_ms=5000, clock=ticks_ms):
+        """Buffer encoded samples and send them as one message.
+
+        publish(payload) is called with a memoryview of the batch. A batch
+        goes out when max_count samples, max_bytes bytes or max_age_ms of
+        age is reached, or immediately for urgent (alarm) samples.
+        """
+        self.publish = publish
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self.max_count = min(max_count, capacity, 255)
+        self.max_bytes = max_bytes
+        self.max_age_ms = max_age_ms
+        self.clock = clock
+
+        # Preallocated ring of fixed-size slots
+        self.slots = bytearray(capacity * slot_size)
+        self.slots_mv = memoryview(self.slots)
+        self.lens = bytearray(capacity)
+        self.ticks = [0] * capacity
+        self.head = 0
+        self.count = 0
+        self.pending_bytes = 0
+        self.out = bytearray(BATCH_HEADER_MAX
+                             + capacity * (slot_size + RECORD_OVERHEAD))
+
+        self.batches = 0
+        self.samples = 0
+        self.overflows = 0
+
+    def add(self, msg, urgent=False):
+        """Queue one encoded sample (bytes-like, at most slot_size bytes)."""
+        n = len(msg)
+        if n > self.slot_size:
+            raise ValueError("sample larger than slot: %d bytes" % n)
+        if self.count and (self.pending_bytes + n + RECORD_OVERHEAD
+                           + BATCH_HEADER_MAX > self.max_bytes):
+            self.flush()
+
+        if self.count == self.capacity:
+            # Ring full (uplink down): overwrite the oldest sample
+            self.pending_bytes -= self.lens[self.head] + RECORD_OVERHEAD
+            self.head = (self.head + 1) % self.capacity
+            self.count -= 1
+            self.overflows += 1
+
+        i = (self.head + self.count) % self.capacity
+        base = i * self.slot_size
+        self.slots[base:base + n] = msg
+        self.lens[i] = n
+        self.ticks[i] = self.clock()
+        self.count += 1
+        self.pending_bytes += n + RECORD_OVERHEAD
+
+        if urgent or self.count >= self.max_count:
+            self.flush()
+
+    def poll(self):
+        """Flush if the oldest buffered sample has reached max_age_ms."""
+        if self.count and ticks_diff(self.clock(), self.ticks[self.head]) >= self.max_age_ms:
+            self.flush()
+
+    def flush(self):
+        """Send everything buffered as one batch.
+
+        The buffer is only cleared once publish() returns, so a failed
+        publish can be retried with the same samples.
+        """
+        if not self.count:
+            return 0
+        n = self._pack()
+        self.publish(memoryview(self.out)[:n])
+        self.batches += 1
+        self.samples += self.count
+        self.head = (self.head + self.count) % self.capacity
+        self.count = 0
+        self.pending_bytes = 0
+        return n
+
+    def _pack(self):
+        out = self.out
+        cap = self.capacity
+        now = self.clock()
+        newest = (self.head + self.count - 1) % cap
+        out[0] = BATCH_KIND
+        out[1] = self.count
+        pos = put_varint(out, 2, max(0, ticks_diff(now, self.ticks[newest])))
+        prev = self.ticks[self.head]
+        for k in range(self.count):
+            i = (self.head + k) % cap
+            t = self.ticks[i]
+            pos = put_varint(out, pos, max(0, ticks_diff(t, prev)))
+            prev = t
+            n = self.lens[i]
+            out[pos] = n
+            base = i * self.slot_size
+            out[pos + 1:pos + 1 + n] = self.slots_mv[base:base + n]
+            pos += 1 + n
+        return pos
+
+
+def is_batch(data):
+    return len(data) > 0 and data[0] == BATCH_KIND
+
+
+def unpack_batch(data, recv_ms=0):
+    """Split a batch into [(t_ms, record), ...], oldest first.
+
+    t_ms is relative to recv_ms, the time the batch was received.
+    """
+    if data[0] != BATCH_KIND:
+        raise ValueError("not a telemetry batch")
+    count = data[1]
+    age, pos = get_varint(data, 2)
+    mv = memoryview(data)
+    gaps = []
+    records = []
+    for _ in range(count):
+        gap, pos = get_varint(data, pos)
+        n = data[pos]
+        gaps.append(gap)
+        records.append(mv[pos + 1:pos + 1 + n])
+        pos += 1 + n
+
+    out = [None] * count
+    t = recv_ms - age
+    for k in range(count - 1, -1, -1):
+        out[k] = (t, records[k])
+        t -= gaps[k]
+    return out
+
+
+# ================= Probe envelope =================
+# Wraps a whole message (batch, frame or delta) for latency measurement:
+#
+#   B   0x03    probe marker
+#   I   seq     per-publisher message counter
+#   Q   t_ns    send time, nanoseconds on the sender's monotonic clock
+#
+# Only meaningful when sender and receiver share a clock (same host);
+# decoders strip it transparently.
+
+PROBE_KIND = 0x03
+PROBE_FMT = ">BIQ"
+PROBE_SIZE = struct.calcsize(PROBE_FMT)
+
+
+def pack_probe(seq, t_ns, msg):
+    return struct.pack(PROBE_FMT, PROBE_KIND, seq & 0xFFFFFFFF, t_ns) + bytes(msg)
+
+
+def is_probe(data):
+    return len(data) >= PROBE_SIZE and data[0] == PROBE_KIND
+
+
+def unpack_probe(data):
+    """Return (seq, t_ns, message) for a probe-wrapped message."""
+    _, seq, t_ns = struct.unpack_from(PROBE_FMT, data)
+    return seq, t_ns, memoryview(data)[PROBE_SIZE:]
+
+
+class BatchDecoder:
+    def __init__(self, decoder=None):
+        """Unpack batches into timestamped samples.
+
+        decoder is a telemetry_stream.StreamDecoder (or anything with a
+        decode(data) method); single-sample messages are passed through.
+        """
+        if decoder is None:
+            from telemetry_stream import StreamDecoder
+            decoder = StreamDecoder()
+        self.decoder = decoder
+
+    def decode(self, data, recv_ms):
+        """Return a list of payload dicts, each with a "t" key in ms."""
+        if is_replay(data):
+            data = unpack_replay(data)[2]
+        if is_probe(data):
+            data = unpack_probe(data)[2]
+        if not is_batch(data):
+            sample = self.decoder.decode(data)
+            if sample is None:
+                return []
+            sample["t"] = recv_ms
+            return [sample]
+        out = []
+        for t, record in unpack_batch(data, recv_ms):
+            sample = self.decoder.decode(record)
+            if sample is not None:
+                sample["t"] = t
+                out.append(sample)
+        return out
@@ -0,0 +1,177 @@
+import struct
+
+# ================= Frame layout =================
+# Fixed-layout binary telemetry frame for mars/telemetry.
+# Runs unchanged on MicroPython (ESP32-C3) and CPython (ground side).
+#
+# Version 1, big-endian, 15 bytes:
+#   B  version
+#   B  flags      FLAG_* bits below
+#   H  seq        sequence number, wraps at 65536
+#   h  temp       0.1 degC
+#   H  light      raw ADC value
+#   B  vibe       tremor intensity 0..100 (tremor.py), 0 = still
+#   H  pitch      0.01 deg, 0..359.99
+#   H  roll       0.01 deg, 0..359.99
+#   H  yaw        0.01 deg, 0..359.99
+
+FRAME_VERSION = 1
+FRAME_FMT = ">BBHhHBHHH"
+FRAME_SIZE = struct.calcsize(FRAME_FMT)
+
+FLAG_IR_STORM = 0x01
+FLAG_HAS_ENV = 0x02  # temp / light / vibe / ir_storm are valid
+FLAG_HAS_IMU = 0x04  # pitch / roll / yaw are valid
+# bits 4..7 carry the stream id used by telemetry_stream.py
+
+TEMP_SCALE = 10
+ANGLE_SCALE = 100
+ANGLE_WRAP = 360 * ANGLE_SCALE
+
+
+class FrameError(ValueError):
+    pass
+
+
+def _clamp(v, lo, hi):
+    return lo if v < lo else hi if v > hi else v
+
+
+def _angle(a):
+    return int(round(a * ANGLE_SCALE)) % ANGLE_WRAP
+
+
+def scale_fields(temp, light, vibe, pitch, roll, yaw):
+    """Return the (temp, light, vibe, pitch, roll, yaw) wire integers."""
+    return (
+        _clamp(int(round(temp * TEMP_SCALE)), -32768, 32767),
+        _clamp(int(light), 0, 0xFFFF),
+        _clamp(int(vibe), 0, 0xFF),
+        _angle(pitch),
+        _angle(roll),
+        _angle(yaw),
+    )
+
+
+def pack_frame_into(buf, flags, seq, values, offset=0):
+    """Pack already-scaled wire integers into buf at offset."""
+    struct.pack_into(FRAME_FMT, buf, offset, FRAME_VERSION, flags,
+                     seq & 0xFFFF, *values)
+    return buf
+
+
+def encode_frame_into(buf, seq, temp=0, light=0, vibe=0, ir_storm=False,
+                      pitch=0, roll=0, yaw=0, flags=FLAG_HAS_ENV | FLAG_HAS_IMU):
+    """Pack one sample into a preallocated bytearray(FRAME_SIZE).
+
+    Values are in engineering units (degC, degrees). No allocation beyond
+    the int conversions, so it is safe to call from the device main loop.
+    """
+    if ir_storm:
+        flags |= FLAG_IR_STORM
+    else:
+        flags &= ~FLAG_IR_STORM
+    return pack_frame_into(buf, flags, seq,
+                           scale_fields(temp, light, vibe, pitch, roll, yaw))
+
+
+def encode_frame(seq, temp=0, light=0, vibe=0, ir_storm=False,
+                 pitch=0, roll=0, yaw=0, flags=FLAG_HAS_ENV | FLAG_HAS_IMU):
+    """Same as encode_frame_into but returns a fresh bytes object."""
+    buf = bytearray(FRAME_SIZE)
+    encode_frame_into(buf, seq, temp, light, vibe, ir_storm,
+                      pitch, roll, yaw, flags)
+    return bytes(buf)
+
+
+def unpack_frame(data, offset=0):
+    """Return the raw integer tuple of a frame, checking the version."""
+    if len(data) - offset < FRAME_SIZE:
+        raise FrameError("short frame: %d bytes" % (len(data) - offset))
+    fields = struct.unpack_from(FRAME_FMT, data, offset)
+    if fields[0] != FRAME_VERSION:
+        raise FrameError("unsupported frame version %d" % fields[0])
+    return fields
+
+
+def frame_to_dict(fields):
+    """Convert an unpacked frame to the JSON payload schema."""
+    return values_to_dict(fields[1], fields[2], fields[3:])
+
+
+def values_to_dict(flags, seq, values):
+    """Convert wire integers to the JSON payload schema (plus "seq")."""
+    temp, light, vibe, pitch, roll, yaw = values
+    out = {"seq": seq}
+    if flags & FLAG_HAS_ENV:
+        out["temp"] = temp / TEMP_SCALE
+        out["light"] = light
+        out["vibe"] = vibe
+        out["ir_storm"] = bool(flags & FLAG_IR_STORM)
+    if flags & FLAG_HAS_IMU:
+        out["pitch"] = pitch / ANGLE_SCALE
+        out["roll"] = roll / ANGLE_SCALE
+        out["yaw"] = yaw / ANGLE_SCALE
+    return out
+
+
+def decode_frame(data, offset=0):
+    """Decode one binary frame into a payload dict (plus "seq")."""
+    return frame_to_dict(unpack_frame(data, offset))
+
+
+# ================= Acoustic frame =================
+# Microphone block features (see acoustic.py), 19 bytes:
+#   B  0x04       kind
+#   H  seq
+#   H  rms        0.1 ADC counts
+#   H  peak       ADC counts
+#   H  zcr        zero crossings per second
+#   5H bands      octave band RMS, 0.1 ADC counts, highest band first
+
+ACOUSTIC_KIND = 0x04
+ACOUSTIC_BANDS = 5
+ACOUSTIC_FMT = ">BHHHH%dH" % ACOUSTIC_BANDS
+ACOUSTIC_SIZE = struct.calcsize(ACOUSTIC_FMT)
+LEVEL_SCALE = 10
+
+
+def _u16(v):
+    return _clamp(int(v + 0.5), 0, 0xFFFF)
+
+
+def pack_acoustic_into(buf, seq, features, offset=0):
+    """Pack acoustic.block_features() output (RMS, PEAK, ZCR, BAND0..)."""
+    struct.pack_into(ACOUSTIC_FMT, buf, offset, ACOUSTIC_KIND, seq & 0xFFFF,
+                     _u16(features[0] * LEVEL_SCALE), _u16(features[1]), _u16(features[2]),
+                     _u16(features[3] * LEVEL_SCALE), _u16(features[4] * LEVEL_SCALE),
+                     _u16(features[5] * LEVEL_SCALE), _u16(features[6] * LEVEL_SCALE),
+                     _u16(features[7] * LEVEL_SCALE))
+    return ACOUSTIC_SIZE
+
+
+def decode_acoustic(data, offset=0):
+    if len(data) - offset < ACOUSTIC_SIZE:
+        raise FrameError("short acoustic frame: %d bytes" % (len(data) - offset))
+    f = struct.unpack_from(ACOUSTIC_FMT, data, offset)
+    out = {
+        "seq": f[1],
+        "sound_rms": f[2] / LEVEL_SCALE,
+        "sound_peak": f[3],
+        "sound_zcr": f[4],
+    }
+    for i in range(ACOUSTIC_BANDS):
+        out["sound_b%d" % i] = f[5 + i] / LEVEL_SCALE
+    return out
+
+
+def decode_payload(data):
+    """Decode a mars/telemetry message, accepting legacy JSON payloads too."""
+    if data[:1] in (b"{", "{"):
+        import json
+        if not isinstance(data, str):
+            data = bytes(data).decode()
+        return json.loads(data)
+    if data[0] == ACOUSTIC_KIND:
+        return decode_acoustic(data)
+    return decode_frame(data)
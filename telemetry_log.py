@@ -0,0 +1,448 @@
+import argparse
+import asyncio
+import heapq
+import math
+import mmap
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_right
+
+from ground_ingest import BROKER, PORT, TOPICS, rover_from_topic
+from simulate_rover import ConnectionPool, FleetStats
+from telemetry_stream import get_varint, put_varint
+
+# ================= Telemetry log =================
+# Append-only capture of MQTT messages with their receive times.
+#
+# <name>.tlog   MAGIC, then records, each starting with a kind byte:
+#                 SYNC   q t_us                 absolute receive time (us)
+#                 TOPIC  varint n, n bytes      defines the next topic id
+#                 MSG    varint dt_us, varint topic id, varint n, n bytes
+#               dt_us is relative to the previous record, so a MSG costs
+#               4-6 bytes on top of its payload. A SYNC starts every block
+#               (SYNC_US of capture or SYNC_RECORDS messages).
+# <name>.tlog.idx
+#               16-byte (t_us, offset) entries, one per SYNC and per
+#               TOPIC (offset | TOPIC_FLAG), so a reader finds the topic
+#               table and any point in time without touching the log.
+#
+# The reader maps the log and walks it in place: opening a capture costs
+# the index, not the data, and a seek is a bisect. Records after the last
+# index entry (a capture that was killed) are recovered by scanning the
+# last block, and a torn final record is ignored, then cut off when the
+# writer reopens the file.
+
+MAGIC = b"MTLOG\x01\r\n"
+SYNC, TOPIC, MSG = 0, 1, 2
+SYNC_US = 1000000
+SYNC_RECORDS = 4096
+INDEX = struct.Struct("<qQ")
+TOPIC_FLAG = 1 << 63
+TIME = struct.Struct("<q")
+
+
+class LogReader:
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "rb")
+        self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:len(MAGIC)] != MAGIC:
+            raise ValueError("%s is not a telemetry log" % path)
+        self.sync_t = array("q")
+        self.sync_off = array("q")
+        self.topics = []
+        self.topic_off = []
+        self.end_us = 0
+
+        size = len(self.mm)
+        idx_path = path + ".idx"
+        if os.path.exists(idx_path):
+            with open(idx_path, "rb") as f:
+                data = f.read()
+            for t_us, off in INDEX.iter_unpack(data[:len(data) - len(data) % INDEX.size]):
+                if off & TOPIC_FLAG:
+                    off &= ~TOPIC_FLAG
+                    if off >= size:
+                        break
+                    n, p = get_varint(self.mm, off + 1)
+                    self.topics.append(self.mm[p:p + n].decode())
+                    self.topic_off.append(off)
+                else:
+                    if off >= size:
+                        break
+                    self.sync_t.append(t_us)
+                    self.sync_off.append(off)
+        self._scan_tail()
+
+    def _scan_tail(self):
+        # Walk from the last indexed block to the end of the data
+        mm = self.mm
+        size = len(mm)
+        pos = self.sync_off[-1] if self.sync_off else len(MAGIC)
+        last_sync = pos if self.sync_off else -1
+        last_topic = self.topic_off[-1] if self.topic_off else -1
+        t_us = self.sync_t[-1] if self.sync_t else 0
+        while pos < size:
+            try:
+                kind = mm[pos]
+                if kind == MSG:
+                    dt, p = get_varint(mm, pos + 1)
+                    _, p = get_varint(mm, p)
+                    n, p = get_varint(mm, p)
+                    nxt = p + n
+                    t = t_us + dt
+                elif kind == SYNC:
+                    nxt = pos + 1 + TIME.size
+                    t = TIME.unpack_from(mm, pos + 1)[0]
+                elif kind == TOPIC:
+                    n, p = get_varint(mm, pos + 1)
+                    nxt = p + n
+                    t = t_us
+                else:
+                    break
+            except (IndexError, struct.error):
+                break
+            if nxt > size:
+                break
+            if kind == SYNC and pos > last_sync:
+                self.sync_t.append(t)
+                self.sync_off.append(pos)
+            elif kind == TOPIC and pos > last_topic:
+                self.topics.append(mm[p:nxt].decode())
+                self.topic_off.append(pos)
+            t_us = t
+            pos = nxt
+        self.end_offset = pos
+        self.end_us = t_us
+
+    @property
+    def start(self):
+        """Receive time of the first message (epoch seconds)."""
+        return self.sync_t[0] / 1e6 if self.sync_t else 0.0
+
+    @property
+    def end(self):
+        return self.end_us / 1e6
+
+    def seek(self, t):
+        """Offset of the block holding time t (epoch seconds)."""
+        i = bisect_right(self.sync_t, int(t * 1e6)) - 1 if t is not None else 0
+        if i < 0 or not self.sync_off:
+            return len(MAGIC)
+        return self.sync_off[i]
+
+    def records(self, start=None, stop=None):
+        """Yield (t, topic_id, payload) in capture order, t in epoch
+        seconds, for start <= t < stop; reader.topics[topic_id] is the
+        topic."""
+        mm = self.mm
+        pos = self.seek(start)
+        end = self.end_offset
+        start_us = math.ceil(start * 1e6) if start is not None else None
+        stop_us = math.ceil(stop * 1e6) if stop is not None else None
+        t_us = 0
+        while pos < end:
+            kind = mm[pos]
+            if kind == MSG:
+                dt, p = get_varint(mm, pos + 1)
+                # topic id and length nearly always fit one byte
+                tid = mm[p]
+                if tid < 0x80:
+                    p += 1
+                else:
+                    tid, p = get_varint(mm, p)
+                n = mm[p]
+                if n < 0x80:
+                    p += 1
+                else:
+                    n, p = get_varint(mm, p)
+                pos = p + n
+                t_us += dt
+                if stop_us is not None and t_us >= stop_us:
+                    return
+                if start_us is None or t_us >= start_us:
+                    yield t_us / 1e6, tid, mm[p:pos]
+            elif kind == SYNC:
+                t_us = TIME.unpack_from(mm, pos + 1)[0]
+                pos += 1 + TIME.size
+            else:
+                n, p = get_varint(mm, pos + 1)
+                pos = p + n
+
+    def close(self):
+        self.mm.close()
+        self.f.close()
+
+
+class LogWriter:
+    def __init__(self, path, sync_us=SYNC_US, sync_records=SYNC_RECORDS):
+        """Append to path, resuming an existing capture."""
+        self.path = path
+        self.sync_us = sync_us
+        self.sync_records = sync_records
+        self.topics = {}
+        self.last_us = 0
+        self.sync_at = None
+        self.since_sync = 0
+        self.records = 0
+        self.buf = bytearray(32)
+
+        idx_path = path + ".idx"
+        if os.path.exists(path) and os.path.getsize(path) > len(MAGIC):
+            r = LogReader(path)
+            end, self.last_us = r.end_offset, r.end_us
+            entries = sorted([(t, off) for t, off in zip(r.sync_t, r.sync_off)]
+                             + [(0, off | TOPIC_FLAG) for off in r.topic_off],
+                             key=lambda e: e[1] & ~TOPIC_FLAG)
+            self.topics = {t: i for i, t in enumerate(r.topics)}
+            r.close()
+            # Drop a torn last record and rewrite the index to match
+            with open(path, "r+b") as f:
+                f.truncate(end)
+            with open(idx_path, "wb") as f:
+                for e in entries:
+                    f.write(INDEX.pack(*e))
+        else:
+            with open(path, "wb") as f:
+                f.write(MAGIC)
+            open(idx_path, "wb").close()
+        self.f = open(path, "ab")
+        self.idx = open(idx_path, "ab")
+        self.offset = self.f.tell()
+
+    def _sync(self, t_us):
+        # Everything before this block is on disk before the index names it
+        self.f.flush()
+        self.idx.write(INDEX.pack(t_us, self.offset))
+        self.idx.flush()
+        self.f.write(bytes((SYNC,)) + TIME.pack(t_us))
+        self.offset += 1 + TIME.size
+        self.sync_at = t_us
+        self.last_us = t_us
+        self.since_sync = 0
+
+    def _topic(self, topic):
+        tid = len(self.topics)
+        name = topic.encode()
+        pos = put_varint(self.buf, 1, len(name))
+        self.buf[0] = TOPIC
+        self.idx.write(INDEX.pack(self.last_us, self.offset | TOPIC_FLAG))
+        self.f.write(self.buf[:pos])
+        self.f.write(name)
+        self.offset += pos + len(name)
+        self.topics[topic] = tid
+        return tid
+
+    def write(self, topic, payload, t):
+        """Append one message received at t (epoch seconds)."""
+        t_us = int(t * 1e6)
+        if t_us < self.last_us:
+            t_us = self.last_us  # receive clock stepped back
+        if self.sync_at is None or t_us - self.sync_at >= self.sync_us \
+                or self.since_sync >= self.sync_records:
+            self._sync(t_us)
+        tid = self.topics.get(topic)
+        if tid is None:
+            tid = self._topic(topic)
+        buf = self.buf
+        buf[0] = MSG
+        pos = put_varint(buf, 1, t_us - self.last_us)
+        pos = put_varint(buf, pos, tid)
+        pos = put_varint(buf, pos, len(payload))
+        self.f.write(buf[:pos])
+        self.f.write(payload)
+        self.offset += pos + len(payload)
+        self.last_us = t_us
+        self.since_sync += 1
+        self.records += 1
+
+    def flush(self):
+        self.f.flush()
+        self.idx.flush()
+
+    def close(self):
+        self.flush()
+        self.f.close()
+        self.idx.close()
+
+
+# ================= Replay =================
+def fleet_topic(topic, k, rovers):
+    """Topic of virtual rover k when each recorded rover becomes rovers
+    of them: mars/telemetry/... -> mars/rover/<k>/telemetry/..."""
+    parts = topic.split("/")
+    rest = parts[3:] if len(parts) > 2 and parts[1] == "rover" else parts[1:]
+    return "/".join(["mars", "rover", str(rover_from_topic(topic) * rovers + k)] + rest)
+
+
+class Replayer:
+    def __init__(self, reader, publish, speed=1.0, rovers=1, stagger=0.0,
+                 start=None, stop=None, clock=time.monotonic):
+        """Publish a capture through publish(topic, payload, k), k being
+        the virtual rover (0 unless rovers > 1).
+
+        speed is capture seconds per wall second (0: as fast as possible).
+        With rovers > 1, each recorded rover is published as that many,
+        rover k delayed by k * stagger / rovers capture seconds so the
+        fleet does not send in lockstep. start / stop are epoch seconds.
+        """
+        self.reader = reader
+        self.publish = publish
+        self.speed = speed
+        self.rovers = rovers
+        self.stagger = stagger
+        self.start = start
+        self.stop = stop
+        self.clock = clock
+        self.stats = FleetStats()
+        self.topics = {}
+        self.base_t = None
+        self.base_wall = 0.0
+
+    def _topics(self, tid):
+        out = self.topics.get(tid)
+        if out is None:
+            topic = self.reader.topics[tid]
+            if self.rovers == 1:
+                out = [topic]
+            else:
+                out = [fleet_topic(topic, k, self.rovers) for k in range(self.rovers)]
+            self.topics[tid] = out
+        return out
+
+    async def _wait(self, t):
+        if self.base_t is None:
+            self.base_t = t
+            self.base_wall = self.clock()
+        if not self.speed:
+            if self.stats.messages % 1024 == 0:
+                await asyncio.sleep(0)
+            return
+        due = self.base_wall + (t - self.base_t) / self.speed
+        ahead = due - self.clock()
+        if ahead > 0.001:
+            await asyncio.sleep(ahead)
+        self.stats.lateness(max(0.0, self.clock() - due))
+
+    async def run(self):
+        """Replay once; returns the number of messages published."""
+        publish = self.publish
+        stats = self.stats
+        if self.rovers == 1:
+            for t, tid, payload in self.reader.records(self.start, self.stop):
+                await self._wait(t)
+                publish(self._topics(tid)[0], payload, 0)
+                stats.messages += 1
+            return stats.messages
+
+        # Fan-out: a heap of copies waiting for their staggered time
+        pending = []
+        seq = 0
+        step = self.stagger / self.rovers
+        for t, tid, payload in self.reader.records(self.start, self.stop):
+            while pending and pending[0][0] <= t:
+                await self._emit(heapq.heappop(pending))
+            topics = self._topics(tid)
+            for k in range(self.rovers):
+                heapq.heappush(pending, (t + k * step, seq, topics[k], payload, k))
+                seq += 1
+        while pending:
+            await self._emit(heapq.heappop(pending))
+        return stats.messages
+
+    async def _emit(self, item):
+        t, _, topic, payload, k = item
+        await self._wait(t)
+        self.publish(topic, payload, k)
+        self.stats.messages += 1
+
+
+# ================= CLI =================
+def record(args):
+    import paho.mqtt.client as mqtt
+
+    writer = LogWriter(args.log)
+    client = mqtt.Client()
+    client.on_message = lambda c, u, msg: writer.write(msg.topic, msg.payload, time.time())
+    client.on_connect = lambda c, u, f, rc: [c.subscribe(t) for t in args.topics]
+    client.connect(args.broker, args.port, 60)
+    client.loop_start()
+    print(f"⏺️  Recording {args.topics} from {args.broker} to {args.log}")
+    try:
+        while True:
+            time.sleep(args.report)
+            print(f"recorded {writer.records} messages, {writer.offset / 1e6:.1f} MB")
+    finally:
+        client.loop_stop()
+        client.disconnect()
+        writer.close()
+
+
+def replay(args):
+    reader = LogReader(args.log)
+    pool = ConnectionPool(args.broker, args.port, 1 if args.rovers == 1 else args.connections)
+    start = reader.start + args.start if args.start is not None else None
+    stop = reader.start + args.end if args.end is not None else None
+    rep = Replayer(reader, lambda topic, payload, k: pool.client_for(k).publish(topic, payload),
+                   speed=args.speed, rovers=args.rovers, stagger=args.stagger, start=start, stop=stop)
+    print(f"▶️  Replaying {args.log} ({reader.end - reader.start:.0f} s captured) to {args.broker} "
+          f"at {'max' if not args.speed else '%gx' % args.speed}, {args.rovers} rover(s)")
+    t0 = time.perf_counter()
+    try:
+        n = asyncio.run(rep.run())
+    finally:
+        pool.close()
+        reader.close()
+    dt = time.perf_counter() - t0
+    snap = rep.stats.snapshot()
+    print(f"published {n} messages in {dt:.1f} s ({n / dt:.0f} msg/s), "
+          f"late p50 {snap['late_p50_ms']:.1f} ms p99 {snap['late_p99_ms']:.1f} ms")
+
+
+def info(args):
+    reader = LogReader(args.log)
+    counts = [0] * len(reader.topics)
+    size = 0
+    for _, tid, payload in reader.records():
+        counts[tid] += 1
+        size += len(payload)
+    print(f"{args.log}: {reader.end_offset / 1e6:.1f} MB, {reader.end - reader.start:.1f} s from "
+          f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(reader.start))}, "
+          f"{len(reader.sync_off)} blocks, payload {size / max(1, reader.end_offset) * 100:.0f}% of file")
+    for topic, n in zip(reader.topics, counts):
+        print(f"  {topic:<40s} {n:>10d}")
+    reader.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Record and replay mars/telemetry captures")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("record", help="capture live telemetry")
+    p.add_argument("log")
+    p.add_argument("--broker", default=BROKER)
+    p.add_argument("--port", type=int, default=PORT)
+    p.add_argument("--topics", nargs="+", default=TOPICS)
+    p.add_argument("--report", type=float, default=10.0, help="stats interval in seconds")
+
+    p = sub.add_parser("replay", help="publish a capture")
+    p.add_argument("log")
+    p.add_argument("--broker", default=BROKER, help='broker host, or "null" to only count')
+    p.add_argument("--port", type=int, default=PORT)
+    p.add_argument("--speed", type=float, default=1.0, help="1 = real time, 0 = as fast as possible")
+    p.add_argument("--rovers", type=int, default=1, help="publish each recorded rover as N rovers")
+    p.add_argument("--stagger", type=float, default=1.0, help="spread the fan-out over this many seconds")
+    p.add_argument("--connections", type=int, default=4, help="MQTT connections for fan-out")
+    p.add_argument("--start", type=float, default=None, help="seconds into the capture")
+    p.add_argument("--end", type=float, default=None, help="seconds into the capture")
+
+    p = sub.add_parser("info", help="summarise a capture")
+    p.add_argument("log")
+
+    args = ap.parse_args()
+    try:
+        {"record": record, "replay": replay, "info": info}[args.cmd](args)
+    except KeyboardInterrupt:
+        print("\nStopped.")
@@ -0,0 +1,197 @@
+from telemetry_codec import (
+    ANGLE_WRAP,
+    FLAG_HAS_ENV,
+    FLAG_HAS_IMU,
+    FLAG_IR_STORM,
+    FRAME_SIZE,
+    FRAME_VERSION,
+    decode_payload,
+    pack_frame_into,
+    scale_fields,
+    unpack_frame,
+    values_to_dict,
+)
+
+# ================= Stream layout =================
+# Stateful delta compression for consecutive telemetry frames.
+#
+# Keyframe: a plain telemetry_codec v1 frame; the stream id lives in the
+#           top nibble of its flags byte.
+# Delta:    B  0x80 | stream_id
+#           B  seq & 0xFF          (must be previous seq + 1)
+#           B  change mask         bit i = field i changed, bit 6 = flags
+#           [B flags]              only if bit 6 is set
+#           zigzag varints         one per changed field, in field order
+#
+# Field order matches scale_fields(): temp, light, vibe, pitch, roll, yaw.
+# Angles are delta-coded modulo 360 deg so wrap-around stays small.
+# A receiver that misses a delta (or joins mid-stream) drops deltas until
+# the next keyframe.
+
+STREAM_DELTA = 0x80
+STREAM_ID_MASK = 0x0F
+STREAM_SHIFT = 4
+MASK_FLAGS = 0x40
+N_FIELDS = 6
+ANGLE_FIELDS = (3, 4, 5)
+MAX_DELTA_SIZE = 4 + N_FIELDS * 3
+
+
+def zigzag(n):
+    return (n << 1) ^ (n >> 31)
+
+
+def unzigzag(z):
+    return (z >> 1) ^ -(z & 1)
+
+
+def put_varint(buf, pos, v):
+    while v >= 0x80:
+        buf[pos] = (v & 0x7F) | 0x80
+        v >>= 7
+        pos += 1
+    buf[pos] = v
+    return pos + 1
+
+
+def get_varint(data, pos):
+    v = 0
+    shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        v |= (b & 0x7F) << shift
+        if b < 0x80:
+            return v, pos
+        shift += 7
+
+
+def _field_delta(i, new, old):
+    d = new - old
+    if i in ANGLE_FIELDS:
+        d %= ANGLE_WRAP
+        if d >= ANGLE_WRAP // 2:
+            d -= ANGLE_WRAP
+    return d
+
+
+class StreamEncoder:
+    def __init__(self, stream_id=0, keyframe_interval=20):
+        self.stream_id = stream_id & STREAM_ID_MASK
+        self.keyframe_interval = keyframe_interval
+        self.buf = bytearray(max(FRAME_SIZE, MAX_DELTA_SIZE))
+        self.prev = None
+        self.prev_flags = 0
+        self.prev_seq = 0
+        self.since_key = 0
+        self.keyframes = 0
+        self.deltas = 0
+
+    def reset(self):
+        """Force the next frame to be a keyframe (e.g. after reconnect)."""
+        self.prev = None
+
+    def encode_into(self, seq, temp=0, light=0, vibe=0, ir_storm=False,
+                    pitch=0, roll=0, yaw=0, flags=FLAG_HAS_ENV | FLAG_HAS_IMU):
+        """Encode one sample into self.buf and return its length."""
+        flags = (flags & 0x0F) | (self.stream_id << STREAM_SHIFT)
+        if ir_storm:
+            flags |= FLAG_IR_STORM
+        else:
+            flags &= ~FLAG_IR_STORM
+        values = scale_fields(temp, light, vibe, pitch, roll, yaw)
+
+        n = 0
+        if (self.prev is not None
+                and self.since_key < self.keyframe_interval
+                and seq & 0xFFFF == (self.prev_seq + 1) & 0xFFFF):
+            n = self._delta(seq, flags, values)
+
+        if n == 0:
+            pack_frame_into(self.buf, flags, seq, values)
+            n = FRAME_SIZE
+            self.since_key = 1
+            self.keyframes += 1
+        else:
+            self.since_key += 1
+            self.deltas += 1
+
+        self.prev = values
+        self.prev_flags = flags
+        self.prev_seq = seq
+        return n
+
+    def encode(self, seq, **fields):
+        """Same as encode_into but returns a fresh bytes object."""
+        n = self.encode_into(seq, **fields)
+        return bytes(self.buf[:n])
+
+    def _delta(self, seq, flags, values):
+        buf = self.buf
+        prev = self.prev
+        buf[0] = STREAM_DELTA | self.stream_id
+        buf[1] = seq & 0xFF
+        mask = 0
+        pos = 3
+        if flags != self.prev_flags:
+            mask |= MASK_FLAGS
+            buf[pos] = flags & 0x0F
+            pos += 1
+        for i in range(N_FIELDS):
+            d = _field_delta(i, values[i], prev[i])
+            if d:
+                mask |= 1 << i
+                pos = put_varint(buf, pos, zigzag(d))
+        buf[2] = mask
+        # A delta that is no smaller than a keyframe is not worth sending
+        return pos if pos < FRAME_SIZE else 0
+
+
+class StreamDecoder:
+    def __init__(self):
+        self.streams = {}
+        self.keyframes = 0
+        self.deltas = 0
+        self.dropped = 0
+
+    def decode(self, data):
+        """Decode a keyframe, delta or legacy payload.
+
+        Returns the payload dict, or None for a delta that cannot be applied
+        until the next keyframe arrives.
+        """
+        head = data[0]
+        if head == FRAME_VERSION:
+            fields = unpack_frame(data)
+            flags, seq = fields[1], fields[2]
+            sid = flags >> STREAM_SHIFT
+            self.streams[sid] = [seq, flags, list(fields[3:])]
+            self.keyframes += 1
+            return values_to_dict(flags, seq, fields[3:])
+        if not head & STREAM_DELTA:
+            return decode_payload(data)
+
+        sid = head & STREAM_ID_MASK
+        st = self.streams.get(sid)
+        if st is None or data[1] != (st[0] + 1) & 0xFF:
+            # Lost sync: wait for the next keyframe on this stream
+            self.streams.pop(sid, None)
+            self.dropped += 1
+            return None
+
+        mask = data[2]
+        pos = 3
+        if mask & MASK_FLAGS:
+            st[1] = (data[pos] & 0x0F) | (sid << STREAM_SHIFT)
+            pos += 1
+        values = st[2]
+        for i in range(N_FIELDS):
+            if mask & (1 << i):
+                z, pos = get_varint(data, pos)
+                v = values[i] + unzigzag(z)
+                if i in ANGLE_FIELDS:
+                    v %= ANGLE_WRAP
+                values[i] = v
+        st[0] = (st[0] + 1) & 0xFFFF
+        self.deltas += 1
+        return values_to_dict(st[1], st[0], values)
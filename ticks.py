@@ -0,0 +1,26 @@
+# ================= Ticks =================
+# MicroPython's wrapping ticks for modules that also run on the CPython
+# host. On the board these are time's own functions. The host fallback
+# wraps at 2**30 like the ports do, so stamps fit array('i') and every
+# interval goes through ticks_diff() / ticks_add() off the board too.
+
+try:
+    from time import ticks_ms, ticks_us, ticks_diff, ticks_add
+except ImportError:  # CPython host
+    from time import monotonic_ns
+
+    _PERIOD = 1 << 30
+    _MASK = _PERIOD - 1
+    _HALF = _PERIOD >> 1
+
+    def ticks_ms():
+        return (monotonic_ns() // 1000000) & _MASK
+
+    def ticks_us():
+        return (monotonic_ns() // 1000) & _MASK
+
+    def ticks_diff(a, b):
+        return ((a - b + _HALF) & _MASK) - _HALF
+
+    def ticks_add(a, b):
+        return (a + b) & _MASK
@@ -0,0 +1,149 @@
+from array import array
+
+from ticks import ticks_us, ticks_diff, ticks_add
+
+# ================= Edge ring =================
+# The pin ISR only stamps each edge into a preallocated array; everything
+# else happens later in TremorWindow.update() from a normal task. head and
+# tail count modulo 2 * size, so index % size never jumps at the wrap and a
+# full ring is not mistaken for an empty one.
+
+
+class EdgeRing:
+    def __init__(self, size=128):
+        self.ticks = array('i', [0] * size)
+        self.size = size
+        self.wrap = 2 * size
+        self.head = 0  # advanced by the ISR
+        self.tail = 0  # advanced by update()
+        self.overflows = 0
+
+    def push(self, t):
+        """Store one ticks_us stamp. Safe to call from an ISR: no allocation."""
+        if (self.head - self.tail) % self.wrap >= self.size:
+            self.overflows += 1
+            return
+        self.ticks[self.head % self.size] = t
+        self.head = (self.head + 1) % self.wrap
+
+    def pending(self):
+        return (self.head - self.tail) % self.wrap
+
+
+# ================= Tremor classification =================
+# Edges closer together than burst_gap_ms form a burst; a burst with at
+# least burst_edges edges is a tremor, anything shorter is a bump. Every
+# window_ms the window closes with:
+#
+#   edge_rate   all edges per second
+#   burst_ms    longest tremor burst in the window
+#   duty        fraction of the window spent in a tremor burst
+#   intensity   tremor edges per second scaled to 0..100 at full_scale_hz
+#
+# so a single knock scores 0 and a 50-edge rattle scores well above it.
+
+QUIET, BUMP, TREMOR = 0, 1, 2
+
+
+class TremorWindow:
+    def __init__(self, window_ms=500, burst_gap_ms=50, burst_edges=4, full_scale_hz=200):
+        self.window_us = window_ms * 1000
+        self.gap_us = burst_gap_ms * 1000
+        self.burst_edges = burst_edges
+        self.full_scale_hz = full_scale_hz
+
+        self.win_start = ticks_us()
+        self.last_edge = self.win_start
+        self.burst_start = self.win_start
+        self.burst_n = 0
+
+        # Open window
+        self._edges = 0
+        self._tremor_edges = 0
+        self._burst_us = 0
+        self._longest_us = 0
+
+        # Last closed window
+        self.kind = QUIET
+        self.edges = 0
+        self.edge_rate = 0.0
+        self.burst_ms = 0
+        self.duty = 0.0
+        self.intensity = 0
+        self.windows = 0
+        self._peak = 0
+
+    def _edge(self, t):
+        self._edges += 1
+        if self.burst_n and ticks_diff(t, self.last_edge) <= self.gap_us:
+            self.burst_n += 1
+            if self.burst_n == self.burst_edges:
+                # Just became a tremor: count the edges and time so far
+                self._tremor_edges += self.burst_n
+                start = self.burst_start
+                if ticks_diff(start, self.win_start) < 0:
+                    start = self.win_start
+                self._burst_us += ticks_diff(t, start)
+            elif self.burst_n > self.burst_edges:
+                self._tremor_edges += 1
+                prev = self.last_edge
+                if ticks_diff(prev, self.win_start) < 0:
+                    prev = self.win_start
+                self._burst_us += ticks_diff(t, prev)
+            if self.burst_n >= self.burst_edges:
+                held = ticks_diff(t, self.burst_start)
+                if held > self._longest_us:
+                    self._longest_us = held
+        else:
+            self.burst_start = t
+            self.burst_n = 1
+        self.last_edge = t
+
+    def _close(self, end):
+        span = ticks_diff(end, self.win_start)
+        self.edges = self._edges
+        self.edge_rate = self._edges * 1000000 / span
+        self.burst_ms = self._longest_us // 1000
+        self.duty = self._burst_us / span
+        rate = self._tremor_edges * 1000000 / span
+        self.intensity = min(100, int(100 * rate / self.full_scale_hz + 0.5))
+        if self._tremor_edges:
+            self.kind = TREMOR
+            if self.intensity == 0:
+                self.intensity = 1
+        elif self._edges:
+            self.kind = BUMP
+        else:
+            self.kind = QUIET
+        if self.intensity > self._peak:
+            self._peak = self.intensity
+        self.windows += 1
+        self._edges = 0
+        self._tremor_edges = 0
+        self._burst_us = 0
+        self._longest_us = 0
+        self.win_start = end
+
+    def update(self, ring, now):
+        """Drain ring and close every window that ended by now (ticks_us).
+
+        Returns the intensity of the last closed window.
+        """
+        ticks = ring.ticks
+        size = ring.size
+        while ring.tail != ring.head:
+            t = ticks[ring.tail % size]
+            while ticks_diff(t, self.win_start) >= self.window_us:
+                self._close(ticks_add(self.win_start, self.window_us))
+            self._edge(t)
+            ring.tail = (ring.tail + 1) % ring.wrap
+        while ticks_diff(now, self.win_start) >= self.window_us:
+            self._close(ticks_add(self.win_start, self.window_us))
+        return self.intensity
+
+    def peak(self):
+        """Highest intensity since the last call, so a tremor that came and
+        went between two publishes is still reported."""
+        p = self._peak
+        self._peak = self.intensity
+        return p
@@ -0,0 +1,207 @@
+import json
+import math
+import mmap
+import os
+from array import array
+
+# ================= Column store =================
+# Append-only, chunked, memory-mapped columnar store for telemetry.
+#
+# <root>/meta.json              schema, chunk size, committed row count,
+#                               per-chunk time bounds
+# <root>/<chunk>/<column>.col   one preallocated file per column per chunk,
+#                               chunk_rows * itemsize bytes, mmapped
+#
+# Each column is a plain little-endian array of its typecode, so a chunk
+# can be wrapped zero-copy with memoryview / numpy.frombuffer. Missing
+# values are NaN for float columns and MISSING_INT for integer columns.
+# Rows are committed by flush(); on reopen, rows written after the last
+# flush are recovered by scanning the timestamp column for non-zero values.
+
+# (name, typecode) -- "t" is the receive/sample time in epoch seconds
+SCHEMA = (
+    ("t", "d"),
+    ("rover", "h"),
+    ("seq", "i"),
+    ("temp", "f"),
+    ("light", "h"),
+    ("vibe", "h"),
+    ("ir_storm", "b"),
+    ("pitch", "f"),
+    ("roll", "f"),
+    ("yaw", "f"),
+    # microphone block features (telemetry_codec acoustic frame)
+    ("sound_rms", "f"),
+    ("sound_peak", "h"),
+    ("sound_zcr", "h"),
+    ("sound_b0", "f"),
+    ("sound_b1", "f"),
+    ("sound_b2", "f"),
+    ("sound_b3", "f"),
+    ("sound_b4", "f"),
+)
+
+MISSING_INT = -1
+NAN = float("nan")
+
+
+class Chunk:
+    def __init__(self, path, schema, rows, create):
+        self.path = path
+        self.files = {}
+        self.maps = {}
+        self.cols = {}
+        if create:
+            os.makedirs(path, exist_ok=True)
+        for name, code in schema:
+            size = rows * array(code).itemsize
+            fn = os.path.join(path, name + ".col")
+            f = open(fn, "r+b" if os.path.exists(fn) else "w+b")
+            if os.fstat(f.fileno()).st_size < size:
+                f.truncate(size)
+            m = mmap.mmap(f.fileno(), size)
+            self.files[name] = f
+            self.maps[name] = m
+            self.cols[name] = memoryview(m).cast(code)
+
+    def flush(self):
+        for m in self.maps.values():
+            m.flush()
+
+    def close(self):
+        for mv in self.cols.values():
+            mv.release()
+        for m in self.maps.values():
+            m.close()
+        for f in self.files.values():
+            f.close()
+        self.cols = {}
+
+
+class ColumnStore:
+    def __init__(self, root, schema=SCHEMA, chunk_rows=1 << 16):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        meta_path = os.path.join(root, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            schema = tuple(tuple(c) for c in meta["schema"])
+            chunk_rows = meta["chunk_rows"]
+            self.rows = meta["rows"]
+            self.bounds = [list(b) for b in meta["bounds"]]
+        else:
+            self.rows = 0
+            self.bounds = []
+        self.schema = schema
+        self.names = tuple(name for name, _ in schema)
+        self.float_cols = tuple(name for name, code in schema if code in "fd")
+        self.chunk_rows = chunk_rows
+        self.chunks = []
+
+        n_chunks = -(-self.rows // chunk_rows) if self.rows else 0
+        for i in range(max(n_chunks, 1)):
+            self._open_chunk(i, create=True)
+        self._recover()
+
+    def _chunk_path(self, i):
+        return os.path.join(self.root, "%06d" % i)
+
+    def _open_chunk(self, i, create):
+        self.chunks.append(Chunk(self._chunk_path(i), self.schema, self.chunk_rows, create))
+        while len(self.bounds) <= i:
+            self.bounds.append([math.inf, -math.inf])
+
+    def _recover(self):
+        # Pick up rows appended after the last flush (t is never 0)
+        while True:
+            c, i = divmod(self.rows, self.chunk_rows)
+            if c >= len(self.chunks):
+                if not os.path.exists(self._chunk_path(c)):
+                    return
+                self._open_chunk(c, create=False)
+            t = self.chunks[c].cols["t"][i]
+            if t == 0:
+                return
+            b = self.bounds[c]
+            b[0], b[1] = min(b[0], t), max(b[1], t)
+            self.rows += 1
+
+    def __len__(self):
+        return self.rows
+
+    def append(self, sample, rover=0):
+        """Append one decoded payload dict (must contain "t" in seconds)."""
+        c, i = divmod(self.rows, self.chunk_rows)
+        if c == len(self.chunks):
+            self._open_chunk(c, create=True)
+        cols = self.chunks[c].cols
+        get = sample.get
+        for name in self.names:
+            v = get(name)
+            if v is None:
+                v = NAN if name in self.float_cols else MISSING_INT
+            cols[name][i] = v
+        if "rover" not in sample:
+            cols["rover"][i] = rover
+        t = sample["t"]
+        b = self.bounds[c]
+        if t < b[0]:
+            b[0] = t
+        if t > b[1]:
+            b[1] = t
+        self.rows += 1
+
+    def extend(self, samples, rover=0):
+        for s in samples:
+            self.append(s, rover)
+
+    def flush(self):
+        """Sync the mapped chunks and commit the row count."""
+        for ch in self.chunks:
+            ch.flush()
+        meta = {
+            "schema": self.schema,
+            "chunk_rows": self.chunk_rows,
+            "rows": self.rows,
+            "bounds": self.bounds,
+        }
+        tmp = os.path.join(self.root, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.root, "meta.json"))
+
+    def close(self):
+        self.flush()
+        for ch in self.chunks:
+            ch.close()
+        self.chunks = []
+
+    def iter_chunks(self, name, start=0, stop=None):
+        """Yield (first_row, memoryview) slices of a column, zero-copy."""
+        stop = self.rows if stop is None else min(stop, self.rows)
+        row = start
+        while row < stop:
+            c, i = divmod(row, self.chunk_rows)
+            n = min(self.chunk_rows - i, stop - row)
+            yield row, self.chunks[c].cols[name][i:i + n]
+            row += n
+
+    def read(self, name, start=0, stop=None):
+        """Copy a column range into a contiguous array."""
+        code = dict(self.schema)[name]
+        out = array(code)
+        for _, mv in self.iter_chunks(name, start, stop):
+            out.frombytes(mv.tobytes())
+        return out
+
+    def chunks_between(self, t0, t1):
+        """Row ranges of the chunks whose time bounds overlap [t0, t1)."""
+        out = []
+        for c, (lo, hi) in enumerate(self.bounds):
+            start = c * self.chunk_rows
+            if start >= self.rows:
+                break
+            if hi >= t0 and lo < t1:
+                out.append((start, min(start + self.chunk_rows, self.rows)))
+        return out
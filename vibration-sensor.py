@@ -1,14 +1,17 @@
 import machine
 import time
+from tremor import EdgeRing, TremorWindow
 
 class DigitalInterruptWindow:
-    def __init__(self, pin, active_high=True, window_ms=1000):
+    def __init__(self, pin, active_high=True, window_ms=1000, ring=128,
+                 burst_gap_ms=50, full_scale_hz=200):
         self.pin = machine.Pin(pin, machine.Pin.IN)
         self.active_high = active_high
         self.window_ms = window_ms
 
-        self.current = False
-        self.last_change_ms = time.ticks_ms()
+        # Edge stamps from the ISR; graded in process()
+        self.ring = EdgeRing(ring)
+        self.tremor = TremorWindow(window_ms, burst_gap_ms, full_scale_hz=full_scale_hz)
 
         # Attach interrupt on BOTH edges
         self.pin.irq(
@@ -16,43 +19,48 @@ class DigitalInterruptWindow:
             handler=self._irq_handler
         )
 
-        # Initialize state
-        self.current = self._read_pin()
-
     def _read_pin(self):
         val = self.pin.value()
         return bool(val) if self.active_high else not bool(val)
 
     def _irq_handler(self, pin):
-        # VERY IMPORTANT: keep ISR short
-        self.current = self._read_pin()
-        self.last_change_ms = time.ticks_ms()
-        print("detected")
+        # VERY IMPORTANT: keep ISR short (one stamp, no print, no allocation)
+        self.ring.push(time.ticks_us())
+
+    def process(self):
+        """Drain the edge ring; returns the tremor intensity (0..100) of the
+        last closed window. Call it from a task at least once per window."""
+        return self.tremor.update(self.ring, time.ticks_us())
+
+    def peak(self):
+        """Highest intensity since the last call; see TremorWindow.peak."""
+        return self.tremor.peak()
 
     def read(self):
         """
         Returns:
           current_state, was_changed_recently
         """
-        now = time.ticks_ms()
-        recent = time.ticks_diff(now, self.last_change_ms) <= self.window_ms
-        return self.current, recent
-    
-# from digital_interrupt_window import DigitalInterruptWindow
-import uasyncio as asyncio
-
-vibration = DigitalInterruptWindow(
-    pin=2,          # GPIO5 = D1
-    active_high=True,
-    window_ms=500
-)
+        self.process()
+        recent = time.ticks_diff(time.ticks_us(), self.tremor.last_edge) <= self.window_ms * 1000
+        return self._read_pin(), recent
 
-async def main():
-    while True:
-        current, recent = vibration.read()
-        print("Now:", current, "Changed in 200ms:", recent)
-        await asyncio.sleep_ms(1000)
+if __name__ == "__main__":
+    # from digital_interrupt_window import DigitalInterruptWindow
+    import uasyncio as asyncio
 
-asyncio.run(main())
+    vibration = DigitalInterruptWindow(
+        pin=2,          # GPIO5 = D1
+        active_high=True,
+        window_ms=500
+    )
 
+    async def main():
+        while True:
+            intensity = vibration.process()
+            t = vibration.tremor
+            print("Tremor: %3d  edges %3d  rate %6.1f Hz  burst %4d ms  duty %.2f  overflows %d"
+                  % (intensity, t.edges, t.edge_rate, t.burst_ms, t.duty, vibration.ring.overflows))
+            await asyncio.sleep_ms(500)
 
+    asyncio.run(main())